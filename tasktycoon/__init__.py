@@ -1,17 +1,121 @@
-from flask import Flask
-from .config import DATA_DIR, STATE_PATH
+from flask import Flask, g, jsonify, request
+from .config import DATA_DIR, REQUEST_RECORDING, REQUEST_RECORD_PATH, TIMING_ENABLED
 import os
+import time
 
-def create_app():
+def create_app(record=None):
+    """Create the app; `record` is an NDJSON path to record API requests to
+    (default: REQUEST_RECORD_PATH if REQUEST_RECORDING is on, False: never)."""
     app = Flask(__name__, 
                 static_folder='static',
                 template_folder='templates')
 
     # Gerekli klasör ve state dosyasını oluştur
     os.makedirs(DATA_DIR, exist_ok=True)
-    if not os.path.exists(STATE_PATH):
-        from .services.state_service import save_state, get_default_state
-        save_state(get_default_state())
+    from .services.state_service import (ensure_state, set_current_company,
+                                         reset_current_company, get_state_version,
+                                         get_current_company, StateConflictError,
+                                         track_saves, last_saved_version,
+                                         reset_saved_versions)
+    from .services.engine_service import GameRuleError
+    from .services import replay_service, timing_service
+    ensure_state()
+
+    if record is None and REQUEST_RECORDING:
+        record = REQUEST_RECORD_PATH
+    recorder = replay_service.RequestRecorder(record) if record else None
+    app.extensions['request_recorder'] = recorder
+
+    # İstek zamanlaması: ilk before_request olarak başlar, böylece şirket
+    # kapsamı ve If-Match kontrolü de toplam süreye dahil olur
+    if TIMING_ENABLED:
+        app.json = timing_service.TimedJSONProvider(app)
+
+        @app.before_request
+        def _start_timing():
+            if _is_timed(request):
+                g.timing_token = timing_service.start_request()
+
+        @app.after_request
+        def _finish_timing(response):
+            token = g.pop('timing_token', None)
+            if token is not None:
+                timing_service.finish_request(
+                    token, request.method,
+                    request.url_rule.rule if request.url_rule else 'unmatched',
+                    request.path, response.status_code,
+                    request.content_length, response.calculate_content_length())
+            return response
+
+    # İstekleri şirkete göre kapsamla: X-Company-Id başlığı veya ?company=
+    @app.before_request
+    def _scope_company():
+        company_id = request.headers.get('X-Company-Id') or request.args.get('company')
+        try:
+            g.company_token = set_current_company(company_id)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        # Kayıt/tekrar oynatmada istek kendi tohumlu RNG'siyle çalışır
+        seed = None
+        if app.config.get('REPLAY') and 'X-Replay-Seed' in request.headers:
+            seed = int(request.headers['X-Replay-Seed'])
+        elif recorder is not None and _is_recorded(request):
+            recorder.snapshot(get_current_company())
+            seed = replay_service.new_seed()
+        if seed is not None:
+            g.request_seed = seed
+            g.request_started = time.perf_counter()
+            g.rng_token = replay_service.seed_request(seed)
+            g.saves_token = track_saves()
+
+    @app.errorhandler(StateConflictError)
+    def _state_conflict(e):
+        return _conflict_response(e.current_version)
+
+    # Oyun kuralı ihlalleri (yetersiz nakit/enerji vb.) tek yerden cevaplanır
+    @app.errorhandler(GameRuleError)
+    def _game_rule_error(e):
+        return jsonify({'success': False, 'error': str(e)}), e.status
+
+    if recorder is not None:
+        @app.after_request
+        def _record_request(response):
+            if 'request_seed' in g:
+                saved = last_saved_version()
+                recorder.record({
+                    'company': get_current_company(),
+                    'method': request.method,
+                    'path': request.path,
+                    'endpoint': f'{request.method} {request.url_rule.rule if request.url_rule else request.path}',
+                    'query': request.query_string.decode('utf-8', 'replace'),
+                    'headers': {name: request.headers[name] for name in replay_service.RECORDED_HEADERS
+                                if name in request.headers},
+                    'body': request.get_json(silent=True),
+                    'seed': g.request_seed,
+                    'status': response.status_code,
+                    'ms': round((time.perf_counter() - g.request_started) * 1000, 3),
+                    # Kaydeden istek: kendi kaydının versiyonu (tekrar oynatma bu sırayla
+                    # yapılır); diğerleri: bittiklerinde gördükleri versiyon
+                    'version': saved if saved is not None else get_state_version(),
+                    'saved': saved is not None,
+                })
+            return response
+
+    @app.teardown_request
+    def _reset_company(exc=None):
+        timing_token = g.pop('timing_token', None)
+        if timing_token is not None:
+            timing_service.discard_request(timing_token)
+        rng_token = g.pop('rng_token', None)
+        if rng_token is not None:
+            replay_service.reset_request_rng(rng_token)
+        saves_token = g.pop('saves_token', None)
+        if saves_token is not None:
+            reset_saved_versions(saves_token)
+        token = g.pop('company_token', None)
+        if token is not None:
+            reset_current_company(token)
 
     # Blueprint'leri kaydet
     from .routes.home import home_bp
@@ -23,6 +127,9 @@ def create_app():
     from .routes.employees import employees_bp
     from .routes.employee import employee_bp
     from .routes.dashboard import dashboard_bp
+    from .routes.planner import planner_bp
+    from .routes.stream import stream_bp
+    from .routes.debug import debug_bp
 
     app.register_blueprint(home_bp)
     app.register_blueprint(state_bp)
@@ -33,5 +140,26 @@ def create_app():
     app.register_blueprint(employees_bp)
     app.register_blueprint(employee_bp)
     app.register_blueprint(dashboard_bp)
+    app.register_blueprint(planner_bp)
+    app.register_blueprint(stream_bp)
+    app.register_blueprint(debug_bp)
 
     return app
+
+def _is_recorded(request):
+    # SSE bağlantıları uzun ömürlüdür ve state değiştirmez
+    return request.path.startswith('/api/') and request.path != '/api/stream'
+
+def _is_timed(request):
+    # /metrics kendi ölçümünü bozmasın; SSE süresi bağlantı ömrüdür
+    return request.path not in ('/metrics', '/api/stream')
+
+def _conflict_response(current_version):
+    response = jsonify({
+        'success': False,
+        'error': 'State bu arada değişti, güncel durumu alıp tekrar deneyin',
+        'current_version': current_version
+    })
+    response.status_code = 409
+    response.set_etag(f'v{current_version}')
+    return response
@@ -1,7 +1,198 @@
-"""Entry point for running TaskTycoon as a module."""
+"""Entry point for running TaskTycoon as a module.
+
+    python -m tasktycoon                 # web sunucusunu başlat
+    python -m tasktycoon import-sqlite   # state.json'u SQLite'a aktar
+    python -m tasktycoon simulate        # politikalarla headless oyun simülasyonu
+    python -m tasktycoon sweep           # EconomicSystem parametre taraması
+    python -m tasktycoon --record        # web sunucusu, API isteklerini kaydederek
+    python -m tasktycoon replay <dosya>  # kaydedilmiş istekleri yeniden oynat
+    python -m tasktycoon bench run       # sentetik büyük state ile benchmark
+"""
+
+import os
+import json
+import argparse
 
 from . import create_app
+from .config import (STATE_PATH, JOURNAL_DIR, SQLITE_PATH, SWEEP_DIR, SWEEP_CACHE_PATH,
+                     REQUEST_RECORD_PATH, BENCHMARK_REGRESSION_THRESHOLD)
 
-if __name__ == "__main__":
-    app = create_app()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='tasktycoon')
+    parser.add_argument('--record', nargs='?', const=REQUEST_RECORD_PATH, default=None, metavar='DOSYA',
+                        help=f'web sunucusunun API isteklerini kaydet (varsayılan: {REQUEST_RECORD_PATH})')
+    sub = parser.add_subparsers(dest='command')
+
+    imp = sub.add_parser('import-sqlite', help='state.json (+ journal) içeriğini SQLite veritabanına aktar')
+    imp.add_argument('--state', default=STATE_PATH, help='kaynak state.json')
+    imp.add_argument('--journal', default=JOURNAL_DIR, help='kaynak journal klasörü')
+    imp.add_argument('--db', default=SQLITE_PATH, help='hedef SQLite dosyası')
+
+    sim = sub.add_parser('simulate', help='kayıtlı politikalarla oyunları diske dokunmadan oyna')
+    sim.add_argument('--policy', default='growth', help='grind, balanced, growth, random veya all')
+    sim.add_argument('--games', type=int, default=100, help='oynanacak oyun sayısı')
+    sim.add_argument('--days', type=int, default=60, help='oyun başına en fazla gün')
+    sim.add_argument('--seed', type=int, default=None, help='tekrarlanabilir sonuçlar için tohum')
+
+    swp = sub.add_parser('sweep', help='parametre ızgarasını simüle edilmiş oyunlarla tara')
+    swp.add_argument('--grid', help='{"TASK_ECONOMICS.work.base_reward": [60, 80]} biçiminde JSON dosyası')
+    swp.add_argument('--param', action='append', default=[], metavar='YOL=D1,D2',
+                     help='tek parametre, ör. DEPARTMENT_COSTS.rndLevel.setup=300,500 (tekrarlanabilir)')
+    swp.add_argument('--policy', default='growth', help='simülasyon politikası')
+    swp.add_argument('--seeds', type=int, default=50, help='ızgara noktası başına oyun (seed) sayısı')
+    swp.add_argument('--base-seed', type=int, default=0, help='ilk seed')
+    swp.add_argument('--days', type=int, default=60, help='oyun başına en fazla gün')
+    swp.add_argument('--workers', type=int, default=None, help='süreç sayısı (varsayılan: CPU sayısı)')
+    swp.add_argument('--out', default=os.path.join(SWEEP_DIR, 'report'), help='rapor dosyası öneki (.json/.csv)')
+    swp.add_argument('--no-cache', action='store_true', help='önbelleği kullanma')
+
+    rep = sub.add_parser('replay', help='kaydedilmiş istekleri yeni bir depoda tekrar oynat')
+    rep.add_argument('recording', nargs='?', default=REQUEST_RECORD_PATH, help='kayıt dosyası (NDJSON)')
+    rep.add_argument('--data-dir', default=None, help='tekrar oynatma deposu (varsayılan: geçici klasör)')
+    rep.add_argument('--no-verify', action='store_true', help='versiyon ve son state kontrolünü atla')
+
+    bench = sub.add_parser('bench', help='sentetik büyük state ile benchmark çalıştır / karşılaştır')
+    bench_sub = bench.add_subparsers(dest='bench_command', required=True)
+    brun = bench_sub.add_parser('run', help='benchmark çalıştır ve sonucu JSON olarak kaydet')
+    brun.add_argument('--scale', type=float, default=1.0,
+                      help='state boyutu çarpanı (1.0 = 10k çalışan, 1M görev, 5k gün)')
+    brun.add_argument('--seed', type=int, default=0, help='sentetik state tohumu')
+    brun.add_argument('--group', default='all', help='economic, state, api (virgülle) veya all')
+    brun.add_argument('--only', default=None, help='sadece adında bu metinlerden biri geçenler (virgülle)')
+    brun.add_argument('--min-time', type=float, default=None, help='benchmark başına en az ölçüm süresi (sn)')
+    brun.add_argument('--data-dir', default=None, help='benchmark deposu (varsayılan: geçici klasör)')
+    brun.add_argument('--out', default='latest', help='sonuç adı (BENCHMARK_DIR/<ad>.json) veya dosya yolu')
+    brun.add_argument('--compare', default=None, metavar='BASELINE', help='sonucu bu baseline ile karşılaştır')
+    brun.add_argument('--threshold', type=float, default=BENCHMARK_REGRESSION_THRESHOLD,
+                      help='gerileme eşiği (0.2 = %%20 daha yavaş)')
+    bcmp = bench_sub.add_parser('compare', help='iki sonucu karşılaştır, gerilemeleri işaretle')
+    bcmp.add_argument('baseline', help='baseline adı veya dosyası')
+    bcmp.add_argument('current', nargs='?', default='latest', help='karşılaştırılacak sonuç (varsayılan: latest)')
+    bcmp.add_argument('--threshold', type=float, default=BENCHMARK_REGRESSION_THRESHOLD,
+                      help='gerileme eşiği (0.2 = %%20 daha yavaş)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'import-sqlite':
+        from .services.storage_service import migrate_json_to_sqlite
+        counts = migrate_json_to_sqlite(args.state, args.journal, args.db)
+        print(f"{args.state} -> {args.db}: {counts['employees']} çalışan, "
+              f"{counts['taskHistory']} görev, {counts['dayHistory']} gün aktarıldı")
+        print("Kullanmak için config.py içinde STATE_BACKEND = 'sqlite' yapın.")
+        return
+
+    if args.command == 'simulate':
+        from .services.simulation_service import POLICIES, run_games
+        policies = list(POLICIES) if args.policy == 'all' else [args.policy]
+        for policy in policies:
+            if policy not in POLICIES:
+                parser.error(f"bilinmeyen politika: {policy}")
+            report = run_games(policy, args.games, args.days, args.seed)
+            outcomes = ', '.join(f'{k}: {v}' for k, v in sorted(report['outcomes'].items()))
+            print(f"{policy}: {report['games']} oyun, {report['steps']} adım, "
+                  f"{report['elapsed']:.2f} sn ({report['steps_per_second']:.0f} adım/sn, "
+                  f"{report['games_per_second']:.1f} oyun/sn)")
+            print(f"  ortalama nakit {report['mean_cash']:.0f} TL, medyan {report['median_cash']:.0f} TL; {outcomes}")
+        return
+
+    if args.command == 'sweep':
+        from .services.balance_service import sweep, write_report
+        grid = {}
+        if args.grid:
+            with open(args.grid, 'r', encoding='utf-8') as f:
+                grid.update(json.load(f))
+        for item in args.param:
+            path, _, values = item.partition('=')
+            grid[path] = [json.loads(v) for v in values.split(',') if v]
+        if not grid:
+            parser.error('--grid veya --param gerekli')
+        try:
+            report = sweep(grid, seeds=args.seeds, policy=args.policy, days=args.days,
+                           base_seed=args.base_seed, workers=args.workers,
+                           cache_path=None if args.no_cache else SWEEP_CACHE_PATH,
+                           progress=lambda done, total: print(f"  {done}/{total} nokta", flush=True))
+        except ValueError as e:
+            parser.error(str(e))
+        json_path, csv_path = write_report(report, args.out)
+        print(f"{len(report['rows'])} nokta, {report['played']} oyun oynandı, {report['cached']} önbellekten")
+        for row in report['rows']:
+            print(f"  {row['params']}: iflas %{row['bankruptcy_rate'] * 100:.1f}, "
+                  f"100k %{row['reach_100k_rate'] * 100:.1f} (medyan gün {row['median_days_to_100k']}), "
+                  f"medyan değer {row['median_valuation']:.0f} TL")
+        print(f"Rapor: {json_path}, {csv_path}")
+        return
+
+    if args.command == 'replay':
+        from .services.replay_service import replay
+        report = replay(args.recording, data_dir=args.data_dir, verify=not args.no_verify)
+        print(f"{report['requests']} istek, {report['elapsed']:.2f} sn "
+              f"({report['requests_per_second']:.0f} istek/sn)")
+        for endpoint, stats in report['endpoints'].items():
+            print(f"  {endpoint}: {stats['count']} istek, p50 {stats['p50']:.2f} ms, "
+                  f"p90 {stats['p90']:.2f} ms, p99 {stats['p99']:.2f} ms, en fazla {stats['max']:.2f} ms")
+        for mismatch in report['status_mismatches'][:10]:
+            print(f"  HTTP durumu farklı #{mismatch['seq']} {mismatch['endpoint']}: "
+                  f"kayıt {mismatch['recorded']}, tekrar {mismatch['replayed']}")
+        for mismatch in report['version_mismatches'][:10]:
+            print(f"  State versiyonu farklı #{mismatch['seq']} {mismatch['endpoint']}: "
+                  f"kayıt {mismatch['recorded']}, tekrar {mismatch['replayed']}")
+        for company_id, result in sorted(report['companies'].items()):
+            print(f"  {company_id}: son state {'aynı' if result == 'match' else 'FARKLI'}")
+        if not args.no_verify and not report['companies']:
+            print('  Kayıtta son state özeti yok (sunucu düzgün kapanmamış); sadece versiyonlar karşılaştırıldı')
+        print('Tekrar oynatma tutarlı' if report['ok'] else 'Tekrar oynatma kayıttan farklı')
+        raise SystemExit(0 if report['ok'] else 1)
+
+    if args.command == 'bench':
+        from . import benchmarks
+        if args.bench_command == 'run':
+            groups = benchmarks.GROUPS if args.group == 'all' else tuple(args.group.split(','))
+            unknown = [g for g in groups if g not in benchmarks.GROUPS]
+            if unknown:
+                parser.error(f"bilinmeyen benchmark grubu: {', '.join(unknown)}")
+            only = args.only.split(',') if args.only else None
+            print(f"Sentetik state hazırlanıyor (ölçek {args.scale})...", flush=True)
+            legacy, meta = benchmarks.prepare(args.scale, args.seed, args.data_dir)
+            print(f"  {meta['employees']} çalışan, {meta['tasks']} görev, {meta['days']} gün; "
+                  f"{meta['backend']} / {meta['write_mode']}")
+            options = {} if args.min_time is None else {'min_time': args.min_time}
+            report = benchmarks.run(
+                benchmarks.build(legacy, groups), meta, only=only,
+                progress=lambda name, r: print(f"  {name}: medyan {_format_us(r['median_us'])}, "
+                                               f"en az {_format_us(r['min_us'])} ({r['calls']} çağrı)",
+                                               flush=True),
+                **options)
+            print(f"Sonuç: {benchmarks.save(report, args.out)}")
+            if not args.compare:
+                return
+            baseline, current = benchmarks.load(args.compare), report
+        else:
+            baseline, current = benchmarks.load(args.baseline), benchmarks.load(args.current)
+        result = benchmarks.compare(baseline, current, args.threshold)
+        for key, (before, after) in result['meta_differences'].items():
+            print(f"  UYARI: {key} farklı ({before} -> {after}), sonuçlar doğrudan karşılaştırılamayabilir")
+        for row in result['rows']:
+            mark = {'regression': 'GERİLEME', 'improvement': 'iyileşme', 'ok': ''}[row['status']]
+            print(f"  {row['name']}: {_format_us(row['baseline_us'])} -> {_format_us(row['current_us'])} "
+                  f"(x{row['ratio']:.2f}) {mark}".rstrip())
+        for name in result['missing']:
+            print(f"  {name}: yeni sonuçta yok")
+        print(f"{len(result['regressions'])} gerileme, {len(result['improvements'])} iyileşme "
+              f"(eşik %{args.threshold * 100:.0f})")
+        raise SystemExit(1 if result['regressions'] else 0)
+
+    app = create_app(record=args.record)
     app.run(debug=True, host='0.0.0.0', port=5000)
+
+
+def _format_us(value):
+    if value >= 1000000:
+        return f'{value / 1000000:.2f} sn'
+    if value >= 1000:
+        return f'{value / 1000:.2f} ms'
+    return f'{value:.2f} µs'
+
+
+if __name__ == "__main__":
+    main()
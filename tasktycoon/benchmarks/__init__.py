@@ -0,0 +1,14 @@
+"""
+Benchmarks for EconomicSystem, state persistence and the API routes on
+synthetic large states.
+
+    python -m tasktycoon bench run --scale 0.1 --out baseline
+    python -m tasktycoon bench run --compare baseline
+    python -m tasktycoon bench compare baseline latest --threshold 0.2
+
+Results are JSON files under BENCHMARK_DIR (see runner.py for the layout);
+compare flags benchmarks whose median time grew beyond the threshold.
+"""
+from .runner import Benchmark, measure, run, save, load, compare
+from .suites import GROUPS, prepare, build
+from .synthetic import synthetic_state
@@ -0,0 +1,149 @@
+"""
+Benchmark runner: timing, JSON baselines and regression checks.
+
+A result file holds the run's settings and one entry per benchmark:
+
+    {"meta": {"scale": 1.0, "backend": "json", "write_mode": "write_behind", ...},
+     "results": {"economic.calculate_daily_costs":
+                     {"group": "economic", "calls": 200000,
+                      "median_us": 1.9, "min_us": 1.8, "mean_us": 2.0}, ...}}
+
+compare() matches two files by benchmark name on the median per-call time.
+"""
+import os
+import json
+import time
+import platform
+import statistics
+from datetime import datetime
+
+from ..config import BENCHMARK_DIR
+
+# Ölçüm: her benchmark en az bu kadar süre ve bu kadar tekrar çalıştırılır
+MIN_TIME = 0.2
+REPEAT = 5
+# setup'lı (her çağrıdan önce hazırlık isteyen) benchmark'larda en fazla çağrı
+MAX_SETUP_CALLS = 1000
+
+
+class Benchmark:
+    """One named measurement; `setup` (optional) runs untimed before each call
+    and its return value is passed to `fn`."""
+
+    def __init__(self, name, fn, setup=None):
+        self.name = name
+        self.group = name.split('.', 1)[0]
+        self.fn = fn
+        self.setup = setup
+
+
+def measure(benchmark, min_time=MIN_TIME, repeat=REPEAT):
+    """Return per-call timings of a benchmark in microseconds."""
+    if benchmark.setup is not None:
+        samples = []
+        total = 0.0
+        while len(samples) < repeat or (total < min_time and len(samples) < MAX_SETUP_CALLS):
+            args = benchmark.setup()
+            started = time.perf_counter()
+            benchmark.fn(args)
+            elapsed = time.perf_counter() - started
+            samples.append(elapsed)
+            total += elapsed
+        calls = len(samples)
+    else:
+        # timeit.autorange gibi: bir turun süresi min_time / repeat'i geçene kadar çağrı sayısını artır
+        number = 1
+        while True:
+            elapsed = _time_batch(benchmark.fn, number)
+            if elapsed >= min_time / repeat or number >= 10 ** 7:
+                break
+            number *= 10 if elapsed < min_time / repeat / 10 else 2
+        samples = [elapsed / number]
+        samples += [_time_batch(benchmark.fn, number) / number for _ in range(repeat - 1)]
+        calls = number * repeat
+    return {
+        'group': benchmark.group,
+        'calls': calls,
+        'median_us': round(statistics.median(samples) * 1e6, 3),
+        'min_us': round(min(samples) * 1e6, 3),
+        'mean_us': round(statistics.fmean(samples) * 1e6, 3),
+    }
+
+
+def _time_batch(fn, number):
+    started = time.perf_counter()
+    for _ in range(number):
+        fn(None)
+    return time.perf_counter() - started
+
+
+def run(benchmarks, meta, only=None, progress=None, min_time=MIN_TIME):
+    """Measure `benchmarks` (names containing `only`, if given)."""
+    results = {}
+    for benchmark in benchmarks:
+        if only and not any(part in benchmark.name for part in only):
+            continue
+        results[benchmark.name] = measure(benchmark, min_time=min_time)
+        if progress:
+            progress(benchmark.name, results[benchmark.name])
+    return {'meta': dict(meta, created=datetime.now().isoformat(timespec='seconds'),
+                         python=platform.python_version(), machine=platform.machine()),
+            'results': results}
+
+
+def baseline_path(name):
+    """A bare name means BENCHMARK_DIR/<name>.json; paths are used as given."""
+    if os.sep in name or name.endswith('.json'):
+        return name
+    return os.path.join(BENCHMARK_DIR, name + '.json')
+
+
+def save(report, name):
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load(name):
+    with open(baseline_path(name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold):
+    """Compare two reports; a benchmark regressed if its median got more than
+    `threshold` (fraction) slower.
+
+    Returns {'rows': [...], 'regressions': [...], 'improvements': [...],
+    'missing': [...], 'added': [...], 'meta_differences': {...}}.
+    """
+    base_results = baseline['results']
+    current_results = current['results']
+    rows = []
+    for name in sorted(set(base_results) & set(current_results)):
+        before = base_results[name]['median_us']
+        after = current_results[name]['median_us']
+        ratio = after / before if before else float('inf')
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 - threshold:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append({'name': name, 'baseline_us': before, 'current_us': after,
+                     'ratio': round(ratio, 3), 'status': status})
+    # Farklı ayarlarla alınmış ölçümler karşılaştırılabilir değildir, uyarı için
+    keys = ('scale', 'backend', 'write_mode', 'python', 'machine')
+    meta_differences = {key: (baseline['meta'].get(key), current['meta'].get(key))
+                        for key in keys if baseline['meta'].get(key) != current['meta'].get(key)}
+    return {
+        'rows': rows,
+        'regressions': [row for row in rows if row['status'] == 'regression'],
+        'improvements': [row for row in rows if row['status'] == 'improvement'],
+        'missing': sorted(set(base_results) - set(current_results)),
+        'added': sorted(set(current_results) - set(base_results)),
+        'meta_differences': meta_differences,
+    }
@@ -0,0 +1,137 @@
+"""
+Benchmark definitions.
+
+prepare() points the storage at a fresh directory and saves a synthetic
+state there; build() returns the benchmarks in run order:
+
+    economic.*  every EconomicSystem method ([legacy]: state without the
+                incremental aggregates)
+    state.*     load_state (cold legacy load incl. migration, cached,
+                for_update, cold) and save_state (with and without flush)
+    api.*       Flask test client requests to /api/task, /api/day/end,
+                /api/dashboard/stats and /api/employees/overview
+"""
+import tempfile
+
+from .runner import Benchmark
+from .synthetic import synthetic_state, DEPARTMENT_LEVEL
+from ..services import state_service
+from ..services.economic_service import EconomicSystem
+from ..services.engine_service import TASK_TYPES
+
+GROUPS = ('economic', 'state', 'api')
+
+
+def prepare(scale=1.0, seed=0, data_dir=None):
+    """Save a synthetic state into fresh storage; returns (legacy state, meta).
+
+    The state is written to the backend as is: save_state() would migrate it
+    in place, and both the [legacy] cases and the cold legacy load need the
+    untouched generator output.
+    """
+    state_service.use_data_dir(data_dir or tempfile.mkdtemp(prefix='tasktycoon-bench-'))
+    legacy = synthetic_state(scale, seed)
+    state_service.get_backend().write_snapshot(legacy, 0)
+    state_service.invalidate_state_cache()
+    meta = {
+        'scale': scale,
+        'seed': seed,
+        'backend': state_service.STATE_BACKEND,
+        'write_mode': state_service.STATE_WRITE_MODE,
+        'employees': len(legacy['employees']),
+        'tasks': len(legacy['taskHistory']),
+        'days': len(legacy['dayHistory']),
+    }
+    return legacy, meta
+
+
+def build(legacy, groups=GROUPS):
+    """Return the benchmarks of `groups` for a prepared storage."""
+    benchmarks = []
+    if 'economic' in groups:
+        benchmarks += _economic(legacy)
+    if 'state' in groups:
+        benchmarks += _state()
+    if 'api' in groups:
+        benchmarks += _api()
+    return benchmarks
+
+
+def _economic(legacy):
+    # Migration'lı (aggregates'li) state; önbellek boşaltılır ki 'state' grubu
+    # diskteki ilk hâlin soğuk yüklemesini ölçebilsin
+    state = state_service.load_state()
+    state_service.invalidate_state_cache()
+    employee = state['employees'][0]
+    employees = len(state['employees'])
+    return [
+        Benchmark('economic.build_tables', lambda _: EconomicSystem.build_tables()),
+        Benchmark('economic.department_value',
+                  lambda _: EconomicSystem.department_value('engLevel', DEPARTMENT_LEVEL)),
+        Benchmark('economic.calculate_daily_costs',
+                  lambda _: EconomicSystem.calculate_daily_costs(state)),
+        Benchmark('economic.calculate_daily_costs[legacy]',
+                  lambda _: EconomicSystem.calculate_daily_costs(legacy)),
+        Benchmark('economic.calculate_task_reward',
+                  lambda _: [EconomicSystem.calculate_task_reward(t, state) for t in TASK_TYPES]),
+        Benchmark('economic.calculate_upgrade_cost',
+                  lambda _: EconomicSystem.calculate_upgrade_cost('engLevel', DEPARTMENT_LEVEL)),
+        Benchmark('economic.calculate_employee_efficiency',
+                  lambda _: EconomicSystem.calculate_employee_efficiency(employee, state)),
+        Benchmark('economic.get_market_modifier',
+                  lambda _: EconomicSystem._get_market_modifier(state)),
+        Benchmark('economic.get_financial_health',
+                  lambda _: EconomicSystem.get_financial_health(state)),
+        Benchmark('economic.get_financial_health[legacy]',
+                  lambda _: EconomicSystem.get_financial_health(legacy)),
+        Benchmark('economic.get_financial_status',
+                  lambda _: EconomicSystem._get_financial_status(55)),
+        Benchmark('economic.calculate_hiring_cost',
+                  lambda _: EconomicSystem.calculate_hiring_cost('developer', employees)),
+        Benchmark('economic.calculate_training_cost',
+                  lambda _: EconomicSystem.calculate_training_cost(65)),
+    ]
+
+
+def _state():
+    def changed_copy():
+        state = state_service.load_state(for_update=True)
+        state['cash'] += 1
+        return state
+
+    def save_and_flush(state):
+        state_service.save_state(state, event='benchmark')
+        state_service.flush_state()
+
+    return [
+        # Diskteki state henüz ilk (sınırsız geçmişli) hâlinde: okuma + migration
+        Benchmark('state.load_state_cold_legacy', lambda _: state_service.load_state(),
+                  setup=state_service.invalidate_state_cache),
+        Benchmark('state.load_state_cached', lambda _: state_service.load_state()),
+        Benchmark('state.load_state_for_update', lambda _: state_service.load_state(for_update=True)),
+        Benchmark('state.save_state', lambda state: state_service.save_state(state, event='benchmark'),
+                  setup=changed_copy),
+        Benchmark('state.save_state_flush', save_and_flush, setup=changed_copy),
+        Benchmark('state.load_state_cold', lambda _: state_service.load_state(),
+                  setup=state_service.invalidate_state_cache),
+    ]
+
+
+def _api():
+    from .. import create_app
+    client = create_app(record=False).test_client()
+
+    def request(method, path, **kwargs):
+        def call(_):
+            response = client.open(path, method=method, **kwargs)
+            if response.status_code != 200:
+                raise RuntimeError(f'{method} {path}: HTTP {response.status_code}')
+            response.close()
+        return call
+
+    return [
+        Benchmark('api.task', request('POST', '/api/task', json={'task_type': 'work'})),
+        Benchmark('api.day_end', request('POST', '/api/day/end')),
+        Benchmark('api.dashboard_stats', request('GET', '/api/dashboard/stats')),
+        Benchmark('api.employees_overview', request('GET', '/api/employees/overview')),
+    ]
@@ -0,0 +1,69 @@
+"""
+Synthetic large states for benchmarks.
+
+synthetic_state() builds an old-style save that grew without bounds: every
+employee, task record and day summary is in the state and the incremental
+aggregates are missing, so loading it also exercises the migration. Sizes
+scale linearly with `scale` (1.0 = 10k employees, 1M task records, 5k day
+summaries, all departments at level 20).
+"""
+import random
+
+from ..services.engine_service import generate_employee, EMPLOYEE_TYPES, TASK_TYPES, DEPARTMENTS
+from ..services.state_service import get_default_state
+
+EMPLOYEES = 10000
+TASKS = 1000000
+DAYS = 5000
+DEPARTMENT_LEVEL = 20
+
+
+def synthetic_state(scale=1.0, seed=0):
+    """Return a large legacy state (see module docstring)."""
+    rng = random.Random(seed)
+    employees = max(1, int(EMPLOYEES * scale))
+    tasks = max(1, int(TASKS * scale))
+    days = max(1, int(DAYS * scale))
+
+    state = get_default_state()
+    del state['historyAggregates']
+    del state['aggregates']
+    state['day'] = days
+    state['level'] = 50
+    # Görev/gün sonu benchmark'ları enerji veya nakit bitmeden tekrar tekrar çalışabilsin
+    state['cash'] = 10 ** 9
+    state['energy'] = state['maxEnergy'] = 10 ** 9
+    state['research'] = 50000
+    state['reputation'] = 20000
+    state['completedTasks'] = tasks
+    state['departments'] = {dept: DEPARTMENT_LEVEL for dept in DEPARTMENTS}
+    state['employees'] = [generate_employee(rng.choice(EMPLOYEE_TYPES), state, rng)
+                          for _ in range(employees)]
+
+    tasks_per_day = max(1, tasks // days)
+    state['taskHistory'] = [
+        {'type': rng.choice(TASK_TYPES), 'reward': rng.randint(50, 400),
+         'day': i // tasks_per_day, 'timestamp': i + 1}
+        for i in range(tasks)
+    ]
+    state['dayHistory'] = [_day_summary(rng, day) for day in range(days)]
+    return state
+
+
+def _day_summary(rng, day):
+    total_cost = round(rng.uniform(5000, 20000), 2)
+    starting_cash = rng.uniform(0, 10 ** 6)
+    ending_cash = starting_cash - total_cost + rng.uniform(0, 25000)
+    return {
+        'previous_day': day,
+        'costs': {'base_cost': 150, 'department_costs': 4000, 'employee_costs': total_cost - 4150,
+                  'total_cost': total_cost, 'market_modifier': round(rng.uniform(0.9, 1.2), 2)},
+        'financial_health': {'score': rng.randint(0, 100)},
+        'research_bonus': rng.randint(0, 500),
+        'energy_restored': 30,
+        'level_up': False,
+        'bankruptcy_message': '',
+        'starting_cash': starting_cash,
+        'ending_cash': ending_cash,
+        'net_change': ending_cash - starting_cash,
+    }
@@ -3,3 +3,116 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, '..', 'data')
 STATE_PATH = os.path.join(DATA_DIR, 'state.json')
+
+# load_state() parse edilmiş state'i bellekte tutar; dosya değişince yeniden okur
+STATE_CACHE_ENABLED = True
+
+# save_state() yazma modu:
+#   'write_behind' - state dirty işaretlenir, STATE_FLUSH_INTERVAL saniye içindeki
+#                    tüm değişiklikler tek seferde (ve kapanışta) diske yazılır
+#   'sync'         - her save_state() çağrısı dosyayı hemen yazar (testler için)
+STATE_WRITE_MODE = 'write_behind'
+STATE_FLUSH_INTERVAL = 1.0
+
+# Journal modu: her save_state() sadece değişen alanları data/journal/ altına
+# ekler; JOURNAL_COMPACT_EVERY kayıtta bir state.json snapshot'ı yazılır
+STATE_JOURNAL_ENABLED = True
+JOURNAL_DIR = os.path.join(DATA_DIR, 'journal')
+JOURNAL_COMPACT_EVERY = 500
+
+# Kalıcı depolama: 'json' (state.json + journal, varsayılan) veya 'sqlite'
+# Mevcut state.json'u aktarmak için: python -m tasktycoon import-sqlite
+STATE_BACKEND = 'json'
+SQLITE_PATH = os.path.join(DATA_DIR, 'state.db')
+
+# Çoklu şirket: istekler X-Company-Id başlığı veya ?company= ile kapsamlanır.
+# 'default' şirketi yukarıdaki yolları kullanır, diğerleri COMPANIES_DIR/<id>/ altında.
+# Bellekte en fazla bu kadar şirket/byte tutulur; fazlası LRU ile (önce diske
+# yazılarak) bellekten atılır
+COMPANIES_DIR = os.path.join(DATA_DIR, 'companies')
+STATE_CACHE_MAX_COMPANIES = 1000
+STATE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# ?response=delta için şirket başına bellekte tutulan önceki state versiyonları;
+# daha eski bir versiyondan delta istenirse tam state döner
+STATE_DELTA_HISTORY = 8
+
+# /api/stream (SSE): son olaylar bu kadar tutulur (Last-Event-ID ile devam için),
+# boşta bağlantıya STREAM_HEARTBEAT_SECONDS'ta bir heartbeat gönderilir ve
+# bağlantı STREAM_MAX_SECONDS sonra kapatılır (EventSource kendisi yeniden bağlanır)
+STREAM_BUFFER_SIZE = 1000
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_MAX_SECONDS = 300
+
+# State içinde tutulan son görev/gün kayıtları; eskiler historyAggregates
+# içindeki gün/tip bazlı count/sum/min/max özetlerine devredilir
+TASK_HISTORY_LIMIT = 500
+DAY_HISTORY_LIMIT = 120
+
+# Tüm görev/gün geçmişi ayrıca data/history/ altında segmentli NDJSON olarak
+# saklanır (sayfalı geçmiş API'leri için); her segment bu kadar kayıt tutar
+HISTORY_DIR = os.path.join(DATA_DIR, 'history')
+HISTORY_SEGMENT_SIZE = 500
+HISTORY_PAGE_LIMIT = 50
+HISTORY_MAX_PAGE_LIMIT = 500
+
+# Gün sonu metrikleri (nakit, itibar, maliyet...) data/metrics/ altında kolon
+# başına bir float64 dosyası olarak tutulur; uzun aralıklar en fazla
+# METRICS_MAX_BUCKETS kovaya (min/max/ort) indirgenir
+METRICS_DIR = os.path.join(DATA_DIR, 'metrics')
+METRICS_MAX_BUCKETS = 500
+# Dashboard büyüme oranı bu kadar günlük pencereden hesaplanır
+GROWTH_WINDOW_DAYS = 7
+
+# Çalışan limiti: hrLevel * EMPLOYEES_PER_HR_LEVEL + BASE_EMPLOYEE_CAP
+EMPLOYEES_PER_HR_LEVEL = 3
+BASE_EMPLOYEE_CAP = 2
+
+# POST /api/tasks/batch ile tek istekte çalıştırılabilecek en fazla görev sayısı
+TASK_BATCH_LIMIT = 500
+
+# /api/dashboard/predictions Monte Carlo tahmini (numpy gerekir): varsayılan
+# ufuk/yol sayısı, üst sınırlar ve bir günde mini event olma olasılığı
+FORECAST_DAYS = 30
+FORECAST_MAX_DAYS = 120
+FORECAST_PATHS = 10000
+FORECAST_MAX_PATHS = 50000
+FORECAST_EVENT_CHANCE = 0.1
+
+# Balance sweep (python -m tasktycoon sweep): oynanan her oyunun sonucu
+# (parametreler, politika, gün, seed) anahtarıyla bu dosyada saklanır
+SWEEP_DIR = os.path.join(DATA_DIR, 'sweeps')
+SWEEP_CACHE_PATH = os.path.join(SWEEP_DIR, 'cache.ndjson')
+
+# /api/planner/suggest: ışın genişliği, bir plandaki en fazla eylem, istek
+# başına süre bütçesi ve plan puanında XP / itibar puanının TL karşılığı
+PLANNER_BEAM_WIDTH = 8
+PLANNER_MAX_ACTIONS = 12
+PLANNER_TIME_BUDGET_MS = 250
+PLANNER_XP_VALUE = 2
+PLANNER_REPUTATION_VALUE = 10
+
+# Aynı state versiyonu için EconomicSystem sonuçlarını paylaşan memo sayısı
+# (şirket, versiyon başına bir tane; LRU)
+ECONOMIC_CONTEXT_CACHE_SIZE = 256
+
+# İstek kaydı (varsayılan kapalı; python -m tasktycoon --record ile de açılır):
+# /api/ istekleri istek başına RNG tohumuyla birlikte NDJSON olarak eklenir,
+# python -m tasktycoon replay <dosya> yeni bir depoda aynı sırayla tekrar oynatır
+REQUEST_RECORDING = False
+RECORDINGS_DIR = os.path.join(DATA_DIR, 'recordings')
+REQUEST_RECORD_PATH = os.path.join(RECORDINGS_DIR, 'requests.ndjson')
+
+# Benchmark sonuçları (python -m tasktycoon bench): JSON dosyaları bu klasörde
+# tutulur; karşılaştırmada medyan süresi bu orandan fazla artan benchmark
+# gerileme sayılır
+BENCHMARK_DIR = os.path.join(DATA_DIR, 'benchmarks')
+BENCHMARK_REGRESSION_THRESHOLD = 0.2
+
+# İstek zamanlaması: /metrics (Prometheus) için endpoint başına süre
+# histogramları (saniye, üst sınırlar; +Inf ayrıca eklenir) ve
+# /api/debug/slow için saklanan son istek sayısı / varsayılan listelenen sayı
+TIMING_ENABLED = True
+TIMING_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SLOW_REQUEST_BUFFER = 500
+SLOW_REQUEST_LIMIT = 20
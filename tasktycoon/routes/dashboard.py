@@ -1,12 +1,22 @@
 from flask import Blueprint, jsonify, request
-from ..services.state_service import load_state
-from ..services.economic_service import EconomicSystem
+from .state import state_etag
+from ..services.state_service import (load_state, load_day_history, get_current_company,
+                                      history_page, read_metrics)
+from ..services.metrics_service import COLUMNS as METRIC_COLUMNS
+from ..services.economic_service import EconomicSystem, economic_context
+from ..services.history_service import task_reward_stats
+from ..services.employee_service import average_efficiency, get_max_employees
+from ..services import forecast_service
+from ..config import (BASE_EMPLOYEE_CAP, FORECAST_DAYS, FORECAST_MAX_DAYS,
+                      FORECAST_PATHS, FORECAST_MAX_PATHS, HISTORY_PAGE_LIMIT,
+                      HISTORY_MAX_PAGE_LIMIT, METRICS_MAX_BUCKETS, GROWTH_WINDOW_DAYS)
 import json
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
 # Kullanıcı başarımlarını döndüren endpoint
 @dashboard_bp.route('/api/achievements', methods=['GET'])
+@state_etag
 def get_achievements():
     state = load_state()
     ach = state.get('achievements', {})
@@ -27,15 +37,17 @@ def get_achievements():
     })
 
 @dashboard_bp.route('/api/dashboard/stats', methods=['GET'])
+@state_etag
 def get_dashboard_stats():
     """Get comprehensive dashboard statistics with economic analysis"""
     try:
         state = load_state()
         
         # Calculate economic health
-        economic_system = EconomicSystem()
-        financial_health = economic_system.get_financial_health(state)
-        daily_costs = economic_system.calculate_daily_costs(state)
+        economics = economic_context(state, get_current_company())
+        financial_health = economics.financial_health()
+        daily_costs = economics.daily_costs()
+        daily_income = _estimate_daily_income(state)
         
         # Department statistics
         department_stats = {}
@@ -43,13 +55,7 @@ def get_dashboard_stats():
         
         for dept in ['engLevel', 'rndLevel', 'hrLevel', 'salesLevel']:
             level = state['departments'].get(dept, 0)
-            dept_value = 0
-            
-            if level > 0:
-                setup_cost = EconomicSystem.DEPARTMENT_COSTS[dept]['setup']
-                upgrade_costs = sum(EconomicSystem.calculate_upgrade_cost(dept, i) 
-                                  for i in range(max(0, level-1)))
-                dept_value = setup_cost + upgrade_costs
+            dept_value = EconomicSystem.department_value(dept, level)
             
             department_stats[dept] = {
                 'level': level,
@@ -63,16 +69,16 @@ def get_dashboard_stats():
         employee_stats = {
             'total_employees': len(state.get('employees', [])),
             'max_employees': _calculate_max_employees(state),
-            'total_salaries': sum(emp.get('salary', 500) for emp in state.get('employees', [])),
+            'total_salaries': state['aggregates']['salaryTotal'],
             'efficiency_bonus': _calculate_team_efficiency(state)
         }
         
         # Financial overview
         financial_overview = {
             'current_cash': state['cash'],
-            'daily_income_potential': _estimate_daily_income(state),
+            'daily_income_potential': daily_income,
             'daily_expenses': daily_costs['total_cost'],
-            'net_daily_flow': _estimate_daily_income(state) - daily_costs['total_cost'],
+            'net_daily_flow': daily_income - daily_costs['total_cost'],
             'financial_health': financial_health,
             'runway_days': financial_health.get('runway_days', 0)
         }
@@ -118,29 +124,39 @@ def get_dashboard_stats():
 
 @dashboard_bp.route('/api/dashboard/predictions', methods=['GET'])
 def get_predictions():
-    """Get financial predictions and recommendations"""
+    """Get financial predictions and recommendations
+
+    ?days= horizon (default FORECAST_DAYS), ?paths= Monte Carlo paths,
+    ?seed= for a reproducible forecast.
+    """
     try:
         state = load_state()
-        economic_system = EconomicSystem()
-        
-        # Calculate predictions for next 7 days
+        days = min(max(int(request.args.get('days', FORECAST_DAYS)), 1), FORECAST_MAX_DAYS)
+        paths = min(max(int(request.args.get('paths', FORECAST_PATHS)), 100), FORECAST_MAX_PATHS)
+        seed = request.args.get('seed', type=int)
+
+        if not forecast_service.available():
+            predictions = _deterministic_predictions(state, days)
+            return jsonify({
+                'success': True,
+                'predictions': predictions,
+                'recommendations': _generate_recommendations(state, predictions)
+            })
+
+        forecast = forecast_service.forecast(state, days=days, paths=paths, seed=seed)
+        income = forecast['expected_daily_income']
         predictions = []
-        current_cash = state['cash']
-        
-        for day in range(1, 8):
-            daily_costs = economic_system.calculate_daily_costs(state)['total_cost']
-            estimated_income = _estimate_daily_income(state)
-            net_flow = estimated_income - daily_costs
-            current_cash += net_flow
-            
+        previous = state['cash']
+        for row in forecast['daily']:
             predictions.append({
-                'day': day,
-                'estimated_cash': max(0, current_cash),
-                'income': estimated_income,
-                'expenses': daily_costs,
-                'net_flow': net_flow,
-                'status': 'healthy' if current_cash > daily_costs * 3 else 'warning' if current_cash > 0 else 'critical'
+                'day': row['day'],
+                'estimated_cash': max(0, row['p50']),
+                'income': income,
+                'expenses': row['expected_cost'],
+                'net_flow': row['p50'] - previous,
+                'status': 'healthy' if row['p50'] > row['expected_cost'] * 3 else 'warning' if row['p50'] > 0 else 'critical'
             })
+            previous = row['p50']
         
         # Generate recommendations
         recommendations = _generate_recommendations(state, predictions)
@@ -148,6 +164,7 @@ def get_predictions():
         return jsonify({
             'success': True,
             'predictions': predictions,
+            'forecast': forecast,
             'recommendations': recommendations
         })
     
@@ -158,19 +175,37 @@ def get_predictions():
             'error_type': type(e).__name__
         }), 500
 
+def _deterministic_predictions(state, days):
+    """Fallback estimate without numpy: same costs/income every day"""
+    predictions = []
+    current_cash = state['cash']
+    daily_costs = economic_context(state, get_current_company()).daily_costs()['total_cost']
+    estimated_income = _estimate_daily_income(state)
+    net_flow = estimated_income - daily_costs
+    
+    for day in range(1, days + 1):
+        current_cash += net_flow
+        predictions.append({
+            'day': day,
+            'estimated_cash': max(0, current_cash),
+            'income': estimated_income,
+            'expenses': daily_costs,
+            'net_flow': net_flow,
+            'status': 'healthy' if current_cash > daily_costs * 3 else 'warning' if current_cash > 0 else 'critical'
+        })
+    return predictions
+
 def _calculate_max_employees(state):
     """Calculate maximum employees based on HR level"""
     hr_level = state['departments'].get('hrLevel', 0)
-    return hr_level * 3 + 2 if hr_level > 0 else 2
+    return get_max_employees(state) if hr_level > 0 else BASE_EMPLOYEE_CAP
 
 def _calculate_team_efficiency(state):
     """Calculate team efficiency bonus"""
-    employees = state.get('employees', [])
-    if not employees:
+    if not state.get('employees'):
         return 0
     
-    total_efficiency = sum(emp.get('efficiency', 50) for emp in employees)
-    avg_efficiency = total_efficiency / len(employees)
+    avg_efficiency = average_efficiency(state)
     return (avg_efficiency - 50) / 100  # Convert to bonus percentage
 
 def _estimate_daily_income(state):
@@ -198,23 +233,17 @@ def _calculate_success_rate(state):
     return (completed / (completed + failed)) * 100
 
 def _calculate_average_reward(state):
-    """Calculate average task reward"""
-    task_history = state.get('taskHistory', [])
-    if not task_history:
+    """Calculate average task reward over the whole game"""
+    stats = task_reward_stats(state)
+    if not stats['count']:
         return 0
     
-    total_rewards = sum(task.get('reward', 0) for task in task_history)
-    return total_rewards / len(task_history)
+    return stats['sum'] / stats['count']
 
 def _calculate_growth_rate(state):
-    """Calculate company growth rate based on recent performance"""
-    # This would ideally use historical data
-    # For now, estimate based on current capabilities
-    department_count = sum(1 for dept in ['engLevel', 'rndLevel', 'hrLevel', 'salesLevel'] 
-                          if state['departments'].get(dept, 0) > 0)
-    employee_count = len(state.get('employees', []))
-    
-    return min(100, (department_count * 20) + (employee_count * 5))
+    """Average daily cash growth (%) over the last GROWTH_WINDOW_DAYS days"""
+    rate = read_metrics(lambda series: series.growth_rate('cash', GROWTH_WINDOW_DAYS))
+    return round(rate * 100, 2) if rate is not None else 0
 
 def _generate_recommendations(state, predictions):
     """Generate actionable recommendations based on financial analysis"""
@@ -242,9 +271,8 @@ def _generate_recommendations(state, predictions):
         })
     
     # Check employee efficiency
-    employees = state.get('employees', [])
-    if employees:
-        avg_efficiency = sum(emp.get('efficiency', 50) for emp in employees) / len(employees)
+    if state.get('employees'):
+        avg_efficiency = average_efficiency(state)
         if avg_efficiency < 60:
             recommendations.append({
                 'type': 'optimization',
@@ -258,20 +286,99 @@ def _generate_recommendations(state, predictions):
 
 # Simple history endpoint to fetch last N day summaries
 @dashboard_bp.route('/api/history', methods=['GET'])
+@state_etag
 def get_history():
+    """Last ?n= day summaries, or a page of the full day history when
+    ?cursor= or ?limit= is given (see get_task_history)."""
+    if 'cursor' in request.args or 'limit' in request.args:
+        return _history_page_response('days', 'history')
     try:
         n = int(request.args.get('n', 7))
     except Exception:
         n = 7
 
-    state = load_state()
-    history = state.get('dayHistory', []) or []
-
     # Return the last n entries (most recent last)
-    recent = history[-n:]
+    recent = load_day_history(n)
 
     return jsonify({
         'success': True,
         'count': len(recent),
         'history': recent
     })
+
+
+@dashboard_bp.route('/api/history/tasks', methods=['GET'])
+@state_etag
+def get_task_history():
+    """Cursor-paginated task history of the whole game
+
+    ?limit= page size, ?cursor= the next_cursor of the previous page,
+    ?order=desc (newest first, default) or asc, ?type= task type,
+    ?from_day= / ?to_day= inclusive day range.
+    """
+    return _history_page_response('tasks', 'tasks')
+
+def _history_page_response(stream, key):
+    try:
+        limit = min(max(int(request.args.get('limit', HISTORY_PAGE_LIMIT)), 1), HISTORY_MAX_PAGE_LIMIT)
+        cursor = request.args.get('cursor')
+        cursor = int(cursor) if cursor not in (None, '') else None
+        from_day = request.args.get('from_day', type=int)
+        to_day = request.args.get('to_day', type=int)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Geçersiz parametre'}), 400
+    order = request.args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        return jsonify({'success': False, 'error': 'order asc veya desc olmalı'}), 400
+
+    page = history_page(stream, cursor=cursor, limit=limit, order=order,
+                        record_type=request.args.get('type') if stream == 'tasks' else None,
+                        from_day=from_day, to_day=to_day)
+    return jsonify({
+        'success': True,
+        'count': len(page['items']),
+        'total': page['total'],
+        'next_cursor': page['next_cursor'],
+        key: page['items']
+    })
+
+
+@dashboard_bp.route('/api/metrics', methods=['GET'])
+@state_etag
+def get_metrics():
+    """Per-day metric series for charts
+
+    ?columns=cash,reputation (default: all), ?from_day= / ?to_day= inclusive
+    range, ?buckets=N downsamples long ranges into min/max/avg buckets.
+    """
+    columns = [c for c in request.args.get('columns', ','.join(METRIC_COLUMNS[1:])).split(',') if c]
+    unknown = [c for c in columns if c not in METRIC_COLUMNS]
+    if unknown:
+        return jsonify({'success': False, 'error': f'Bilinmeyen metrik: {", ".join(unknown)}'}), 400
+    try:
+        from_day = request.args.get('from_day', type=int)
+        to_day = request.args.get('to_day', type=int)
+        buckets = request.args.get('buckets')
+        buckets = min(max(int(buckets), 1), METRICS_MAX_BUCKETS) if buckets else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Geçersiz parametre'}), 400
+
+    result = read_metrics(lambda series: series.query(columns, from_day, to_day, buckets))
+    return jsonify({'success': True, **result})
+
+@dashboard_bp.route('/api/metrics/growth', methods=['GET'])
+@state_etag
+def get_metric_growth():
+    """Average daily growth of ?column= (default cash) over the last ?window= days"""
+    column = request.args.get('column', 'cash')
+    if column not in METRIC_COLUMNS or column == 'day':
+        return jsonify({'success': False, 'error': f'Bilinmeyen metrik: {column}'}), 400
+    window = min(max(request.args.get('window', GROWTH_WINDOW_DAYS, type=int), 2), 365)
+    rate = read_metrics(lambda series: series.growth_rate(column, window))
+    return jsonify({
+        'success': True,
+        'column': column,
+        'window': window,
+        'daily_growth': rate,
+        'daily_growth_percent': round(rate * 100, 2) if rate is not None else None
+    })
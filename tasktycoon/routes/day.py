@@ -1,207 +1,59 @@
 from flask import Blueprint, jsonify
-from datetime import datetime
-from ..services.state_service import load_state, save_state, apply_random_event
-from ..services.economic_service import EconomicSystem
+from .state import state_payload, state_etag, mutate_state
+from ..services.state_service import load_state, get_current_company
+from ..services.economic_service import economic_context
+from ..services.engine_service import (end_day as engine_end_day,
+                                       restore_energy as engine_restore_energy,
+                                       TASK_TYPES)
 
 day_bp = Blueprint('day', __name__)
 
 @day_bp.route('/api/day/end', methods=['POST'])
 def end_day():
-    # Oyun sonu kontrolü
-    game_over = None
-    # İflas: nakit -1000 TL'ye eşit veya daha düşükse
-    if state.get('cash', 0) <= -1000:
-        game_over = {
-            'reason': 'İflas',
-            'desc': 'Şirketiniz iflas etti! Nakit -1000 TL seviyesine düştü.'
-        }
-    # Hedef: 100.000 TL veya 60 gün (örnek)
-    elif state.get('cash', 0) >= 100000:
-        game_over = {
-            'reason': 'Zenginlik',
-            'desc': 'Tebrikler! 100.000 TL kasaya ulaştınız, oyunu başarıyla tamamladınız.'
-        }
-    elif state.get('day', 0) >= 60:
-        game_over = {
-            'reason': '60 Gün Tamamlandı',
-            'desc': '60 gün boyunca şirketinizi yönettiniz. Tebrikler!'
-        }
-    state = load_state()
-    
-    # Snapshot cash before end-of-day processing (represents cash before daily costs applied)
-    starting_cash = state.get('cash', 0)
-
-    # Calculate economic costs using new system
-    daily_costs = EconomicSystem.calculate_daily_costs(state)
-    total_cost = daily_costs['total_cost']
-    
-    # Apply daily costs
-    state['cash'] -= total_cost
-    
-    # Calculate financial health
-    financial_health = EconomicSystem.get_financial_health(state)
-    
-    # Bankruptcy check
-    if state['cash'] < 0:
-        bankruptcy_penalty = abs(state['cash']) * 0.1  # 10% penalty for going negative
-        state['cash'] = max(-1000, state['cash'])  # Minimum debt limit
-        state['reputation'] -= 5  # Reputation hit
-        bankruptcy_message = f"DİKKAT: Nakit eksi! {bankruptcy_penalty:.0f} TL ceza, -5 İtibar"
-    else:
-        bankruptcy_message = ""
-
-    # Research bonus to reputation
-    research_bonus = int(state['research'] / 10)
-    state['reputation'] += research_bonus
-
-    # Level up system
-    current_level = state.get('level', 1)
-    level_up_cost = 50 * current_level
-
-    level_up_happened = False
-    if state['xp'] >= level_up_cost:
-        state['xp'] -= level_up_cost
-        new_level = current_level + 1
-        state['level'] = new_level
-        level_up_happened = True
-        
-        # Level up benefits
-        energy_bonus = 10
-        state['maxEnergy'] += energy_bonus
-        state['energy'] = min(state['maxEnergy'], state['energy'] + energy_bonus)
-
-    # Energy restoration (based on company level and facilities)
-    base_energy_restore = int(state['maxEnergy'] * 0.3)
-    hr_bonus = state['departments'].get('hrLevel', 0) * 5  # HR improves work-life balance
-    total_energy_restore = base_energy_restore + hr_bonus
-    
-    state['energy'] = min(state['maxEnergy'], state['energy'] + total_energy_restore)
-    
-    # Advance day
-    state['day'] += 1
-
-    # --- BAŞARIM KONTROLÜ ---
-    def check_achievements(state):
-        unlocked = state.get('achievements', {}).get('unlocked', {})
-        all_achs = state.get('achievements', {}).get('all', [])
-        new_achievements = []
-        now = datetime.now().isoformat(timespec='seconds')
-        for ach in all_achs:
-            cond = ach.get('condition', {})
-            ok = True
-            for k, v in cond.items():
-                if k == 'day' and state.get('day', 0) < v:
-                    ok = False
-                elif k == 'employee_count' and len(state.get('employees', [])) < v:
-                    ok = False
-                elif k == 'department_count' and sum(1 for d in state.get('departments', {}).values() if d > 0) < v:
-                    ok = False
-                elif k == 'cash' and state.get('cash', 0) < v:
-                    ok = False
-                elif k == 'completedTasks' and state.get('completedTasks', 0) < v:
-                    ok = False
-            if ok and ach['id'] not in unlocked:
-                state['achievements']['unlocked'][ach['id']] = now
-                new_achievements.append({"id": ach['id'], "name": ach['name'], "unlocked_at": now})
-        return new_achievements
-
-    new_achievements = check_achievements(state)
-
-    # Day summary with detailed economic breakdown
-    day_summary = {
-        'previous_day': state['day'] - 1,
-        'costs': {
-            'base_cost': daily_costs['base_cost'],
-            'department_costs': daily_costs['department_costs'],
-            'employee_costs': daily_costs['employee_costs'],
-            'total_cost': total_cost,
-            'market_modifier': daily_costs['market_modifier']
-        },
-        'financial_health': financial_health,
-        'research_bonus': research_bonus,
-        'energy_restored': total_energy_restore,
-        'level_up': level_up_happened,
-        'bankruptcy_message': bankruptcy_message
-    }
-
-    # Add starting/ending cash snapshot so frontend can show income/expense/net
-    ending_cash = state.get('cash', 0)
-    day_summary['starting_cash'] = starting_cash
-    day_summary['ending_cash'] = ending_cash
-    day_summary['net_change'] = ending_cash - starting_cash
-
-    # Gün sonunda yeni başarımlar varsa day_summary'ye ekle
-    if new_achievements:
-        day_summary['new_achievements'] = new_achievements
-
-
-    # Game over bilgisini day_summary'ye ekle
-    if game_over:
-        day_summary['game_over'] = game_over
-
-    # Günlük özet geçmişine ekle
-    if 'dayHistory' not in state:
-        state['dayHistory'] = []
-    state['dayHistory'].append(day_summary)
-
-    save_state(state)
+    state, day_summary = mutate_state(engine_end_day, event='day_ended')
 
     return jsonify({
         'success': True,
-        'message': f"Gün {day_summary['previous_day']} tamamlandı! Toplam maliyet: {total_cost:.0f} TL",
-        'state': state,
+        'message': f"Gün {day_summary['previous_day']} tamamlandı! Toplam maliyet: {day_summary['costs']['total_cost']:.0f} TL",
+        **state_payload(state),
         'day_summary': day_summary
     })
 
 @day_bp.route('/api/energy/restore', methods=['POST']) 
 def restore_energy():
     """Restore energy during the day (costs money)"""
-    state = load_state()
-    
-    # Energy restoration cost based on company level
-    restore_cost = 50 * state.get('level', 1)
-    
-    if state['cash'] < restore_cost:
-        return jsonify({
-            'success': False,
-            'error': f'Yetersiz nakit! Gerekli: {restore_cost} TL'
-        }), 400
-    
-    # Restore 50% energy
-    energy_restore = int(state['maxEnergy'] * 0.5)
-    state['energy'] = min(state['maxEnergy'], state['energy'] + energy_restore)
-    state['cash'] -= restore_cost
-    
-    save_state(state)
-    
+    state, result = mutate_state(engine_restore_energy, event='energy_restored')
+
     return jsonify({
         'success': True,
-        'message': f'Enerji yenilendi! +{energy_restore} Enerji, -{restore_cost} TL',
-        'energy_restored': energy_restore,
-        'cost': restore_cost,
-        'state': state
+        'message': f"Enerji yenilendi! +{result['energy_restored']} Enerji, -{result['cost']} TL",
+        'energy_restored': result['energy_restored'],
+        'cost': result['cost'],
+        **state_payload(state)
     })
 
 @day_bp.route('/api/economics/overview', methods=['GET'])
+@state_etag
 def economics_overview():
     """Get comprehensive economic overview"""
     state = load_state()
+    economics = economic_context(state, get_current_company())
     
     # Daily costs breakdown
-    daily_costs = EconomicSystem.calculate_daily_costs(state)
+    daily_costs = economics.daily_costs()
     
     # Financial health
-    financial_health = EconomicSystem.get_financial_health(state)
+    financial_health = economics.financial_health()
     
     # Task economics preview
     task_preview = {}
-    for task_type in ['work', 'research', 'network']:
-        task_preview[task_type] = EconomicSystem.calculate_task_reward(task_type, state)
+    for task_type in TASK_TYPES:
+        task_preview[task_type] = economics.task_reward(task_type)
     
     # Employee efficiency
     employee_efficiency = []
     for emp in state['employees']:
-        eff = EconomicSystem.calculate_employee_efficiency(emp, state)
+        eff = economics.employee_efficiency(emp)
         employee_efficiency.append({
             'name': emp['name'],
             'efficiency': eff
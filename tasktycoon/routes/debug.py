@@ -0,0 +1,31 @@
+from flask import Blueprint, Response, jsonify, request
+from ..services.state_service import get_state_sizes
+from ..services import timing_service
+from ..config import SLOW_REQUEST_BUFFER, SLOW_REQUEST_LIMIT
+
+debug_bp = Blueprint('debug', __name__)
+
+@debug_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrikleri: endpoint/faz başına süre histogramları,
+    istek sayıları, istek/cevap byte'ları ve şirket başına state boyutları"""
+    return Response(timing_service.render_prometheus(get_state_sizes()),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@debug_bp.route('/api/debug/slow', methods=['GET'])
+def slow_requests():
+    """Son isteklerin en yavaşları, faz (state_load/compute/state_save/serialize) dökümüyle
+
+    ?n= kaç istek listeleneceği (varsayılan SLOW_REQUEST_LIMIT).
+    """
+    try:
+        n = min(max(int(request.args.get('n', SLOW_REQUEST_LIMIT)), 1), SLOW_REQUEST_BUFFER)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Geçersiz parametre'}), 400
+    requests, observed = timing_service.slowest(n)
+    return jsonify({
+        'success': True,
+        'observed': observed,
+        'buffer_size': SLOW_REQUEST_BUFFER,
+        'requests': requests
+    })
@@ -1,68 +1,40 @@
 from flask import Blueprint, request, jsonify
-from ..services.state_service import load_state, save_state
+from .state import state_payload, mutate_state
+from ..services.state_service import load_state
 from ..services.economic_service import EconomicSystem
+from ..services.engine_service import upgrade, DEPARTMENTS
+from ..config import BASE_EMPLOYEE_CAP, EMPLOYEES_PER_HR_LEVEL
 
 department_bp = Blueprint('department', __name__)
 
 @department_bp.route('/api/department/<dept_type>/upgrade', methods=['POST'])
 def upgrade_department(dept_type):
     """Upgrade department using new economic system"""
-    valid_departments = ['engLevel', 'rndLevel', 'hrLevel', 'salesLevel']
-    
-    if dept_type not in valid_departments:
+    if dept_type not in DEPARTMENTS:
         return jsonify({'success': False, 'error': 'Geçersiz departman tipi'}), 400
 
-    state = load_state()
-    current_level = state['departments'].get(dept_type, 0)
-    
-    # Calculate upgrade cost using economic system
-    upgrade_cost = EconomicSystem.calculate_upgrade_cost(dept_type, current_level)
-    
-    if upgrade_cost is None:
-        return jsonify({'success': False, 'error': 'Maliyet hesaplanamadı'}), 400
-    
-    # Check if department needs to be unlocked first
-    if current_level == 0:
-        setup_cost = EconomicSystem.DEPARTMENT_COSTS[dept_type]['setup']
-        total_cost = setup_cost
-        action = 'açıldı'
-    else:
-        total_cost = upgrade_cost
-        action = f'seviye {current_level + 1}\'e yükseltildi'
-    
-    # Check cash availability
-    if state['cash'] < total_cost:
-        return jsonify({
-            'success': False, 
-            'error': f'Yetersiz nakit! Gerekli: {total_cost:.0f} TL, Mevcut: {state["cash"]:.0f} TL'
-        }), 400
-
-    # Apply upgrade
-    state['cash'] -= total_cost
-    state['departments'][dept_type] += 1
-    new_level = state['departments'][dept_type]
+    state, result = mutate_state(lambda state: upgrade(state, dept_type),
+                                 event='department_upgraded')
+    new_level = result['new_level']
     
     # Calculate benefits of upgrade
     benefits = _calculate_department_benefits(dept_type, new_level)
     
-    save_state(state)
-    
     return jsonify({
         'success': True,
-        'message': f'{dept_type} departmanı {action}! Maliyet: {total_cost:.0f} TL',
+        'message': f"{dept_type} departmanı {result['action']}! Maliyet: {result['cost']:.0f} TL",
         'department': dept_type,
         'new_level': new_level,
-        'cost': total_cost,
+        'cost': result['cost'],
         'benefits': benefits,
-        'state': state
+        'new_achievements': result['new_achievements'],
+        **state_payload(state)
     })
 
 @department_bp.route('/api/department/<dept_type>/cost', methods=['GET'])
 def get_upgrade_cost(dept_type):
     """Get upgrade cost for a department"""
-    valid_departments = ['engLevel', 'rndLevel', 'hrLevel', 'salesLevel']
-    
-    if dept_type not in valid_departments:
+    if dept_type not in DEPARTMENTS:
         return jsonify({'error': 'Geçersiz departman tipi'}), 400
         
     state = load_state()
@@ -95,7 +67,7 @@ def departments_overview():
     state = load_state()
     overview = {}
     
-    for dept_type in ['engLevel', 'rndLevel', 'hrLevel', 'salesLevel']:
+    for dept_type in DEPARTMENTS:
         current_level = state['departments'].get(dept_type, 0)
         
         if current_level == 0:
@@ -134,7 +106,7 @@ def _calculate_department_benefits(dept_type, level):
         }
     elif dept_type == 'hrLevel':
         benefits = {
-            'employee_limit': f"Maksimum {level * 3 + 2} çalışan",
+            'employee_limit': f"Maksimum {level * EMPLOYEES_PER_HR_LEVEL + BASE_EMPLOYEE_CAP} çalışan",
             'energy_bonus': f"+{level * 5} günlük enerji yenileme",
             'description': "İnsan kaynakları ve çalışan yönetimi"
         }
@@ -1,17 +1,20 @@
 from flask import Blueprint, request, jsonify
-from ..services.state_service import load_state, save_state
-from ..services.employee_service import get_next_employee_id, get_max_employees
+from .state import state_payload, mutate_state
+from ..services.state_service import load_employees
+from ..services.engine_service import GameRuleError
+from ..services import achievement_service
+from ..services.employee_service import (get_next_employee_id, get_max_employees,
+                                         on_employee_added, on_employee_removed,
+                                         get_roster)
 
 employees_bp = Blueprint('employees', __name__)
 
 @employees_bp.route('/api/employees', methods=['GET'])
 def list_employees():
-    state = load_state()
-    return jsonify({"employees": state["employees"]})
+    return jsonify({"employees": load_employees()})
 
 @employees_bp.route('/api/employees', methods=['POST'])
 def add_employee():
-    state = load_state()
     data = request.get_json()
     name = data.get("name")
     role = data.get("role")
@@ -20,26 +23,35 @@ def add_employee():
         return jsonify({"error": "name, role ve salary zorunlu"}), 400
     if not isinstance(salary, (int, float)) or salary <= 0:
         return jsonify({"error": "salary pozitif sayı olmalı"}), 400
-    if state["departments"]["hrLevel"] == 0:
-        return jsonify({"error": "İK departmanı açılmadan çalışan eklenemez"}), 400
-    if len(state["employees"]) >= get_max_employees(state):
-        return jsonify({"error": "Maksimum çalışan sayısına ulaşıldı"}), 400
-    if state["cash"] < salary:
-        return jsonify({"error": "Yetersiz nakit (ilk maaş peşin ödenir)"}), 400
-    state["cash"] -= salary
-    emp_id = get_next_employee_id(state)
-    employee = {"id": emp_id, "name": name, "role": role, "salary": salary}
-    state["employees"].append(employee)
-    save_state(state)
-    return jsonify({"message": "Çalışan eklendi", "employee": employee, "state": state})
+
+    def add(state):
+        if state["departments"]["hrLevel"] == 0:
+            raise GameRuleError("İK departmanı açılmadan çalışan eklenemez")
+        if len(state["employees"]) >= get_max_employees(state):
+            raise GameRuleError("Maksimum çalışan sayısına ulaşıldı")
+        if state["cash"] < salary:
+            raise GameRuleError("Yetersiz nakit (ilk maaş peşin ödenir)")
+        state["cash"] -= salary
+        emp_id = get_next_employee_id(state)
+        employee = {"id": emp_id, "name": name, "role": role, "salary": salary}
+        get_roster(state).append(employee)
+        on_employee_added(state, employee)
+        return employee, achievement_service.observe(state, ('employee_count',))
+
+    state, (employee, new_achievements) = mutate_state(add, event='employee_hired')
+    return jsonify({"message": "Çalışan eklendi", "employee": employee,
+                    "new_achievements": new_achievements, **state_payload(state)})
 
 @employees_bp.route('/api/employees/<int:emp_id>', methods=['DELETE'])
 def remove_employee(emp_id):
-    state = load_state()
-    employees = state["employees"]
-    employee = next((e for e in employees if e["id"] == emp_id), None)
-    if not employee:
-        return jsonify({"error": "Çalışan bulunamadı"}), 404
-    employees.remove(employee)
-    save_state(state)
-    return jsonify({"message": "Çalışan çıkarıldı", "employee": employee, "state": state})
+    def remove(state):
+        roster = get_roster(state)
+        employee = roster.get(emp_id)
+        if not employee:
+            raise GameRuleError("Çalışan bulunamadı", status=404)
+        roster.remove(emp_id)
+        on_employee_removed(state, employee)
+        return employee
+
+    state, employee = mutate_state(remove, event='employee_fired')
+    return jsonify({"message": "Çalışan çıkarıldı", "employee": employee, **state_payload(state)})
@@ -1,6 +1,8 @@
 
 from flask import Blueprint, request, jsonify
+from .state import state_payload, if_match_version
 from ..services.state_service import load_state, save_state, get_default_state
+from ..services.employee_service import rebuild_aggregates
 
 manage_bp = Blueprint('manage', __name__)
 
@@ -8,24 +10,29 @@ manage_bp = Blueprint('manage', __name__)
 def reset_all():
     """Tüm kullanıcı girdilerini ve state'i sıfırla"""
     default_state = get_default_state()
-    save_state(default_state)
-    return jsonify({'success': True, 'message': 'Tüm state sıfırlandı', 'state': default_state})
+    save_state(default_state, event='state_reset', expected_version=if_match_version())
+    return jsonify({'success': True, 'message': 'Tüm state sıfırlandı', **state_payload(default_state)})
 
 @manage_bp.route('/api/save', methods=['POST'])
 def manual_save():
     state = request.get_json()
     if not state:
         return jsonify({'error': 'State JSON body gereklidir'}), 400
-    save_state(state)
-    return jsonify({'message': 'State kaydedildi', 'state': state})
+    # İstemciden gelen state'in özetlerine güvenme
+    rebuild_aggregates(state)
+    if isinstance(state.get('achievements'), dict):
+        # Başarım eşikleri bir sonraki kontrolde baştan hesaplanır
+        state['achievements'].pop('next', None)
+    save_state(state, event='state_saved', expected_version=if_match_version())
+    return jsonify({'message': 'State kaydedildi', **state_payload(state)})
 
 @manage_bp.route('/api/load', methods=['GET'])
 def manual_load():
     state = load_state()
-    return jsonify({'message': 'State yüklendi', 'state': state})
+    return jsonify({'message': 'State yüklendi', **state_payload(state)})
 
 @manage_bp.route('/api/reset', methods=['POST'])
 def manual_reset():
     default_state = get_default_state()
-    save_state(default_state)
-    return jsonify({'message': 'State sıfırlandı', 'state': default_state})
+    save_state(default_state, event='state_reset', expected_version=if_match_version())
+    return jsonify({'message': 'State sıfırlandı', **state_payload(default_state)})
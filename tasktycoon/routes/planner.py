@@ -0,0 +1,31 @@
+from flask import Blueprint, request, jsonify
+from ..services.state_service import load_state
+from ..services import planner_service
+from ..config import PLANNER_BEAM_WIDTH, PLANNER_MAX_ACTIONS, PLANNER_TIME_BUDGET_MS
+
+planner_bp = Blueprint('planner', __name__)
+
+# İstemcinin isteyebileceği üst sınırlar (sunucuyu kilitlememek için)
+MAX_BEAM_WIDTH = 32
+MAX_ACTIONS = 20
+MAX_TIME_BUDGET_MS = 1000
+
+@planner_bp.route('/api/planner/suggest', methods=['GET'])
+def suggest_plans():
+    """Suggest the best action sequences for the rest of the day
+
+    ?top= number of plans, ?beam= beam width, ?depth= max actions,
+    ?budget_ms= time budget (all capped).
+    """
+    try:
+        top = min(max(int(request.args.get('top', 3)), 1), 10)
+        beam = min(max(int(request.args.get('beam', PLANNER_BEAM_WIDTH)), 1), MAX_BEAM_WIDTH)
+        depth = min(max(int(request.args.get('depth', PLANNER_MAX_ACTIONS)), 1), MAX_ACTIONS)
+        budget = min(max(int(request.args.get('budget_ms', PLANNER_TIME_BUDGET_MS)), 10), MAX_TIME_BUDGET_MS)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Geçersiz parametre'}), 400
+
+    state = load_state()
+    result = planner_service.suggest(state, top=top, beam_width=beam,
+                                     max_actions=depth, time_budget_ms=budget)
+    return jsonify({'success': True, **result})
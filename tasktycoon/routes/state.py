@@ -1,9 +1,88 @@
-from flask import Blueprint, jsonify
-from ..services.state_service import load_state
+import re
+import functools
+from flask import Blueprint, jsonify, request, make_response
+from ..services.state_service import (load_state, get_cache_stats, read_journal, state_delta,
+                                      get_state_version, update_state)
 
 state_bp = Blueprint('state', __name__)
 
+_ETAG_VERSION_RE = re.compile(r'^v(\d+)$')
+
+def state_etag(view):
+    """Conditional GET for views whose response only depends on the state.
+
+    The state version is the ETag; a matching If-None-Match is answered with
+    304 before the view runs, so nothing is loaded, computed or serialized.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = f'v{get_state_version()}'
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        # Şirket başlıkla da seçilebildiği için önbellekler başlığa göre ayırmalı
+        response.vary.add('X-Company-Id')
+        response.cache_control.no_cache = True
+        return response
+    return wrapper
+
+def if_match_version():
+    """The state version named by the request's If-Match header.
+
+    None without the header (or for If-Match: *); -1, which never matches,
+    if no tag is a state version.
+    """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    for tag in request.if_match.as_set(include_weak=True):
+        match = _ETAG_VERSION_RE.match(tag)
+        if match:
+            return int(match.group(1))
+    return -1
+
+def mutate_state(mutate, event):
+    """update_state() for a request: retried on version conflicts, except
+    with If-Match, whose version becomes the compare-and-swap's expected one."""
+    return update_state(mutate, event=event, expected_version=if_match_version())
+
+def state_payload(state):
+    """The state part of a mutating endpoint's response.
+
+    ?response=delta&since=N returns journal ops (set/del/append/trim) that
+    turn version N (default: the previous version) into `state`, or the full
+    state if N is no longer kept. ?fields=cash,energy returns only those
+    top-level keys plus 'version'.
+    """
+    version = state.get('version', 0)
+    if request.args.get('response') == 'delta':
+        since = request.args.get('since', version - 1, type=int)
+        ops = state_delta(state, since)
+        if ops is not None:
+            return {'delta': {'since': since, 'version': version, 'ops': ops}}
+    fields = request.args.get('fields')
+    if fields:
+        keys = [key.strip() for key in fields.split(',') if key.strip()] + ['version']
+        return {'state': {key: state[key] for key in keys if key in state}}
+    return {'state': state}
+
 @state_bp.route('/api/state', methods=['GET'])
+@state_etag
 def get_state():
-    state = load_state()
-    return jsonify(state)
+    return jsonify(load_state())
+
+@state_bp.route('/api/state/cache', methods=['GET'])
+def get_state_cache():
+    """State cache hit/miss istatistikleri"""
+    return jsonify({'success': True, 'cache': get_cache_stats()})
+
+@state_bp.route('/api/journal', methods=['GET'])
+def get_journal():
+    """Değişiklik journal'ı; ?day=N ile o günün denetimi yapılabilir"""
+    day = request.args.get('day', type=int)
+    event = request.args.get('event')
+    records = read_journal(day=day, event=event)
+    return jsonify({'success': True, 'count': len(records), 'records': records})
@@ -0,0 +1,61 @@
+import json
+import time
+from flask import Blueprint, Response, request
+from ..services.state_service import get_current_company, get_state_version, company_scope
+from ..services import event_service
+from ..config import STREAM_HEARTBEAT_SECONDS, STREAM_MAX_SECONDS
+
+stream_bp = Blueprint('stream', __name__)
+
+@stream_bp.route('/api/stream', methods=['GET'])
+def stream():
+    """Server-Sent Events: 'state', 'day_ended' and 'achievement_unlocked'
+
+    Resumes after the Last-Event-ID header (or ?last_event_id=); if those
+    events are gone a 'resync' event tells the client to reload the state.
+    """
+    company_id = get_current_company()
+    resume = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        after_id = int(resume) if resume else None
+    except ValueError:
+        after_id = None
+    version = get_state_version()
+
+    def generate():
+        last_id = after_id
+        # Bağlantı kopunca istemci 3 sn sonra yeniden bağlansın
+        yield 'retry: 3000\n\n'
+        if last_id is None:
+            last_id = event_service.last_event_id()
+            yield _format(last_id, 'hello', {'version': version})
+
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < STREAM_MAX_SECONDS:
+            try:
+                events, last_id = event_service.wait_for_events(company_id, last_id,
+                                                                STREAM_HEARTBEAT_SECONDS)
+            except event_service.ResumeGap:
+                last_id = event_service.last_event_id()
+                # Üreteç istek kapsamı dışında çalışır, şirketi yeniden ayarla
+                with company_scope(company_id):
+                    current = get_state_version()
+                yield _format(last_id, 'resync', {'version': current})
+                last_sent = time.monotonic()
+                continue
+            for event_id, _, event_type, data in events:
+                yield _format(event_id, event_type, data)
+            now = time.monotonic()
+            if events:
+                last_sent = now
+            elif now - last_sent >= STREAM_HEARTBEAT_SECONDS:
+                yield ': heartbeat\n\n'
+                last_sent = now
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _format(event_id, event_type, data):
+    return f'id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
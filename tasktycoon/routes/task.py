@@ -1,123 +1,133 @@
 from flask import Blueprint, request, jsonify
-from ..services.state_service import load_state, save_state
-from ..services.economic_service import EconomicSystem
-import random
+from .state import state_payload, mutate_state
+from ..services.state_service import load_state, get_current_company
+from ..services.economic_service import economic_context
+from ..services.engine_service import step_task, GameRuleError, TASK_TYPES
+from ..services.replay_service import request_rng
+from ..config import TASK_BATCH_LIMIT
 
 task_bp = Blueprint('task', __name__)
 
+
+class _NoTaskCompleted(Exception):
+    """A batch could not run any task; nothing is saved."""
+
+    def __init__(self, results):
+        super().__init__()
+        self.results = results
+
+
 @task_bp.route('/api/task', methods=['POST'])
 def execute_task():
     data = request.get_json()
     task_type = data.get('task_type')
 
-    if task_type not in ['work', 'research', 'network']:
+    if task_type not in TASK_TYPES:
         return jsonify({'success': False, 'error': 'Geçersiz görev tipi'}), 400
 
-    state = load_state()
-    
-    # Calculate task economics
-    task_economics = EconomicSystem.calculate_task_reward(task_type, state)
-    
-    if not task_economics:
-        return jsonify({'success': False, 'error': 'Görev hesaplaması başarısız'}), 400
-    
-    # Check energy requirement
-    energy_cost = task_economics['energy_cost']
-    if state['energy'] < energy_cost:
-        return jsonify({
-            'success': False, 
-            'error': f'Yetersiz enerji! Gerekli: {energy_cost}, Mevcut: {state["energy"]}'
-        }), 400
-
-    # Execute task based on type
-    message = ""
-    
-    if task_type == 'work':
-        reward = task_economics['final_reward']
-        state['cash'] += reward
-        state['xp'] += task_economics['xp_reward']
-        message = f"Çalışma tamamlandı! +{reward:.0f} TL, +{task_economics['xp_reward']} XP kazandınız!"
-        
-    elif task_type == 'research':
-        research_points = EconomicSystem.TASK_ECONOMICS['research']['research_points']
-        dept_level = state['departments'].get('rndLevel', 0)
-        final_research = research_points * (1 + dept_level * 0.3)
-        
-        state['research'] += final_research
-        state['xp'] += task_economics['xp_reward']
-        
-        # Breakthrough chance
-        breakthrough_chance = EconomicSystem.TASK_ECONOMICS['research']['breakthrough_chance']
-        if random.random() < breakthrough_chance * (1 + dept_level * 0.1):
-            breakthrough_bonus = random.randint(50, 150)
-            state['cash'] += breakthrough_bonus
-            message = f"Araştırma tamamlandı! +{final_research:.1f} Research, +{task_economics['xp_reward']} XP. BREAKTHROUGH! +{breakthrough_bonus} TL patent geliri!"
-        else:
-            message = f"Araştırma tamamlandı! +{final_research:.1f} Research, +{task_economics['xp_reward']} XP kazandınız!"
-            
-    elif task_type == 'network':
-        reward = task_economics['final_reward']
-        reputation_gain = EconomicSystem.TASK_ECONOMICS['network']['reputation_gain']
-        
-        state['cash'] += reward
-        state['reputation'] += reputation_gain
-        state['xp'] += task_economics['xp_reward']
-        
-        # Client acquisition chance
-        client_chance = EconomicSystem.TASK_ECONOMICS['network']['client_chance']
-        sales_level = state['departments'].get('salesLevel', 0)
-        
-        if random.random() < client_chance * (1 + sales_level * 0.2):
-            client_bonus = random.randint(200, 500)
-            state['cash'] += client_bonus
-            message = f"Networking tamamlandı! +{reward:.0f} TL, +{reputation_gain} İtibar, +{task_economics['xp_reward']} XP. YENİ MÜŞTERİ! +{client_bonus} TL proje geliri!"
-        else:
-            message = f"Networking tamamlandı! +{reward:.0f} TL, +{reputation_gain} İtibar, +{task_economics['xp_reward']} XP kazandınız!"
-
-    # Apply energy cost
-    state['energy'] -= energy_cost
-    state['energy'] = max(0, state['energy'])
-    
-    # Update task history
-    state['completedTasks'] = state.get('completedTasks', 0) + 1
-    
-    # Add to task history
-    task_record = {
-        'type': task_type,
-        'reward': task_economics.get('final_reward', 0),
-        'day': state.get('currentDay', state.get('day', 1)),
-        'timestamp': state.get('completedTasks', 0)
-    }
-    if 'taskHistory' not in state:
-        state['taskHistory'] = []
-    state['taskHistory'].append(task_record)
-    
-    # Calculate efficiency bonuses from employees
-    total_efficiency_bonus = 0
-    for employee in state['employees']:
-        efficiency = EconomicSystem.calculate_employee_efficiency(employee, state)
-        total_efficiency_bonus += efficiency['total_efficiency'] - 1.0
-    
-    if total_efficiency_bonus > 0:
-        efficiency_cash_bonus = int(state.get('cash', 0) * 0.01 * total_efficiency_bonus)
-        if efficiency_cash_bonus > 0:
-            state['cash'] += efficiency_cash_bonus
-            message += f" [Çalışan verimliliği: +{efficiency_cash_bonus} TL]"
+    rng = request_rng()
+    state, result = mutate_state(lambda state: step_task(state, task_type, rng),
+                                 event='task_executed')
+
+    return jsonify({
+        'success': True,
+        'message': result['message'],
+        'task_economics': result['task_economics'],
+        'new_achievements': result['new_achievements'],
+        **state_payload(state)
+    })
+
+@task_bp.route('/api/tasks/batch', methods=['POST'])
+def execute_task_batch():
+    """Run several tasks in one load/save cycle.
+
+    Body is either {"tasks": ["work", "research", ...]} or
+    {"repeat": "work", "until_energy": 20} (repeat while energy stays >= 20).
+    Stops at the first task that cannot be paid for with the remaining energy.
+    """
+    data = request.get_json() or {}
+    tasks = data.get('tasks')
+    repeat = data.get('repeat')
+
+    if tasks is not None:
+        if not isinstance(tasks, list) or not tasks:
+            return jsonify({'success': False, 'error': 'Görev listesi boş olamaz'}), 400
+        if len(tasks) > TASK_BATCH_LIMIT:
+            return jsonify({'success': False, 'error': f'En fazla {TASK_BATCH_LIMIT} görev gönderilebilir'}), 400
+        if any(task_type not in TASK_TYPES for task_type in tasks):
+            return jsonify({'success': False, 'error': 'Geçersiz görev tipi'}), 400
+    elif repeat is not None:
+        if repeat not in TASK_TYPES:
+            return jsonify({'success': False, 'error': 'Geçersiz görev tipi'}), 400
+        try:
+            until_energy = float(data.get('until_energy', 0))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Geçersiz enerji sınırı'}), 400
+    else:
+        return jsonify({'success': False, 'error': 'tasks veya repeat gerekli'}), 400
+
+    rng = request_rng()
+
+    def run_batch(state):
+        results = []
+        new_achievements = []
+        stopped_reason = None
+        while len(results) < TASK_BATCH_LIMIT:
+            if tasks is not None:
+                if len(results) == len(tasks):
+                    break
+                task_type = tasks[len(results)]
+            else:
+                if state['energy'] < until_energy:
+                    stopped_reason = 'energy_limit'
+                    break
+                task_type = repeat
+
+            try:
+                result = step_task(state, task_type, rng)
+            except GameRuleError as e:
+                stopped_reason = 'insufficient_energy'
+                results.append({'task_type': task_type, 'success': False, 'error': str(e)})
+                break
+            task_economics = result['task_economics']
+            new_achievements.extend(result['new_achievements'])
+            results.append({
+                'task_type': task_type,
+                'success': True,
+                'message': result['message'],
+                'reward': task_economics.get('final_reward', 0),
+                'xp_reward': task_economics.get('xp_reward', 0),
+                'energy_cost': task_economics['energy_cost'],
+            })
+
+        if stopped_reason is None and tasks is None:
+            stopped_reason = 'batch_limit'
+        if not any(result['success'] for result in results):
+            raise _NoTaskCompleted(results)
+        return results, new_achievements, stopped_reason
+
+    try:
+        state, (results, new_achievements, stopped_reason) = mutate_state(
+            run_batch, event='task_batch_executed')
+    except _NoTaskCompleted as e:
+        error = e.results[-1]['error'] if e.results else 'Enerji sınırının altında, görev yapılmadı'
+        return jsonify({'success': False, 'error': error, 'results': e.results}), 400
+    completed = sum(1 for result in results if result['success'])
 
-    save_state(state)
-    
     return jsonify({
         'success': True,
-        'message': message,
-        'task_economics': task_economics,
-        'state': state
+        'completed': completed,
+        'stopped_reason': stopped_reason,
+        'results': results,
+        'new_achievements': new_achievements,
+        **state_payload(state)
     })
 
 @task_bp.route('/api/task/economics/<task_type>', methods=['GET'])
 def get_task_economics(task_type):
     """Get economic analysis for a specific task type"""
     state = load_state()
-    economics = EconomicSystem.calculate_task_reward(task_type, state)
+    economics = economic_context(state, get_current_company()).task_reward(task_type)
     
     if not economics:
         return jsonify({'error': 'Geçersiz görev tipi'}), 400
@@ -0,0 +1,167 @@
+"""
+Achievement Service
+Indexed achievement checks that run after every mutation.
+
+The catalog (state['achievements']['all']) is compiled once into a sorted
+threshold list per metric:
+
+    {'cash': [(5000, 'cash_5000'), (10000, 'cash_10000')], 'day': [...], ...}
+
+and the state keeps the next unmet threshold of every metric in
+state['achievements']['next']. Engine functions report the metrics they
+changed; a metric still below its next threshold costs one comparison,
+otherwise a binary search yields the achievements it passed. An achievement
+with several conditions is listed under each of its metrics and unlocks when
+the last of them is met.
+
+Unlocks thus happen on the mutation that meets the condition (e.g. reaching
+5000 TL mid-day) instead of at day end, from whichever endpoint caused it.
+"""
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# Derlenmiş kataloglar; state'ler aynı 'all' listesini paylaştığı için id ile anahtarlanır
+INDEX_CACHE_SIZE = 64
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _department_count(state):
+    aggregates = state.get('aggregates')
+    if aggregates is not None and 'activeDepartments' in aggregates:
+        return aggregates['activeDepartments']
+    return sum(1 for level in state.get('departments', {}).values() if level > 0)
+
+
+# Koşul anahtarı -> state'ten O(1) okunan değer
+METRICS = {
+    'day': lambda state: state.get('day', 0),
+    'cash': lambda state: state.get('cash', 0),
+    'completedTasks': lambda state: state.get('completedTasks', 0),
+    'employee_count': lambda state: len(state.get('employees', [])),
+    'department_count': _department_count,
+}
+
+
+class AchievementIndex:
+    """A catalog compiled into per-metric sorted thresholds."""
+
+    def __init__(self, catalog):
+        self.names = {}
+        self.conditions = {}
+        entries = {}
+        for ach in catalog:
+            # Bilinmeyen koşul anahtarları eskiden olduğu gibi sağlanmış sayılır
+            conditions = [(metric, value) for metric, value in (ach.get('condition') or {}).items()
+                          if metric in METRICS]
+            self.names[ach['id']] = ach.get('name')
+            self.conditions[ach['id']] = conditions
+            for metric, value in conditions:
+                entries.setdefault(metric, []).append((value, ach['id']))
+        self.entries = {metric: sorted(items) for metric, items in entries.items()}
+        self.thresholds = {metric: [value for value, _ in items]
+                           for metric, items in self.entries.items()}
+
+    def met(self, state, ach_id):
+        return all(METRICS[metric](state) >= value for metric, value in self.conditions[ach_id])
+
+    def next_threshold(self, metric, unlocked, start=None):
+        """Smallest threshold of `metric` whose achievement is still locked."""
+        entries = self.entries.get(metric, [])
+        pos = 0 if start is None else bisect.bisect_left(self.thresholds[metric], start)
+        for value, ach_id in entries[pos:]:
+            if ach_id not in unlocked:
+                return value
+        return None
+
+
+def compile_catalog(catalog):
+    """Return the (cached) AchievementIndex of a catalog list."""
+    key = id(catalog)
+    with _index_cache_lock:
+        cached = _index_cache.get(key)
+        # Listeye referans tutulduğu için id başka bir listeye geçemez
+        if cached is not None and cached[0] is catalog:
+            _index_cache.move_to_end(key)
+            return cached[1]
+    index = AchievementIndex(catalog)
+    with _index_cache_lock:
+        _index_cache[key] = (catalog, index)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def check_all(state, now=None):
+    """Check every achievement and rebuild the per-metric next thresholds.
+
+    Used for states without thresholds yet (new games, old saves); returns
+    the newly unlocked achievements.
+    """
+    achievements = state.get('achievements')
+    if not achievements:
+        return []
+    index = compile_catalog(achievements.get('all', []))
+    unlocked = achievements.setdefault('unlocked', {})
+    new_achievements = []
+    for ach_id in index.conditions:
+        if ach_id not in unlocked and index.met(state, ach_id):
+            new_achievements.append(_unlock(achievements, index, ach_id, now))
+    frontier = {}
+    for metric in index.entries:
+        value = index.next_threshold(metric, unlocked)
+        if value is not None:
+            frontier[metric] = value
+    achievements['next'] = frontier
+    return new_achievements
+
+
+def observe(state, metrics, now=None):
+    """Re-check the achievements of the given changed metrics.
+
+    Returns the newly unlocked achievements as
+    [{'id', 'name', 'unlocked_at'}, ...].
+    """
+    achievements = state.get('achievements')
+    if not achievements:
+        return []
+    frontier = achievements.get('next')
+    if frontier is None:
+        return check_all(state, now)
+
+    index = compile_catalog(achievements.get('all', []))
+    unlocked = achievements['unlocked']
+    new_achievements = []
+    stale = set()
+    for metric in metrics:
+        threshold = frontier.get(metric)
+        if threshold is None:
+            continue
+        value = METRICS[metric](state)
+        if value < threshold:
+            continue
+        thresholds = index.thresholds[metric]
+        start = bisect.bisect_left(thresholds, threshold)
+        end = bisect.bisect_right(thresholds, value)
+        for _, ach_id in index.entries[metric][start:end]:
+            if ach_id not in unlocked and index.met(state, ach_id):
+                new_achievements.append(_unlock(achievements, index, ach_id, now))
+                stale.update(m for m, _ in index.conditions[ach_id])
+
+    # Açılan başarımların listelendiği metriklerde sıradaki eşiği ilerlet
+    for metric in stale:
+        value = index.next_threshold(metric, unlocked, frontier.get(metric))
+        if value is None:
+            frontier.pop(metric, None)
+        else:
+            frontier[metric] = value
+    return new_achievements
+
+
+def _unlock(achievements, index, ach_id, now):
+    now = now or datetime.now().isoformat(timespec='seconds')
+    achievements['unlocked'][ach_id] = now
+    return {'id': ach_id, 'name': index.names[ach_id], 'unlocked_at': now}
@@ -0,0 +1,214 @@
+"""
+Archive Service
+Complete task/day history on disk for cursor-paginated queries.
+
+The state only keeps the last TASK_HISTORY_LIMIT tasks and DAY_HISTORY_LIMIT
+day summaries; every record that ever entered those lists is also appended
+here when state_service flushes. Each stream is a directory of NDJSON
+segments with HISTORY_SEGMENT_SIZE records, named after the sequence number
+of their first record, plus an index with each segment's day range and
+record types:
+
+    history/tasks/0000000000.ndjson
+    history/tasks/0000000500.ndjson
+    history/tasks/index.json
+        {"count": 742, "segments": [{"first": 0, "count": 500,
+          "min_day": 1, "max_day": 9, "types": {"work": 410, "network": 90}}, ...]}
+
+A record's sequence number (its position in the stream) is the pagination
+cursor. A query reads the index, skips segments that cannot match the
+filters and parses only the segments the page touches; full segments never
+change, so their parsed records are kept in a small LRU.
+"""
+import os
+import json
+import threading
+from collections import OrderedDict
+
+from ..config import HISTORY_SEGMENT_SIZE
+
+# Akış -> kayıtlarda gün bilgisini taşıyan alan
+STREAMS = {'tasks': 'day', 'days': 'previous_day'}
+INDEX_FILE = 'index.json'
+# Parse edilmiş dolu segmentler (değişmezler): (yol, kayıt sayısı) -> kayıtlar
+SEGMENT_CACHE_SIZE = 32
+
+_segment_cache = OrderedDict()
+_segment_cache_lock = threading.Lock()
+
+
+class HistoryArchive:
+    """One stream ('tasks' or 'days') of one company."""
+
+    def __init__(self, directory, stream):
+        self.directory = os.path.join(directory, stream)
+        self.day_field = STREAMS[stream]
+        self._index = None
+        self._exists = False
+
+    def exists(self):
+        if not self._exists:
+            self._exists = os.path.exists(os.path.join(self.directory, INDEX_FILE))
+        return self._exists
+
+    def index(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.directory, INDEX_FILE), 'r') as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                self._index = {'count': 0, 'segments': []}
+        return self._index
+
+    def reset(self, records=()):
+        """Drop the stream and start it again with `records`."""
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.ndjson'):
+                    os.remove(os.path.join(self.directory, name))
+        with _segment_cache_lock:
+            for key in [k for k in _segment_cache if os.path.dirname(k[0]) == self.directory]:
+                del _segment_cache[key]
+        self._index = {'count': 0, 'segments': []}
+        self.append(records, force_index=True)
+
+    def append(self, records, force_index=False):
+        """Append records at the end of the stream."""
+        index = self.index()
+        if not records and not force_index:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        segments = index['segments']
+        pending = list(records)
+        while pending:
+            if not segments or segments[-1]['count'] >= HISTORY_SEGMENT_SIZE:
+                segments.append({'first': index['count'], 'count': 0,
+                                 'min_day': None, 'max_day': None, 'types': {}})
+            segment = segments[-1]
+            room = HISTORY_SEGMENT_SIZE - segment['count']
+            chunk, pending = pending[:room], pending[room:]
+            with open(self._segment_path(segment['first']), 'a') as f:
+                f.write(''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in chunk))
+            for record in chunk:
+                day = record.get(self.day_field)
+                if day is not None:
+                    segment['min_day'] = day if segment['min_day'] is None else min(segment['min_day'], day)
+                    segment['max_day'] = day if segment['max_day'] is None else max(segment['max_day'], day)
+                record_type = record.get('type')
+                if record_type is not None:
+                    segment['types'][record_type] = segment['types'].get(record_type, 0) + 1
+            segment['count'] += len(chunk)
+            index['count'] += len(chunk)
+        _atomic_write(os.path.join(self.directory, INDEX_FILE),
+                      json.dumps(index, separators=(',', ':')))
+        self._exists = True
+
+    def page(self, cursor=None, limit=50, order='desc', record_type=None,
+             from_day=None, to_day=None, pending=(), replace=False):
+        """Return up to `limit` records after `cursor` in `order`.
+
+        `cursor` is exclusive: with order='desc' records with a smaller
+        sequence number follow, with 'asc' larger ones. Each returned record
+        carries its 'seq'; `next_cursor` is None once a page comes back short.
+        `pending` records are not written yet and follow the stored ones (or
+        take their place with `replace`); nothing is written here.
+        """
+        index = {'count': 0, 'segments': []} if replace else self.index()
+        total = index['count'] + len(pending)
+        descending = order != 'asc'
+        if descending:
+            bound = total if cursor is None else min(cursor, total)
+        else:
+            bound = -1 if cursor is None else cursor
+
+        items = []
+        for seq, record in self._scan(index, pending, descending, bound,
+                                      record_type, from_day, to_day):
+            if not self._matches(record, record_type, from_day, to_day):
+                continue
+            items.append(dict(record, seq=seq))
+            if len(items) == limit:
+                break
+
+        return {
+            'items': items,
+            'next_cursor': items[-1]['seq'] if len(items) == limit else None,
+            'total': total,
+        }
+
+    def _scan(self, index, pending, descending, bound, record_type, from_day, to_day):
+        # (seq, kayıt) çiftleri istenen sırada, cursor'dan sonrası; bekleyen
+        # kayıtlar diskteki akışın sonuna gelir
+        tail = [(index['count'] + i, record) for i, record in enumerate(pending)]
+        if descending:
+            yield from (item for item in reversed(tail) if item[0] < bound)
+            segments = [s for s in reversed(index['segments']) if s['first'] < bound]
+        else:
+            segments = [s for s in index['segments'] if s['first'] + s['count'] - 1 > bound]
+        for segment in segments:
+            if not self._may_match(segment, record_type, from_day, to_day):
+                continue
+            records = self._read_segment(segment)
+            positions = range(len(records) - 1, -1, -1) if descending else range(len(records))
+            for i in positions:
+                seq = segment['first'] + i
+                if (seq >= bound) if descending else (seq <= bound):
+                    continue
+                yield seq, records[i]
+        if not descending:
+            yield from (item for item in tail if item[0] > bound)
+
+    def _may_match(self, segment, record_type, from_day, to_day):
+        if record_type is not None and not segment['types'].get(record_type):
+            return False
+        if from_day is not None and segment['max_day'] is not None and segment['max_day'] < from_day:
+            return False
+        if to_day is not None and segment['min_day'] is not None and segment['min_day'] > to_day:
+            return False
+        return True
+
+    def _matches(self, record, record_type, from_day, to_day):
+        if record_type is not None and record.get('type') != record_type:
+            return False
+        day = record.get(self.day_field)
+        if from_day is not None and (day is None or day < from_day):
+            return False
+        if to_day is not None and (day is None or day > to_day):
+            return False
+        return True
+
+    def _segment_path(self, first):
+        return os.path.join(self.directory, f'{first:010d}.ndjson')
+
+    def _read_segment(self, segment):
+        path = self._segment_path(segment['first'])
+        sealed = segment['count'] >= HISTORY_SEGMENT_SIZE
+        key = (path, segment['count'])
+        if sealed:
+            with _segment_cache_lock:
+                records = _segment_cache.get(key)
+                if records is not None:
+                    _segment_cache.move_to_end(key)
+                    return records
+        records = []
+        with open(path, 'r') as f:
+            for line in f:
+                if len(records) == segment['count']:
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+        if sealed:
+            with _segment_cache_lock:
+                _segment_cache[key] = records
+                while len(_segment_cache) > SEGMENT_CACHE_SIZE:
+                    _segment_cache.popitem(last=False)
+        return records
+
+
+def _atomic_write(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
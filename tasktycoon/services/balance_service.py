@@ -0,0 +1,237 @@
+"""
+Balance Service
+Parameter sweeps over EconomicSystem constants with simulated games.
+
+A grid maps dotted EconomicSystem paths to candidate values, e.g.
+
+    {"TASK_ECONOMICS.work.base_reward": [60, 80, 100],
+     "DEPARTMENT_COSTS.rndLevel.setup": [300, 500]}
+
+Every combination is played with the same seeds so grid points are compared
+on identical luck. Grid points run in a process pool; each finished game is
+appended to an NDJSON cache keyed by (params, policy, days, seed) and a hash
+of every EconomicSystem constant with the params applied, so a re-run only
+plays the games that are missing and changed defaults never hit stale results.
+"""
+import os
+import csv
+import copy
+import json
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from .economic_service import EconomicSystem
+from . import simulation_service
+from ..config import SWEEP_CACHE_PATH
+
+OVERRIDABLE = ('TASK_ECONOMICS', 'DEPARTMENT_COSTS', 'BASE_DAILY_COSTS')
+
+REPORT_FIELDS = ['params', 'games', 'bankruptcy_rate', 'reach_100k_rate',
+                 'mean_days_to_100k', 'median_days_to_100k',
+                 'mean_valuation', 'median_valuation', 'p10_valuation', 'p90_valuation']
+
+
+def expand_grid(grid):
+    """Return every combination of the grid as a list of {path: value} dicts."""
+    for path, values in grid.items():
+        _resolve(path)
+        if not isinstance(values, list) or not values:
+            raise ValueError(f'{path} için değer listesi gerekli')
+    paths = sorted(grid)
+    return [dict(zip(paths, combo)) for combo in itertools.product(*(grid[p] for p in paths))]
+
+
+def apply_overrides(params):
+    """Set EconomicSystem constants and return what is needed to restore them.
+
+    Constants are replaced by assignment so EconomicSystem rebuilds its
+    lookup tables.
+    """
+    saved = {name: getattr(EconomicSystem, name) for name in OVERRIDABLE}
+    updated = {}
+    for path, value in params.items():
+        name = path.split('.')[0]
+        if name not in updated:
+            updated[name] = copy.deepcopy(saved[name])
+        target, key = _resolve(path, updated)
+        target[key] = value
+    for name, constants in updated.items():
+        setattr(EconomicSystem, name, constants)
+    return saved
+
+
+def restore_overrides(saved):
+    for name, value in saved.items():
+        setattr(EconomicSystem, name, value)
+
+
+def run_point(params, policy, days, seeds):
+    """Play one grid point for the given seeds (runs inside a worker)."""
+    saved = apply_overrides(params)
+    try:
+        results = []
+        for seed in seeds:
+            game = simulation_service.run_game(policy, days, seed=seed)
+            results.append({
+                'seed': seed,
+                'outcome': game['outcome'],
+                'outcome_day': game['outcome_day'],
+                'days': game['days'],
+                'cash': game['cash'],
+                'valuation': game['valuation'],
+            })
+        return results
+    finally:
+        restore_overrides(saved)
+
+
+def sweep(grid, seeds=50, policy='growth', days=60, base_seed=0, workers=None,
+          cache_path=SWEEP_CACHE_PATH, progress=None):
+    """Run the sweep and return one summary row per grid point.
+
+    Games already in the cache are not replayed; `cache_path=None` disables
+    the cache. `progress(done, total)` is called as grid points finish.
+    """
+    points = expand_grid(grid)
+    seed_list = list(range(base_seed, base_seed + seeds))
+    cache = _load_cache(cache_path)
+    fingerprints = [_constants_hash(params) for params in points]
+
+    pending = []
+    for params, fingerprint in zip(points, fingerprints):
+        missing = [s for s in seed_list
+                   if _cache_key(params, fingerprint, policy, days, s) not in cache]
+        if missing:
+            pending.append((params, fingerprint, missing))
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(params, fingerprint, pool.submit(run_point, params, policy, days, missing))
+                       for params, fingerprint, missing in pending]
+            for done, (params, fingerprint, future) in enumerate(futures, 1):
+                lines = []
+                for result in future.result():
+                    key = _cache_key(params, fingerprint, policy, days, result['seed'])
+                    cache[key] = result
+                    lines.append(json.dumps({'key': key, 'result': result}) + '\n')
+                _append_cache(cache_path, lines)
+                if progress:
+                    progress(done, len(futures))
+
+    rows = []
+    for params, fingerprint in zip(points, fingerprints):
+        games = [cache[_cache_key(params, fingerprint, policy, days, s)] for s in seed_list]
+        rows.append(summarize(params, games))
+    return {
+        'policy': policy,
+        'days': days,
+        'seeds': seed_list,
+        'played': sum(len(missing) for _, _, missing in pending),
+        'cached': len(points) * len(seed_list) - sum(len(missing) for _, _, missing in pending),
+        'rows': rows,
+    }
+
+
+def summarize(params, games):
+    """Aggregate the games of one grid point."""
+    count = len(games)
+    bankrupt = sum(1 for g in games if g['outcome'] == 'İflas')
+    reached = sorted(g['outcome_day'] for g in games if g['outcome'] == 'Zenginlik')
+    valuations = sorted(g['valuation'] for g in games)
+    return {
+        'params': params,
+        'games': count,
+        'bankruptcy_rate': round(bankrupt / count, 4) if count else 0,
+        'reach_100k_rate': round(len(reached) / count, 4) if count else 0,
+        'mean_days_to_100k': round(sum(reached) / len(reached), 2) if reached else None,
+        'median_days_to_100k': _percentile(reached, 50),
+        'mean_valuation': round(sum(valuations) / count, 2) if count else 0,
+        'median_valuation': _percentile(valuations, 50),
+        'p10_valuation': _percentile(valuations, 10),
+        'p90_valuation': _percentile(valuations, 90),
+    }
+
+
+def write_report(report, out_prefix):
+    """Write `<prefix>.json` and `<prefix>.csv`; returns both paths."""
+    os.makedirs(os.path.dirname(out_prefix) or '.', exist_ok=True)
+    json_path, csv_path = out_prefix + '.json', out_prefix + '.csv'
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        param_names = sorted(report['rows'][0]['params']) if report['rows'] else []
+        writer.writerow(param_names + REPORT_FIELDS[1:])
+        for row in report['rows']:
+            writer.writerow([row['params'][p] for p in param_names] +
+                            [row[field] for field in REPORT_FIELDS[1:]])
+    return json_path, csv_path
+
+
+def _resolve(path, constants=None):
+    """Map 'TASK_ECONOMICS.work.base_reward' to (containing dict, key).
+
+    `constants` maps names to replacement dicts to resolve into instead of
+    the live EconomicSystem attributes.
+    """
+    parts = path.split('.')
+    if parts[0] not in OVERRIDABLE or len(parts) < 2:
+        raise ValueError(f'Geçersiz parametre: {path}')
+    target = (constants or {}).get(parts[0]) or getattr(EconomicSystem, parts[0])
+    for part in parts[1:-1]:
+        if not isinstance(target.get(part), dict):
+            raise ValueError(f'Geçersiz parametre: {path}')
+        target = target[part]
+    if parts[-1] not in target:
+        raise ValueError(f'Geçersiz parametre: {path}')
+    return target, parts[-1]
+
+
+def _constants_hash(params):
+    """Hash of every EconomicSystem constant as run_point() would see it."""
+    constants = {name: value for name, value in vars(EconomicSystem).items()
+                 if name.isupper() and name != 'TABLE_GENERATION'}
+    for path, value in params.items():
+        name = path.split('.')[0]
+        if constants[name] is getattr(EconomicSystem, name):
+            constants[name] = copy.deepcopy(constants[name])
+        target, key = _resolve(path, constants)
+        target[key] = value
+    raw = json.dumps(constants, sort_keys=True, default=repr)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _cache_key(params, fingerprint, policy, days, seed):
+    raw = json.dumps([params, fingerprint, policy, days, seed], sort_keys=True)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _load_cache(path):
+    cache = {}
+    if not path or not os.path.exists(path):
+        return cache
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            cache[record['key']] = record['result']
+    return cache
+
+
+def _append_cache(path, lines):
+    if not path or not lines:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(lines))
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of sorted values (None if empty)."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[index]
@@ -1,11 +1,37 @@
 """
 Economic System Service - Day 8
 Advanced economic balancing and financial calculations
+
+Per-level costs, their prefix sums, the market cycle and the task reward
+multipliers are precomputed into lookup tables. The tables are rebuilt
+whenever one of the constant dicts is reassigned (EconomicSystem.X = {...});
+override constants by assignment, not by mutating the dicts in place.
 """
+import math
+import threading
+from collections import OrderedDict
+
+from ..config import ECONOMIC_CONTEXT_CACHE_SIZE
+
+# Tablolarda önceden hesaplanan seviye sayısı; üstü için doğrudan hesaplanır
+TABLE_LEVELS = 64
+MARKET_CYCLE_DAYS = 30
+
+
+class _EconomicMeta(type):
+    """Rebuilds the lookup tables when an economic constant is reassigned."""
 
-class EconomicSystem:
+    def __setattr__(cls, name, value):
+        super().__setattr__(name, value)
+        if name in cls.TABLE_SOURCES:
+            cls.build_tables()
+
+
+class EconomicSystem(metaclass=_EconomicMeta):
     """Handle economic calculations and balancing"""
     
+    TABLE_SOURCES = ('BASE_DAILY_COSTS', 'DEPARTMENT_COSTS', 'TASK_ECONOMICS')
+    
     # Economic Constants
     BASE_DAILY_COSTS = {
         'office_rent': 50,
@@ -47,10 +73,47 @@ class EconomicSystem:
         }
     }
     
+    @classmethod
+    def build_tables(cls):
+        """Precompute the lookup tables from the current constants"""
+        upgrade_costs = {}
+        department_values = {}
+        for dept, config in cls.DEPARTMENT_COSTS.items():
+            # Seviye L'den L+1'e yükseltme maliyeti (0 -> 1 kurulum maliyetidir)
+            costs = [round(config['upgrade_base'] * 1.5 ** level, 2) for level in range(TABLE_LEVELS)]
+            # Seviye n'e ulaşmak için ödenen toplam: kurulum + 1..n-1 yükseltmeleri
+            values = [0, config['setup']]
+            for level in range(1, TABLE_LEVELS - 1):
+                values.append(values[-1] + costs[level])
+            upgrade_costs[dept] = costs
+            department_values[dept] = values
+
+        type.__setattr__(cls, 'BASE_DAILY_TOTAL', sum(cls.BASE_DAILY_COSTS.values()))
+        type.__setattr__(cls, 'UPGRADE_COST_TABLE', upgrade_costs)
+        type.__setattr__(cls, 'DEPARTMENT_VALUE_TABLE', department_values)
+        type.__setattr__(cls, 'MARKET_CYCLE_TABLE', [
+            round(1 + 0.2 * math.sin(day / MARKET_CYCLE_DAYS * 2 * math.pi), 3)
+            for day in range(MARKET_CYCLE_DAYS)])
+        type.__setattr__(cls, 'DEPARTMENT_MULTIPLIER_TABLE', [1 + (level * 0.25) for level in range(TABLE_LEVELS)])
+        type.__setattr__(cls, 'LEVEL_MULTIPLIER_TABLE', [1 + (level * 0.1) for level in range(TABLE_LEVELS)])
+        # Sabitler değişince paylaşılan hesap önbellekleri geçersiz olur
+        type.__setattr__(cls, 'TABLE_GENERATION', getattr(cls, 'TABLE_GENERATION', 0) + 1)
+    
+    @staticmethod
+    def department_value(department, level):
+        """Total paid to bring a department to `level` (setup + upgrades)"""
+        values = EconomicSystem.DEPARTMENT_VALUE_TABLE[department]
+        if level < len(values):
+            return values[level]
+        value = values[-1]
+        for current_level in range(len(values) - 1, level):
+            value += EconomicSystem.calculate_upgrade_cost(department, current_level)
+        return value
+    
     @staticmethod
     def calculate_daily_costs(state):
         """Calculate total daily operational costs"""
-        base_cost = sum(EconomicSystem.BASE_DAILY_COSTS.values())
+        base_cost = EconomicSystem.BASE_DAILY_TOTAL
         
         # Department costs
         dept_costs = 0
@@ -59,8 +122,12 @@ class EconomicSystem:
                 dept_config = EconomicSystem.DEPARTMENT_COSTS[dept_key]
                 dept_costs += dept_config['daily'] * level
         
-        # Employee salaries
-        employee_costs = sum(emp.get('salary', 0) for emp in state.get('employees', []))
+        # Employee salaries (incrementally maintained total when available)
+        aggregates = state.get('aggregates')
+        if aggregates is not None:
+            employee_costs = aggregates['salaryTotal']
+        else:
+            employee_costs = sum(emp.get('salary', 0) for emp in state.get('employees', []))
         
         # Market conditions (new feature)
         market_modifier = EconomicSystem._get_market_modifier(state)
@@ -87,11 +154,13 @@ class EconomicSystem:
         # Department bonus
         dept_key = task_config.get('department_bonus')
         dept_level = state['departments'].get(dept_key, 0)
-        dept_multiplier = 1 + (dept_level * 0.25)
+        tables = EconomicSystem.DEPARTMENT_MULTIPLIER_TABLE
+        dept_multiplier = tables[dept_level] if 0 <= dept_level < TABLE_LEVELS else 1 + (dept_level * 0.25)
         
         # Company level bonus
         company_level = state.get('level', 1)
-        level_multiplier = 1 + (company_level * 0.1)
+        tables = EconomicSystem.LEVEL_MULTIPLIER_TABLE
+        level_multiplier = tables[company_level] if 0 <= company_level < TABLE_LEVELS else 1 + (company_level * 0.1)
         
         # Reputation bonus (for client-facing tasks)
         reputation = state.get('reputation', 0)
@@ -119,6 +188,9 @@ class EconomicSystem:
         if department not in EconomicSystem.DEPARTMENT_COSTS:
             return None
             
+        if 0 <= current_level < TABLE_LEVELS:
+            return EconomicSystem.UPGRADE_COST_TABLE[department][current_level]
+        
         base_cost = EconomicSystem.DEPARTMENT_COSTS[department]['upgrade_base']
         
         # Exponential scaling: each level costs more
@@ -157,20 +229,18 @@ class EconomicSystem:
         """Simulate market conditions affecting costs"""
         day = state.get('currentDay', 1)
         
-        # Market cycles every 30 days
-        cycle_position = (day % 30) / 30
-        
-        # Sine wave for market fluctuation (0.8 to 1.2)
-        import math
-        market_modifier = 1 + 0.2 * math.sin(cycle_position * 2 * math.pi)
-        
-        return round(market_modifier, 3)
+        # Market cycles every 30 days; sine wave for market fluctuation (0.8 to 1.2)
+        return EconomicSystem.MARKET_CYCLE_TABLE[day % MARKET_CYCLE_DAYS]
     
     @staticmethod
-    def get_financial_health(state):
-        """Analyze company financial health"""
+    def get_financial_health(state, daily_costs=None):
+        """Analyze company financial health
+
+        `daily_costs` is the already computed total daily cost, if any.
+        """
         cash = state.get('cash', 0)
-        daily_costs = EconomicSystem.calculate_daily_costs(state)['total_cost']
+        if daily_costs is None:
+            daily_costs = EconomicSystem.calculate_daily_costs(state)['total_cost']
         
         # Days of runway
         days_of_runway = cash / daily_costs if daily_costs > 0 else float('inf')
@@ -234,3 +304,87 @@ class EconomicSystem:
         efficiency_multiplier = 1 + (current_efficiency / 100)
         
         return int(base_cost * efficiency_multiplier)
+
+
+EconomicSystem.build_tables()
+
+
+class EconomicContext:
+    """EconomicSystem results memoized for one state snapshot.
+
+    Each result is keyed by the state sections it depends on (departments,
+    salary total, currentDay, cash, level, reputation ...), so a context can
+    never return a result for different inputs even if the state changes
+    under it or the memo is shared between snapshots of the same version.
+    Returned dicts are shared; treat them as read-only.
+    """
+
+    def __init__(self, state, memo=None):
+        self.state = state
+        self.memo = {} if memo is None else memo
+
+    def _cached(self, key, compute):
+        try:
+            return self.memo[key]
+        except KeyError:
+            value = self.memo[key] = compute()
+            return value
+
+    def _cost_key(self):
+        state = self.state
+        aggregates = state.get('aggregates')
+        if aggregates is None:
+            salaries = sum(emp.get('salary', 0) for emp in state.get('employees', []))
+        else:
+            salaries = aggregates['salaryTotal']
+        return (tuple(state['departments'].items()), salaries, state.get('currentDay', 1))
+
+    def daily_costs(self):
+        return self._cached(('daily_costs', self._cost_key()),
+                            lambda: EconomicSystem.calculate_daily_costs(self.state))
+
+    def financial_health(self):
+        key = ('financial_health', self.state.get('cash', 0), self._cost_key())
+        return self._cached(key, lambda: EconomicSystem.get_financial_health(
+            self.state, self.daily_costs()['total_cost']))
+
+    def task_reward(self, task_type):
+        config = EconomicSystem.TASK_ECONOMICS.get(task_type)
+        if config is None:
+            return None
+        state = self.state
+        key = ('task_reward', task_type, state['departments'].get(config.get('department_bonus'), 0),
+               state.get('level', 1), state.get('reputation', 0))
+        return self._cached(key, lambda: EconomicSystem.calculate_task_reward(task_type, state))
+
+    def employee_efficiency(self, employee):
+        dept = employee.get('department', '')
+        key = ('employee_efficiency', employee.get('salary', 0), dept,
+               self.state['departments'].get(f"{dept.lower()}Level", 0))
+        return self._cached(key, lambda: EconomicSystem.calculate_employee_efficiency(employee, self.state))
+
+
+_shared_memos = OrderedDict()
+_shared_lock = threading.Lock()
+
+
+def economic_context(state, scope=None):
+    """Return an EconomicContext for `state`.
+
+    States that carry a version share one memo per (scope, version), so
+    repeated requests against an unchanged state reuse earlier results.
+    `scope` tells apart states of different owners (e.g. the company id).
+    """
+    version = state.get('version')
+    if version is None:
+        return EconomicContext(state)
+    key = (scope, version, EconomicSystem.TABLE_GENERATION)
+    with _shared_lock:
+        memo = _shared_memos.get(key)
+        if memo is None:
+            memo = _shared_memos[key] = {}
+            while len(_shared_memos) > ECONOMIC_CONTEXT_CACHE_SIZE:
+                _shared_memos.popitem(last=False)
+        else:
+            _shared_memos.move_to_end(key)
+    return EconomicContext(state, memo)
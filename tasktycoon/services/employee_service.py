@@ -1,7 +1,208 @@
+from ..config import BASE_EMPLOYEE_CAP, EMPLOYEES_PER_HR_LEVEL
+
+
+class Roster(list):
+    """Employee list with an id index.
+
+    It is still a list of employee dicts, so it serializes to the existing
+    JSON layout and compares equal to a plain list. On top of that it keeps
+    an id -> slot index (O(1) lookup) and the highest integer id (O(1) next
+    id). Company-wide totals live in state['aggregates'], not here.
+
+    There are deliberately no per-field columns and no swap-with-last
+    removal. Every reader uses the O(1) aggregates, so columns would only be
+    maintenance cost. The roster serializes straight to the saved and
+    displayed employee list, so swapping would reorder it. Removal (firing)
+    is rare and re-indexes the following rows in O(n).
+
+    Rows are never modified in place: update() replaces the row dict, so
+    copy() only needs shallow copies and cached states stay untouched.
+    """
+
+    def __init__(self, records=()):
+        super().__init__()
+        self._index = {}
+        self._max_id = 0
+        for record in records:
+            self.append(record)
+
+    @classmethod
+    def from_records(cls, records):
+        if isinstance(records, cls):
+            return records
+        return cls(records or [])
+
+    def to_records(self):
+        return list(self)
+
+    def copy(self):
+        clone = Roster.__new__(Roster)
+        list.extend(clone, self)
+        clone._index = dict(self._index)
+        clone._max_id = self._max_id
+        return clone
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __contains__(self, employee_id):
+        return employee_id in self._index
+
+    def get(self, employee_id, default=None):
+        slot = self._index.get(employee_id)
+        return default if slot is None else self[slot]
+
+    def next_id(self):
+        return self._max_id + 1
+
+    def append(self, employee):
+        employee_id = employee.get('id')
+        if employee_id in self._index:
+            raise ValueError(f'Çalışan id zaten var: {employee_id!r}')
+        self._index[employee_id] = len(self)
+        if isinstance(employee_id, int) and employee_id > self._max_id:
+            self._max_id = employee_id
+        super().append(employee)
+
+    def remove(self, employee_id):
+        """Remove and return the employee with this id, keeping list order."""
+        slot = self._index.pop(employee_id)
+        removed = list.pop(self, slot)
+        # Sonraki çalışanlar bir sıra kayar (kayıtlı ve UI'daki sıra korunur)
+        for i in range(slot, len(self)):
+            self._index[self[i].get('id')] = i
+        return removed
+
+    def update(self, employee_id, **fields):
+        """Replace the employee's row with an updated copy and return it."""
+        slot = self._index[employee_id]
+        row = dict(self[slot], **fields)
+        list.__setitem__(self, slot, row)
+        return row
+
+    # Index'i atlayacak list işlemlerine izin verme
+    def _unsupported(self, *args, **kwargs):
+        raise TypeError('Roster yalnızca append/remove/update ile değiştirilir')
+
+    __setitem__ = __delitem__ = __iadd__ = _unsupported
+    extend = insert = pop = clear = sort = reverse = _unsupported
+
+
+def get_roster(state):
+    """Return state['employees'] as a Roster, converting a plain list once."""
+    employees = state.get('employees')
+    if not isinstance(employees, Roster):
+        employees = state['employees'] = Roster.from_records(employees)
+    return employees
+
 def get_next_employee_id(state):
-    if not state["employees"]:
-        return 1
-    return max(emp["id"] for emp in state["employees"]) + 1
+    return get_roster(state).next_id()
 
 def get_max_employees(state):
-    return state["departments"]["hrLevel"] * 3 + 2
+    return state["departments"]["hrLevel"] * EMPLOYEES_PER_HR_LEVEL + BASE_EMPLOYEE_CAP
+
+# --- Şirket geneli çalışan özetleri ---
+# state['aggregates'] işe alma / çıkarma / eğitim sırasında O(1) güncellenir;
+# dashboard ve görev hesapları çalışan listesini taramadan buradan okur.
+
+DEFAULT_EFFICIENCY = 50
+
+def empty_aggregates():
+    return {
+        'employeeCount': 0,
+        'salaryTotal': 0,
+        'efficiencyTotal': 0,
+        'skillCounts': {},
+        # Verimlilik departman seviyesine bağlı: departman anahtarı -> sayı ve
+        # maaş memnuniyeti toplamı (EconomicSystem.calculate_employee_efficiency)
+        'efficiencyGroups': {},
+        'activeDepartments': 0,
+    }
+
+def rebuild_aggregates(state):
+    """Recompute state['aggregates'] from scratch and return it."""
+    aggregates = empty_aggregates()
+    for emp in state.get('employees', []):
+        _apply_employee(aggregates, emp, 1)
+    aggregates['activeDepartments'] = sum(1 for level in state.get('departments', {}).values() if level > 0)
+    state['aggregates'] = aggregates
+    return aggregates
+
+def check_aggregates(state, repair=True):
+    """Compare the incremental aggregates with a full rebuild.
+
+    Returns a dict of mismatching fields (empty when consistent). With
+    repair=True the stored block is replaced by the rebuilt one.
+    """
+    stored = state.get('aggregates') or {}
+    fresh = rebuild_aggregates(dict(state))
+    mismatches = {}
+    for key, expected in fresh.items():
+        actual = stored.get(key)
+        if not _close(actual, expected):
+            mismatches[key] = {'stored': actual, 'expected': expected}
+    if repair and mismatches:
+        state['aggregates'] = fresh
+    return mismatches
+
+def on_employee_added(state, employee):
+    _apply_employee(_aggregates(state), employee, 1)
+
+def on_employee_removed(state, employee):
+    _apply_employee(_aggregates(state), employee, -1)
+
+def on_employee_changed(state, before, after):
+    """`before` is a copy of the employee taken before it was modified."""
+    aggregates = _aggregates(state)
+    _apply_employee(aggregates, before, -1)
+    _apply_employee(aggregates, after, 1)
+
+def on_department_changed(state, old_level, new_level):
+    if (old_level > 0) != (new_level > 0):
+        _aggregates(state)['activeDepartments'] += 1 if new_level > 0 else -1
+
+def average_efficiency(state):
+    aggregates = _aggregates(state)
+    if not aggregates['employeeCount']:
+        return 0
+    return aggregates['efficiencyTotal'] / aggregates['employeeCount']
+
+def team_efficiency_bonus(state):
+    """Sum of (total_efficiency - 1) over all employees, as used by tasks."""
+    departments = state.get('departments', {})
+    bonus = 0
+    for dept_key, group in _aggregates(state)['efficiencyGroups'].items():
+        bonus += group['count'] * departments.get(dept_key, 0) * 0.1 + group['satisfaction']
+    return bonus
+
+def _aggregates(state):
+    if 'aggregates' not in state:
+        return rebuild_aggregates(state)
+    return state['aggregates']
+
+def _apply_employee(aggregates, emp, sign):
+    salary = emp.get('salary', 0)
+    aggregates['employeeCount'] += sign
+    aggregates['salaryTotal'] += sign * salary
+    aggregates['efficiencyTotal'] += sign * emp.get('efficiency', DEFAULT_EFFICIENCY)
+    skills = aggregates['skillCounts']
+    for skill in emp.get('skills', []):
+        skills[skill] = skills.get(skill, 0) + sign
+        if skills[skill] <= 0:
+            del skills[skill]
+    dept_key = f"{emp.get('department', '').lower()}Level"
+    group = aggregates['efficiencyGroups'].setdefault(dept_key, {'count': 0, 'satisfaction': 0})
+    group['count'] += sign
+    group['satisfaction'] += sign * round(min(salary / 1000, 2.0), 2)
+    if group['count'] <= 0:
+        del aggregates['efficiencyGroups'][dept_key]
+
+def _close(a, b):
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_close(a[k], b[k]) for k in a)
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(a - b) < 1e-6
+    return a == b
@@ -0,0 +1,507 @@
+"""
+Engine Service
+Headless game rules operating on an in-memory state dict.
+
+Nothing here touches Flask or disk: routes load a state, call one of these
+functions and save the result, while the simulator drives the same functions
+in a tight loop. Every rule that uses randomness takes an optional `rng`
+(anything with the `random` module's interface) so seeded runs are
+reproducible; by default the global `random` module is used.
+
+Rule violations raise GameRuleError; its `status` is the HTTP status the
+routes answer with.
+"""
+import random
+import uuid
+from datetime import datetime
+
+from .economic_service import EconomicSystem, EconomicContext
+from .history_service import record_task, record_day
+from .employee_service import (get_roster, get_max_employees, team_efficiency_bonus,
+                               on_employee_added, on_employee_removed,
+                               on_employee_changed, on_department_changed)
+from .state_service import get_default_state
+from . import achievement_service
+
+TASK_TYPES = ['work', 'research', 'network']
+DEPARTMENTS = ['engLevel', 'rndLevel', 'hrLevel', 'salesLevel']
+EMPLOYEE_TYPES = ['developer', 'designer', 'analyst', 'manager', 'sales']
+
+# Şans atışı tutan görevlerin nakit bonus aralığı (breakthrough / yeni müşteri)
+TASK_BONUS_RANGES = {'research': (50, 150), 'network': (200, 500)}
+# Nakit ödülü olmayan görevler (araştırma puan kazandırır)
+NON_CASH_TASKS = ('research',)
+
+# Oyun sonu koşulları
+BANKRUPTCY_CASH = -1000
+TARGET_CASH = 100000
+MAX_DAYS = 60
+
+EMPLOYEE_NAMES = [
+    'Ahmet Yılmaz', 'Ayşe Kaya', 'Mehmet Demir', 'Fatma Çelik', 'Mustafa Şahin',
+    'Zeynep Öz', 'Ali Koç', 'Emine Arslan', 'Hüseyin Güler', 'Hatice Aydın',
+    'İbrahim Özkan', 'Elif Polat', 'Murat Eren', 'Seda Tunç', 'Emre Balcı'
+]
+
+TRAINING_SKILLS = ['Yazılım', 'Tasarım', 'Analiz', 'Yönetim', 'Satış', 'Araştırma']
+
+
+class GameRuleError(Exception):
+    """An action is not allowed in the current state."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def new_game():
+    """Return a fresh in-memory state ready for the engine."""
+    state = get_default_state()
+    get_roster(state)
+    return state
+
+
+def step_task(state, task_type, rng=None):
+    """Execute one task. Returns {'task_economics', 'message', 'new_achievements'}."""
+    rng = rng or random
+    if task_type not in TASK_TYPES:
+        raise GameRuleError('Geçersiz görev tipi')
+
+    # Calculate task economics
+    task_economics = EconomicSystem.calculate_task_reward(task_type, state)
+
+    if not task_economics:
+        raise GameRuleError('Görev hesaplaması başarısız')
+
+    # Check energy requirement
+    energy_cost = task_economics['energy_cost']
+    if state['energy'] < energy_cost:
+        raise GameRuleError(f'Yetersiz enerji! Gerekli: {energy_cost}, Mevcut: {state["energy"]}')
+
+    # Execute task based on type
+    message = ""
+
+    if task_type == 'work':
+        reward = task_economics['final_reward']
+        state['cash'] += reward
+        state['xp'] += task_economics['xp_reward']
+        message = f"Çalışma tamamlandı! +{reward:.0f} TL, +{task_economics['xp_reward']} XP kazandınız!"
+
+    elif task_type == 'research':
+        research_points = EconomicSystem.TASK_ECONOMICS['research']['research_points']
+        dept_level = state['departments'].get('rndLevel', 0)
+        final_research = research_points * (1 + dept_level * 0.3)
+
+        state['research'] += final_research
+        state['xp'] += task_economics['xp_reward']
+
+        # Breakthrough chance
+        if rng.random() < task_chance(state, task_type):
+            breakthrough_bonus = rng.randint(*TASK_BONUS_RANGES['research'])
+            state['cash'] += breakthrough_bonus
+            message = f"Araştırma tamamlandı! +{final_research:.1f} Research, +{task_economics['xp_reward']} XP. BREAKTHROUGH! +{breakthrough_bonus} TL patent geliri!"
+        else:
+            message = f"Araştırma tamamlandı! +{final_research:.1f} Research, +{task_economics['xp_reward']} XP kazandınız!"
+
+    elif task_type == 'network':
+        reward = task_economics['final_reward']
+        reputation_gain = EconomicSystem.TASK_ECONOMICS['network']['reputation_gain']
+
+        state['cash'] += reward
+        state['reputation'] += reputation_gain
+        state['xp'] += task_economics['xp_reward']
+
+        # Client acquisition chance
+        if rng.random() < task_chance(state, task_type):
+            client_bonus = rng.randint(*TASK_BONUS_RANGES['network'])
+            state['cash'] += client_bonus
+            message = f"Networking tamamlandı! +{reward:.0f} TL, +{reputation_gain} İtibar, +{task_economics['xp_reward']} XP. YENİ MÜŞTERİ! +{client_bonus} TL proje geliri!"
+        else:
+            message = f"Networking tamamlandı! +{reward:.0f} TL, +{reputation_gain} İtibar, +{task_economics['xp_reward']} XP kazandınız!"
+
+    # Apply energy cost
+    state['energy'] -= energy_cost
+    state['energy'] = max(0, state['energy'])
+
+    # Update task history
+    state['completedTasks'] = state.get('completedTasks', 0) + 1
+
+    # Add to task history
+    task_record = {
+        'type': task_type,
+        'reward': task_economics.get('final_reward', 0),
+        'day': state.get('currentDay', state.get('day', 1)),
+        'timestamp': state.get('completedTasks', 0)
+    }
+    record_task(state, task_record)
+
+    # Calculate efficiency bonuses from employees
+    total_efficiency_bonus = team_efficiency_bonus(state)
+
+    if total_efficiency_bonus > 0:
+        efficiency_cash_bonus = int(state.get('cash', 0) * 0.01 * total_efficiency_bonus)
+        if efficiency_cash_bonus > 0:
+            state['cash'] += efficiency_cash_bonus
+            message += f" [Çalışan verimliliği: +{efficiency_cash_bonus} TL]"
+
+    new_achievements = achievement_service.observe(state, ('cash', 'completedTasks'))
+
+    return {'task_economics': task_economics, 'message': message,
+            'new_achievements': new_achievements}
+
+
+def task_chance(state, task_type):
+    """Probability of the task's bonus roll (breakthrough / new client)."""
+    departments = state['departments']
+    if task_type == 'research':
+        chance = EconomicSystem.TASK_ECONOMICS['research']['breakthrough_chance']
+        return chance * (1 + departments.get('rndLevel', 0) * 0.1)
+    if task_type == 'network':
+        chance = EconomicSystem.TASK_ECONOMICS['network']['client_chance']
+        return chance * (1 + departments.get('salesLevel', 0) * 0.2)
+    return 0.0
+
+
+def check_game_over(state):
+    """Return the game over info for the state at the start of a day end, or None."""
+    # İflas: nakit -1000 TL'ye eşit veya daha düşükse
+    if state.get('cash', 0) <= BANKRUPTCY_CASH:
+        return {
+            'reason': 'İflas',
+            'desc': 'Şirketiniz iflas etti! Nakit -1000 TL seviyesine düştü.'
+        }
+    # Hedef: 100.000 TL veya 60 gün (örnek)
+    if state.get('cash', 0) >= TARGET_CASH:
+        return {
+            'reason': 'Zenginlik',
+            'desc': 'Tebrikler! 100.000 TL kasaya ulaştınız, oyunu başarıyla tamamladınız.'
+        }
+    if state.get('day', 0) >= MAX_DAYS:
+        return {
+            'reason': '60 Gün Tamamlandı',
+            'desc': '60 gün boyunca şirketinizi yönettiniz. Tebrikler!'
+        }
+    return None
+
+
+def end_day(state, now=None):
+    """Close the current day and return its summary.
+
+    `now` is the timestamp recorded for newly unlocked achievements.
+    """
+    # Oyun sonu kontrolü
+    game_over = check_game_over(state)
+
+    # Snapshot cash before end-of-day processing (represents cash before daily costs applied)
+    starting_cash = state.get('cash', 0)
+
+    # Calculate economic costs using new system
+    economics = EconomicContext(state)
+    daily_costs = economics.daily_costs()
+    total_cost = daily_costs['total_cost']
+
+    # Apply daily costs
+    state['cash'] -= total_cost
+
+    # Calculate financial health
+    financial_health = economics.financial_health()
+
+    # Bankruptcy check
+    if state['cash'] < 0:
+        bankruptcy_penalty = abs(state['cash']) * 0.1  # 10% penalty for going negative
+        state['cash'] = max(BANKRUPTCY_CASH, state['cash'])  # Minimum debt limit
+        state['reputation'] -= 5  # Reputation hit
+        bankruptcy_message = f"DİKKAT: Nakit eksi! {bankruptcy_penalty:.0f} TL ceza, -5 İtibar"
+    else:
+        bankruptcy_message = ""
+
+    # Research bonus to reputation
+    research_bonus = int(state['research'] / 10)
+    state['reputation'] += research_bonus
+
+    # Level up system
+    current_level = state.get('level', 1)
+    level_up_cost = 50 * current_level
+
+    level_up_happened = False
+    if state['xp'] >= level_up_cost:
+        state['xp'] -= level_up_cost
+        new_level = current_level + 1
+        state['level'] = new_level
+        level_up_happened = True
+
+        # Level up benefits
+        energy_bonus = 10
+        state['maxEnergy'] += energy_bonus
+        state['energy'] = min(state['maxEnergy'], state['energy'] + energy_bonus)
+
+    # Energy restoration (based on company level and facilities)
+    base_energy_restore = int(state['maxEnergy'] * 0.3)
+    hr_bonus = state['departments'].get('hrLevel', 0) * 5  # HR improves work-life balance
+    total_energy_restore = base_energy_restore + hr_bonus
+
+    state['energy'] = min(state['maxEnergy'], state['energy'] + total_energy_restore)
+
+    # Advance day
+    state['day'] += 1
+
+    # Gün sonu her metriği bir kez yoklar: başka yollarla (ör. /api/employees)
+    # değişip kontrol edilmemiş bir koşul en geç burada açılır
+    new_achievements = achievement_service.observe(state, achievement_service.METRICS, now)
+
+    # Day summary with detailed economic breakdown
+    day_summary = {
+        'previous_day': state['day'] - 1,
+        'costs': {
+            'base_cost': daily_costs['base_cost'],
+            'department_costs': daily_costs['department_costs'],
+            'employee_costs': daily_costs['employee_costs'],
+            'total_cost': total_cost,
+            'market_modifier': daily_costs['market_modifier']
+        },
+        'financial_health': financial_health,
+        'research_bonus': research_bonus,
+        'energy_restored': total_energy_restore,
+        'level_up': level_up_happened,
+        'bankruptcy_message': bankruptcy_message
+    }
+
+    # Add starting/ending cash snapshot so frontend can show income/expense/net
+    ending_cash = state.get('cash', 0)
+    day_summary['starting_cash'] = starting_cash
+    day_summary['ending_cash'] = ending_cash
+    day_summary['net_change'] = ending_cash - starting_cash
+
+    # Gün sonunda yeni başarımlar varsa day_summary'ye ekle
+    if new_achievements:
+        day_summary['new_achievements'] = new_achievements
+
+    # Game over bilgisini day_summary'ye ekle
+    if game_over:
+        day_summary['game_over'] = game_over
+
+    # Günlük özet geçmişine ekle
+    record_day(state, day_summary)
+
+    return day_summary
+
+
+def check_achievements(state, now=None):
+    """Check the whole catalog; return the newly unlocked achievements.
+
+    Mutations only re-check the metrics they changed (see
+    achievement_service.observe); this full pass also rebuilds the index.
+    """
+    return achievement_service.check_all(state, now)
+
+
+def restore_energy(state):
+    """Buy back half of max energy. Returns {'energy_restored', 'cost'}."""
+    # Energy restoration cost based on company level
+    restore_cost = 50 * state.get('level', 1)
+
+    if state['cash'] < restore_cost:
+        raise GameRuleError(f'Yetersiz nakit! Gerekli: {restore_cost} TL')
+
+    # Restore 50% energy
+    energy_restore = int(state['maxEnergy'] * 0.5)
+    state['energy'] = min(state['maxEnergy'], state['energy'] + energy_restore)
+    state['cash'] -= restore_cost
+
+    return {'energy_restored': energy_restore, 'cost': restore_cost}
+
+
+def department_cost(state, dept_type):
+    """Cost of the next unlock/upgrade of a department."""
+    current_level = state['departments'].get(dept_type, 0)
+    if current_level == 0:
+        return EconomicSystem.DEPARTMENT_COSTS[dept_type]['setup']
+    return EconomicSystem.calculate_upgrade_cost(dept_type, current_level)
+
+
+def upgrade(state, dept_type):
+    """Unlock or upgrade a department.
+
+    Returns {'new_level', 'cost', 'action', 'new_achievements'}.
+    """
+    if dept_type not in DEPARTMENTS:
+        raise GameRuleError('Geçersiz departman tipi')
+
+    current_level = state['departments'].get(dept_type, 0)
+
+    # Calculate upgrade cost using economic system
+    upgrade_cost = EconomicSystem.calculate_upgrade_cost(dept_type, current_level)
+
+    if upgrade_cost is None:
+        raise GameRuleError('Maliyet hesaplanamadı')
+
+    # Check if department needs to be unlocked first
+    if current_level == 0:
+        setup_cost = EconomicSystem.DEPARTMENT_COSTS[dept_type]['setup']
+        total_cost = setup_cost
+        action = 'açıldı'
+    else:
+        total_cost = upgrade_cost
+        action = f'seviye {current_level + 1}\'e yükseltildi'
+
+    # Check cash availability
+    if state['cash'] < total_cost:
+        raise GameRuleError(f'Yetersiz nakit! Gerekli: {total_cost:.0f} TL, Mevcut: {state["cash"]:.0f} TL')
+
+    # Apply upgrade
+    state['cash'] -= total_cost
+    state['departments'][dept_type] += 1
+    new_level = state['departments'][dept_type]
+    on_department_changed(state, current_level, new_level)
+    new_achievements = achievement_service.observe(state, ('department_count',))
+
+    return {'new_level': new_level, 'cost': total_cost, 'action': action,
+            'new_achievements': new_achievements}
+
+
+def hiring_limit(state):
+    """Employee cap for the state; 0 while HR is not opened."""
+    if state['departments'].get('hrLevel', 0) == 0:
+        return 0
+    return get_max_employees(state)
+
+
+def hire(state, employee_type='general', rng=None):
+    """Hire a generated employee. Returns {'employee', 'hiring_cost', 'new_achievements'}."""
+    rng = rng or random
+
+    # Check HR department level for employee limit
+    if state['departments'].get('hrLevel', 0) == 0:
+        raise GameRuleError('İK departmanı açılmamış')
+
+    # Calculate employee limits
+    max_employees = get_max_employees(state)
+    roster = get_roster(state)
+    current_employees = len(roster)
+
+    if current_employees >= max_employees:
+        raise GameRuleError(f'Çalışan limiti aşıldı! Maksimum: {max_employees}')
+
+    # Generate employee with economic system
+    new_employee = generate_employee(employee_type, state, rng)
+
+    # Calculate hiring cost
+    hiring_cost = EconomicSystem.calculate_hiring_cost(employee_type, current_employees)
+
+    if state['cash'] < hiring_cost:
+        raise GameRuleError(f'Yetersiz nakit! Gerekli: {hiring_cost:.0f} TL')
+
+    # Apply hiring
+    state['cash'] -= hiring_cost
+    roster.append(new_employee)
+    on_employee_added(state, new_employee)
+    new_achievements = achievement_service.observe(state, ('employee_count',))
+
+    return {'employee': new_employee, 'hiring_cost': hiring_cost,
+            'new_achievements': new_achievements}
+
+
+def train(state, employee_id, rng=None):
+    """Train an employee. Returns {'employee', 'training_cost', 'efficiency_gain'}."""
+    rng = rng or random
+    roster = get_roster(state)
+
+    employee = roster.get(employee_id)
+    if not employee:
+        raise GameRuleError('Çalışan bulunamadı', status=404)
+
+    # Calculate training cost based on current efficiency
+    current_efficiency = employee.get('efficiency', 50)
+    training_cost = EconomicSystem.calculate_training_cost(current_efficiency)
+
+    if state['cash'] < training_cost:
+        raise GameRuleError(f'Yetersiz nakit! Gerekli: {training_cost:.0f} TL')
+
+    # Apply training
+    state['cash'] -= training_cost
+    before = employee
+
+    # Efficiency improvement (5-15% boost, diminishing returns)
+    efficiency_boost = rng.randint(5, 15) * (1 - current_efficiency / 200)
+    new_efficiency = min(100, current_efficiency + efficiency_boost)
+    skills = list(employee.get('skills', []))
+
+    # Possible skill improvement
+    if rng.random() < 0.3:  # 30% chance for new skill
+        new_skills = [skill for skill in TRAINING_SKILLS if skill not in skills]
+
+        if new_skills:
+            skills.append(rng.choice(new_skills))
+
+    # Roster satırı yerinde değiştirilmez, güncellenmiş kopyası yazılır
+    employee = roster.update(employee_id, efficiency=new_efficiency, skills=skills)
+    on_employee_changed(state, before, employee)
+
+    return {'employee': employee, 'training_cost': training_cost, 'efficiency_gain': efficiency_boost}
+
+
+def fire(state, employee_id):
+    """Fire an employee. Returns {'employee', 'severance_pay'}."""
+    roster = get_roster(state)
+
+    employee = roster.get(employee_id)
+    if not employee:
+        raise GameRuleError('Çalışan bulunamadı', status=404)
+
+    # Calculate severance pay
+    salary = employee.get('salary', 500)
+    severance_pay = salary * 0.5  # Half month severance
+
+    # Remove employee and pay severance
+    roster.remove(employee_id)
+    on_employee_removed(state, employee)
+    state['cash'] -= severance_pay
+
+    return {'employee': employee, 'severance_pay': severance_pay}
+
+
+def generate_employee(employee_type, state, rng=None):
+    """Generate a new employee with realistic stats"""
+    rng = rng or random
+
+    # Base employee structure
+    employee = {
+        'id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        'name': rng.choice(EMPLOYEE_NAMES),
+        'type': employee_type,
+        'efficiency': rng.randint(40, 80),
+        'salary': 0,
+        'skills': [],
+        'experience': rng.randint(1, 10),
+        'hired_date': state.get('currentDay', 1)
+    }
+
+    # Type-specific adjustments
+    if employee_type == 'developer':
+        employee['skills'] = rng.sample(['Python', 'JavaScript', 'React', 'SQL'], rng.randint(1, 3))
+        employee['salary'] = rng.randint(600, 1200)
+        employee['efficiency'] += rng.randint(0, 10)
+
+    elif employee_type == 'designer':
+        employee['skills'] = rng.sample(['UI/UX', 'Grafik Tasarım', 'Figma', 'Adobe'], rng.randint(1, 3))
+        employee['salary'] = rng.randint(500, 1000)
+
+    elif employee_type == 'analyst':
+        employee['skills'] = rng.sample(['Veri Analizi', 'Excel', 'Power BI', 'İstatistik'], rng.randint(1, 3))
+        employee['salary'] = rng.randint(550, 900)
+
+    elif employee_type == 'manager':
+        employee['skills'] = rng.sample(['Proje Yönetimi', 'Liderlik', 'Planlama', 'İletişim'], rng.randint(2, 4))
+        employee['salary'] = rng.randint(800, 1500)
+        employee['efficiency'] += rng.randint(5, 15)
+
+    elif employee_type == 'sales':
+        employee['skills'] = rng.sample(['Satış', 'Müşteri İlişkileri', 'Pazarlama', 'Sunum'], rng.randint(1, 3))
+        employee['salary'] = rng.randint(500, 1000)
+
+    # Adjust salary based on experience and efficiency
+    experience_bonus = employee['experience'] * 50
+    efficiency_bonus = (employee['efficiency'] - 50) * 10
+    employee['salary'] = int(employee['salary'] + experience_bonus + efficiency_bonus)
+
+    return employee
@@ -0,0 +1,106 @@
+"""
+Event Service
+In-process publisher of compact state-change events for /api/stream (SSE).
+
+save_state() publishes one 'state' event per committed change with the
+changed scalar fields (cash, energy, xp ...) as {from, to, delta}, plus a
+'day_ended' event when the day advances and one 'achievement_unlocked'
+event per new achievement. Events get increasing ids and are kept in a
+bounded ring buffer shared by all subscribers: a subscriber waits on one
+condition and reads the buffer from its last seen id, so publishing costs
+the same for one or many subscribers and a reconnecting client resumes
+with Last-Event-ID as long as its id is still in the buffer.
+"""
+import threading
+from collections import deque
+
+from ..config import STREAM_BUFFER_SIZE
+
+# Değişimleri 'changes' içinde gönderilen skaler alanlar
+SCALAR_TYPES = (int, float, str, bool)
+
+_buffer = deque(maxlen=STREAM_BUFFER_SIZE)
+_condition = threading.Condition()
+_last_id = 0
+
+
+class ResumeGap(Exception):
+    """The requested Last-Event-ID is no longer (or not yet) in the buffer."""
+
+
+def publish(company_id, event_type, data):
+    """Append one event and wake every subscriber; returns its id."""
+    global _last_id
+    with _condition:
+        _last_id += 1
+        _buffer.append((_last_id, company_id, event_type, data))
+        _condition.notify_all()
+        return _last_id
+
+
+def publish_state_change(company_id, old, new, event=None):
+    """Publish the compact events for one committed save (old may be None)."""
+    old = old or {}
+    changes = {}
+    changed = []
+    for key, value in new.items():
+        if key == 'version':
+            continue
+        before = old.get(key)
+        if before == value:
+            continue
+        if isinstance(value, SCALAR_TYPES) and (before is None or isinstance(before, SCALAR_TYPES)):
+            change = {'from': before, 'to': value}
+            if isinstance(value, (int, float)) and isinstance(before, (int, float)):
+                change['delta'] = round(value - before, 2)
+            changes[key] = change
+        else:
+            changed.append(key)
+    changed.extend(key for key in old if key not in new)
+
+    version = new.get('version')
+    publish(company_id, 'state', {'version': version, 'event': event or 'state_saved',
+                                  'changes': changes, 'changed': changed})
+
+    if old and new.get('day', 0) > old.get('day', 0):
+        publish(company_id, 'day_ended', {'version': version, 'previous_day': old.get('day'),
+                                          'day': new.get('day'), 'cash': new.get('cash')})
+
+    unlocked_before = (old.get('achievements') or {}).get('unlocked') or {}
+    achievements = new.get('achievements') or {}
+    names = {a['id']: a.get('name') for a in achievements.get('all', [])}
+    for ach_id, unlocked_at in (achievements.get('unlocked') or {}).items():
+        if old and ach_id not in unlocked_before:
+            publish(company_id, 'achievement_unlocked', {'version': version, 'id': ach_id,
+                                                         'name': names.get(ach_id, ach_id),
+                                                         'unlocked_at': unlocked_at})
+
+
+def last_event_id():
+    with _condition:
+        return _last_id
+
+
+def wait_for_events(company_id, after_id, timeout):
+    """Return the company's events with id > after_id, waiting up to `timeout`.
+
+    Returns (events, last_id) where last_id is the id to resume from; an
+    empty list means the timeout passed (time for a heartbeat). Raises
+    ResumeGap if events after `after_id` were already dropped from the
+    buffer or `after_id` is from a previous server run.
+    """
+    with _condition:
+        _check_resume(after_id)
+        if _last_id <= after_id:
+            _condition.wait(timeout)
+        _check_resume(after_id)
+        events = [e for e in _buffer if e[0] > after_id and e[1] == company_id]
+        return events, _last_id
+
+
+def _check_resume(after_id):
+    # _condition tutulurken çağrılır
+    if after_id > _last_id:
+        raise ResumeGap()
+    if _buffer and after_id < _buffer[0][0] - 1:
+        raise ResumeGap()
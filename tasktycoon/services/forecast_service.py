@@ -0,0 +1,196 @@
+"""
+Forecast Service
+Monte Carlo cash-flow forecast backed by NumPy.
+
+All trajectories are simulated at once as arrays, one vector operation per
+day. A simulated day is one day of play followed by a day end:
+
+- the day's energy is spent on tasks in the player's recent task mix
+  (taskHistory), with the breakthrough (research) and client (network)
+  rolls drawn per path. Rewards, roll chances and bonus ranges are taken
+  once per forecast from EconomicSystem.calculate_task_reward,
+  engine_service.task_chance and engine_service.TASK_BONUS_RANGES as
+  per-type vectors, so the forecast follows the engine's rules;
+- employee efficiency bonuses compound per task, as in the engine;
+- daily costs follow the market cycle of EconomicSystem._get_market_modifier;
+- a mini event (MINI_EVENTS) happens with FORECAST_EVENT_CHANCE per day;
+- going below zero clamps cash at -1000 like end_day, and reaching -1000
+  is bankruptcy (absorbing).
+
+Department levels, staff and reputation are held at today's values.
+NumPy is optional; without it `available()` is False and callers fall back
+to the deterministic estimate.
+"""
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy opsiyonel
+    np = None
+
+from . import engine_service as engine
+from .economic_service import EconomicSystem
+from .employee_service import team_efficiency_bonus
+from .state_service import MINI_EVENTS
+from ..config import FORECAST_EVENT_CHANCE
+
+BANKRUPTCY_CASH = -1000
+PERCENTILES = (10, 50, 90)
+
+
+def available():
+    return np is not None
+
+
+def forecast(state, days=30, paths=10000, seed=None):
+    """Simulate `paths` cash trajectories for `days` days.
+
+    Returns per-day P10/P50/P90 cash, mean cash, cumulative bankruptcy
+    probability and the expected runway (days until cash first goes below
+    zero, censored at the horizon).
+    """
+    if np is None:
+        raise RuntimeError('numpy yüklü değil')
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+
+    daily = _daily_model(state)
+    cash = np.full(paths, float(state.get('cash', 0)))
+    bankrupt = cash <= BANKRUPTCY_CASH
+    first_negative = np.where(cash < 0, 0, days + 1)
+
+    event_cash = np.array([e['effect'].get('cash', 0) for e in MINI_EVENTS], dtype=float)
+    growth = 1 + 0.01 * daily['efficiency_bonus']
+
+    rows = []
+    for day in range(1, days + 1):
+        plan = daily['plans'][0 if day == 1 else 1]
+        income = np.full(paths, plan['fixed_income'])
+        chance, low, high = plan['rolls']
+        if len(chance):
+            # Her şans atışı bir sütun: isabet olasılığı ve bonus aralığı görev tipinden
+            hits = rng.random((paths, len(chance))) < chance
+            bonus = rng.integers(low, high + 1, size=(paths, len(chance)))
+            income += (hits * bonus).sum(axis=1)
+
+        alive = ~bankrupt
+        cash = np.where(alive, cash + income, cash)
+        if growth > 1 and plan['tasks']:
+            cash = np.where(alive & (cash > 0), cash * growth ** plan['tasks'], cash)
+
+        # Gün sonu: piyasa döngüsüne göre maliyet
+        cost = daily['base_cost'] * EconomicSystem._get_market_modifier(
+            {'currentDay': daily['start_day'] + day})
+        cash = np.where(alive, cash - cost, cash)
+
+        if FORECAST_EVENT_CHANCE > 0:
+            happens = rng.random(paths) < FORECAST_EVENT_CHANCE
+            picked = event_cash[rng.integers(0, len(event_cash), size=paths)]
+            cash = np.where(alive & happens, cash + picked, cash)
+
+        first_negative = np.where((cash < 0) & (first_negative > days), day, first_negative)
+        cash = np.where(alive, np.maximum(BANKRUPTCY_CASH, cash), cash)
+        bankrupt |= cash <= BANKRUPTCY_CASH
+
+        p10, p50, p90 = np.percentile(cash, PERCENTILES)
+        rows.append({
+            'day': day,
+            'p10': round(float(p10), 2),
+            'p50': round(float(p50), 2),
+            'p90': round(float(p90), 2),
+            'mean': round(float(cash.mean()), 2),
+            'expected_cost': round(cost, 2),
+            'bankruptcy_probability': round(float(bankrupt.mean()), 4),
+        })
+
+    runway = np.minimum(first_negative, days + 1)
+    return {
+        'days': days,
+        'paths': paths,
+        'daily': rows,
+        'expected_runway': round(float(runway.mean()), 1),
+        'runway_censored': bool((first_negative > days).any()),
+        'bankruptcy_probability': rows[-1]['bankruptcy_probability'] if rows else 0.0,
+        'expected_daily_income': round(daily['plans'][1]['expected_income'], 2),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def task_mix(state):
+    """Share of each task type in the recent task history (default: work)."""
+    counts = {}
+    for record in state.get('taskHistory', []) or []:
+        task_type = record.get('type')
+        if task_type in EconomicSystem.TASK_ECONOMICS:
+            counts[task_type] = counts.get(task_type, 0) + 1
+    total = sum(counts.values())
+    if not total:
+        return {'work': 1.0}
+    return {task_type: count / total for task_type, count in counts.items()}
+
+
+def _daily_model(state):
+    """Per-day constants; plans[0] is today (current energy), plans[1] a full day."""
+    departments = state.get('departments', {})
+    restore = int(state.get('maxEnergy', 100) * 0.3) + departments.get('hrLevel', 0) * 5
+    mix = task_mix(state)
+    costs = EconomicSystem.calculate_daily_costs(state)
+    vectors = _task_vectors(state)
+    return {
+        'start_day': state.get('day', 0),
+        'base_cost': costs['base_cost'] + costs['department_costs'] + costs['employee_costs'],
+        'efficiency_bonus': team_efficiency_bonus(state),
+        'plans': [_task_plan(vectors, state.get('energy', 0), mix),
+                  _task_plan(vectors, restore, mix)],
+    }
+
+
+def _task_vectors(state):
+    """Per-type energy cost, cash reward, roll chance and bonus range arrays.
+
+    Indexed like engine_service.TASK_TYPES and built from the engine's own
+    functions, so department levels, level and reputation are applied once.
+    """
+    economics = [EconomicSystem.calculate_task_reward(t, state) for t in engine.TASK_TYPES]
+    no_roll = (0, 0)
+    return {
+        'energy_cost': np.array([e['energy_cost'] for e in economics]),
+        'cash_reward': np.array([0.0 if t in engine.NON_CASH_TASKS else e['final_reward']
+                                 for t, e in zip(engine.TASK_TYPES, economics)]),
+        'chance': np.array([engine.task_chance(state, t) for t in engine.TASK_TYPES]),
+        'low': np.array([engine.TASK_BONUS_RANGES.get(t, no_roll)[0] for t in engine.TASK_TYPES]),
+        'high': np.array([engine.TASK_BONUS_RANGES.get(t, no_roll)[1] for t in engine.TASK_TYPES]),
+    }
+
+
+def _task_plan(vectors, energy, mix):
+    """Which tasks `energy` buys in the given mix, and their income terms.
+
+    Tasks are picked by smooth weighted round robin until the next one can no
+    longer be paid for, like a player working until tired. `rolls` holds one
+    (chance, low, high) entry per chance roll of the day, as parallel arrays.
+    """
+    index = {t: i for i, t in enumerate(engine.TASK_TYPES)}
+    counts = np.zeros(len(engine.TASK_TYPES), dtype=int)
+    credit = {t: 0.0 for t in mix}
+    while True:
+        for t, share in mix.items():
+            credit[t] += share
+        task_type = max(credit, key=credit.get)
+        cost = vectors['energy_cost'][index[task_type]]
+        if energy < cost:
+            break
+        energy -= cost
+        credit[task_type] -= 1
+        counts[index[task_type]] += 1
+
+    rolled = counts * (vectors['chance'] > 0)
+    chance, low, high = (np.repeat(vectors[key], rolled) for key in ('chance', 'low', 'high'))
+    fixed_income = float(counts @ vectors['cash_reward'])
+    expected_income = fixed_income + float((chance * (low + high) / 2).sum())
+    return {
+        'tasks': int(counts.sum()),
+        'fixed_income': fixed_income,
+        'expected_income': expected_income,
+        'rolls': (chance, low, high),
+    }
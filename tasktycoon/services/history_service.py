@@ -0,0 +1,143 @@
+"""
+History Service
+Bounded taskHistory/dayHistory with rolling aggregates.
+
+Only the most recent TASK_HISTORY_LIMIT / DAY_HISTORY_LIMIT entries stay in
+the state. Older entries are rolled into state['historyAggregates'] so totals
+and averages over the whole game stay exact while the state size stays flat:
+
+    "historyAggregates": {
+        "taskTotals": {"count", "sum", "min", "max"},        # all tasks ever
+        "taskTypes": {"<type>": {"count", "sum", "min", "max"}},  # rolled
+        "dayTotals": {"count", "total_cost": {...}, "net_change": {...}}  # rolled
+    }
+
+All of them are running totals of a fixed shape, so cloning the state for an
+update does not get slower as the game goes on. Per-day detail of rolled
+records lives in the history archive (archive_service).
+"""
+from ..config import TASK_HISTORY_LIMIT, DAY_HISTORY_LIMIT
+
+# Limit aşıldığında bir seferde limit'in bu oranı kadar fazla kayıt devredilir;
+# böylece liste her kayıtta değil, arada bir kısaltılır
+ROLL_BATCH_RATIO = 0.1
+
+DAY_METRICS = ('total_cost', 'net_change')
+
+
+def empty_aggregates():
+    return {
+        'taskTotals': _empty_stats(),
+        'taskTypes': {},
+        'dayTotals': {'count': 0, **{m: _empty_stats() for m in DAY_METRICS}},
+    }
+
+
+def ensure_history_aggregates(state):
+    """Add historyAggregates to older states and apply the limits.
+
+    Returns True if the state was changed.
+    """
+    aggregates = state.get('historyAggregates')
+    if aggregates is not None:
+        if 'tasks' not in aggregates:
+            return False
+        # Eski gün bazlı özetleri tip bazlı toplamlara indir
+        by_type = aggregates.setdefault('taskTypes', {})
+        for per_type in aggregates.pop('tasks').values():
+            for task_type, stats in per_type.items():
+                _merge(by_type.setdefault(task_type, _empty_stats()), stats)
+        return True
+    state['historyAggregates'] = empty_aggregates()
+    totals = state['historyAggregates']['taskTotals']
+    for record in state.get('taskHistory', []) or []:
+        _add(totals, record.get('reward', 0))
+    _roll_tasks(state, TASK_HISTORY_LIMIT)
+    _roll_days(state, DAY_HISTORY_LIMIT)
+    return True
+
+
+def record_task(state, record):
+    """Append a task record, keeping taskHistory bounded."""
+    if 'historyAggregates' not in state:
+        state['historyAggregates'] = empty_aggregates()
+    _add(state['historyAggregates']['taskTotals'], record.get('reward', 0))
+    state.setdefault('taskHistory', []).append(record)
+    if len(state['taskHistory']) > TASK_HISTORY_LIMIT:
+        _roll_tasks(state, TASK_HISTORY_LIMIT - int(TASK_HISTORY_LIMIT * ROLL_BATCH_RATIO))
+
+
+def record_day(state, summary):
+    """Append a day summary, keeping dayHistory bounded."""
+    if 'historyAggregates' not in state:
+        state['historyAggregates'] = empty_aggregates()
+    state.setdefault('dayHistory', []).append(summary)
+    if len(state['dayHistory']) > DAY_HISTORY_LIMIT:
+        _roll_days(state, DAY_HISTORY_LIMIT - int(DAY_HISTORY_LIMIT * ROLL_BATCH_RATIO))
+
+
+def task_reward_stats(state):
+    """Exact count/sum/min/max of task rewards over the whole game."""
+    aggregates = state.get('historyAggregates')
+    if aggregates is None:
+        stats = _empty_stats()
+        for record in state.get('taskHistory', []) or []:
+            _add(stats, record.get('reward', 0))
+        return stats
+    return aggregates['taskTotals']
+
+
+def task_stats_by_type(state):
+    """Per task type count/sum/min/max over rolled and hot history."""
+    by_type = {}
+    aggregates = state.get('historyAggregates') or empty_aggregates()
+    for task_type, stats in aggregates.get('taskTypes', {}).items():
+        _merge(by_type.setdefault(task_type, _empty_stats()), stats)
+    for record in state.get('taskHistory', []) or []:
+        _add(by_type.setdefault(record.get('type'), _empty_stats()), record.get('reward', 0))
+    return by_type
+
+
+def _roll_tasks(state, keep):
+    history = state.get('taskHistory', []) or []
+    if len(history) <= keep:
+        return
+    rolled = history[:len(history) - keep]
+    by_type = state['historyAggregates'].setdefault('taskTypes', {})
+    for record in rolled:
+        _add(by_type.setdefault(record.get('type'), _empty_stats()), record.get('reward', 0))
+    del history[:len(rolled)]
+
+
+def _roll_days(state, keep):
+    history = state.get('dayHistory', []) or []
+    if len(history) <= keep:
+        return
+    rolled = history[:len(history) - keep]
+    totals = state['historyAggregates']['dayTotals']
+    for summary in rolled:
+        totals['count'] += 1
+        _add(totals['total_cost'], (summary.get('costs') or {}).get('total_cost', 0))
+        _add(totals['net_change'], summary.get('net_change', 0))
+    del history[:len(rolled)]
+
+
+def _empty_stats():
+    return {'count': 0, 'sum': 0, 'min': None, 'max': None}
+
+
+def _add(stats, value):
+    value = value or 0
+    stats['count'] += 1
+    stats['sum'] += value
+    stats['min'] = value if stats['min'] is None else min(stats['min'], value)
+    stats['max'] = value if stats['max'] is None else max(stats['max'], value)
+
+
+def _merge(stats, other):
+    if not other['count']:
+        return
+    stats['count'] += other['count']
+    stats['sum'] += other['sum']
+    stats['min'] = other['min'] if stats['min'] is None else min(stats['min'], other['min'])
+    stats['max'] = other['max'] if stats['max'] is None else max(stats['max'], other['max'])
@@ -0,0 +1,230 @@
+"""
+Journal Service
+Append-only mutation journal for the game state.
+
+Each save produces one small NDJSON record holding only the changed parts of
+the state, so write cost is O(change) instead of O(state size). Records are
+periodically folded into a state.json snapshot; the compacted journal segment
+is archived (not deleted) so it can still be used to audit a given day.
+
+Record layout:
+    {"seq": 12, "event": "task_executed", "day": 3, "ts": "...", "ops": [...]}
+
+Ops:
+    ["set", [path...], value]      - set a (nested) key
+    ["del", [path...]]             - delete a key
+    ["append", [path...], [items]] - extend a list
+    ["trim", [path...], n]         - drop the first n items of a list
+"""
+import os
+import json
+from datetime import datetime
+
+ACTIVE_SEGMENT = 'current.ndjson'
+
+
+def diff_state(base, state):
+    """Return the ops that turn `base` into `state`.
+
+    Top-level dicts are diffed one level deeper so that e.g. a department
+    upgrade only records the changed level. Lists that only grew are recorded
+    as appends (taskHistory, dayHistory).
+    """
+    ops = []
+    for key in base:
+        if key not in state:
+            ops.append(['del', [key]])
+    for key, value in state.items():
+        if key not in base:
+            ops.append(['set', [key], value])
+            continue
+        old = base[key]
+        if old == value:
+            continue
+        if isinstance(old, dict) and isinstance(value, dict):
+            for sub in old:
+                if sub not in value:
+                    ops.append(['del', [key, sub]])
+            for sub, sub_value in value.items():
+                if sub not in old or old[sub] != sub_value:
+                    ops.append(['set', [key, sub], sub_value])
+        elif isinstance(old, list) and isinstance(value, list):
+            ops.extend(diff_list(key, old, value))
+        else:
+            ops.append(['set', [key], value])
+    return ops
+
+
+def diff_list(key, old, new):
+    """Diff a list that was appended to and/or trimmed from the front
+    (bounded histories); anything else is recorded as a full set."""
+    if len(new) > len(old) and new[:len(old)] == old:
+        return [['append', [key], new[len(old):]]]
+    if old and new:
+        try:
+            dropped = old.index(new[0])
+        except ValueError:
+            dropped = -1
+        kept = len(old) - dropped
+        if dropped > 0 and kept <= len(new) and new[:kept] == old[dropped:]:
+            ops = [['trim', [key], dropped]]
+            if len(new) > kept:
+                ops.append(['append', [key], new[kept:]])
+            return ops
+    return [['set', [key], new]]
+
+
+def apply_ops(state, ops):
+    """Apply journal ops to `state` in place and return it."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        target = state
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        last = path[-1]
+        if kind == 'set':
+            target[last] = op[2]
+        elif kind == 'del':
+            target.pop(last, None)
+        elif kind == 'append':
+            target.setdefault(last, []).extend(op[2])
+        elif kind == 'trim':
+            del target.setdefault(last, [])[:op[2]]
+    return state
+
+
+def size_delta(state, ops):
+    """Approximate change in serialized size when `ops` are applied to `state`.
+
+    Must be called before apply_ops(); only the values the ops touch are
+    serialized.
+    """
+    delta = 0
+    for op in ops:
+        kind, path = op[0], op[1]
+        target = state
+        for key in path[:-1]:
+            target = target.get(key) if isinstance(target, dict) else None
+        old = target.get(path[-1]) if isinstance(target, dict) else None
+        if kind == 'set':
+            delta += _size(op[2]) - (_size(old) if old is not None else 0)
+        elif kind == 'del':
+            delta -= _size(old) if old is not None else 0
+        elif kind == 'append':
+            delta += sum(_size(item) + 2 for item in op[2])
+        elif kind == 'trim' and old:
+            delta -= sum(_size(item) + 2 for item in old[:op[2]])
+    return delta
+
+def _size(value):
+    return len(json.dumps(value))
+
+
+def make_record(seq, event, state, ops):
+    """Serialize one journal record to an NDJSON line."""
+    record = {
+        'seq': seq,
+        'event': event or 'state_saved',
+        'day': state.get('day', 0),
+        'ts': datetime.now().isoformat(timespec='seconds'),
+        'ops': ops,
+    }
+    return json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def append_lines(journal_dir, lines):
+    """Durably append serialized records to the active segment."""
+    if not lines:
+        return
+    os.makedirs(journal_dir, exist_ok=True)
+    path = os.path.join(journal_dir, ACTIVE_SEGMENT)
+    _truncate_torn_tail(path)
+    with open(path, 'a') as f:
+        f.write(''.join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_active(journal_dir, after_seq=0):
+    """Read records from the active segment with seq > after_seq.
+
+    A torn last line (crash mid-append) is ignored.
+    """
+    return [r for r in _read_segment(os.path.join(journal_dir, ACTIVE_SEGMENT))
+            if r['seq'] > after_seq]
+
+
+def archive_active(journal_dir, last_seq):
+    """Move the active segment aside after its records were snapshotted."""
+    path = os.path.join(journal_dir, ACTIVE_SEGMENT)
+    if os.path.exists(path):
+        os.replace(path, os.path.join(journal_dir, f'{last_seq:010d}.ndjson'))
+
+
+def read_journal(journal_dir, day=None, event=None):
+    """Read archived and active records in order, optionally filtered."""
+    if not os.path.isdir(journal_dir):
+        return []
+    segments = sorted(n for n in os.listdir(journal_dir)
+                      if n.endswith('.ndjson') and n != ACTIVE_SEGMENT)
+    segments.append(ACTIVE_SEGMENT)
+
+    records = []
+    for name in segments:
+        for record in _read_segment(os.path.join(journal_dir, name)):
+            if day is not None and record.get('day') != day:
+                continue
+            if event is not None and record.get('event') != event:
+                continue
+            records.append(record)
+    return records
+
+
+def _truncate_torn_tail(path, block=4096):
+    """Cut a partially written last record (crash mid-append) off the file,
+    so new records start on a line of their own."""
+    try:
+        f = open(path, 'r+b')
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b'\n':
+            return
+        pos = end
+        while pos > 0:
+            start = max(0, pos - block)
+            f.seek(start)
+            chunk = f.read(pos - start)
+            newline = chunk.rfind(b'\n')
+            if newline != -1:
+                keep = start + newline + 1
+                break
+            pos = start
+        else:
+            keep = 0
+        if keep != end:
+            f.truncate(keep)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _read_segment(path):
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Yarım kalmış satır (son satırsa kopuk kuyruk): atla, sonraki
+                # kayıtlar geçerliyse okunmaya devam eder
+                continue
+    return records
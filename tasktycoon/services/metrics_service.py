@@ -0,0 +1,196 @@
+"""
+Metrics Service
+Columnar per-day time series for charts and trends.
+
+One row is appended per day end with the company's end-of-day values.
+Every column is a flat file of little-endian float64 values (array('d')),
+so a row costs 8 bytes per column and a column can be read without touching
+the others:
+
+    metrics/day.f64  metrics/cash.f64  metrics/reputation.f64 ...
+
+Days only grow within a game, so a day range maps to a row range with a
+binary search on the day column. Long ranges are downsampled on the server
+into min/max/avg buckets. Unknown values (e.g. rows rebuilt from old day
+summaries) are NaN and skipped by the aggregates.
+"""
+import os
+import sys
+import math
+import bisect
+from array import array
+
+COLUMNS = ('day', 'cash', 'reputation', 'research', 'total_cost',
+           'market_modifier', 'employees', 'level')
+SUFFIX = '.f64'
+
+
+def row_from_state(state, summary):
+    """End-of-day row for the day closed by `summary`."""
+    costs = summary.get('costs') or {}
+    return {
+        'day': summary.get('previous_day'),
+        'cash': state.get('cash'),
+        'reputation': state.get('reputation'),
+        'research': state.get('research'),
+        'total_cost': costs.get('total_cost'),
+        'market_modifier': costs.get('market_modifier'),
+        'employees': len(state.get('employees', []) or []),
+        'level': state.get('level'),
+    }
+
+
+def row_from_summary(summary):
+    """Row rebuilt from a stored day summary (only what it contains)."""
+    costs = summary.get('costs') or {}
+    return {
+        'day': summary.get('previous_day'),
+        'cash': summary.get('ending_cash'),
+        'total_cost': costs.get('total_cost'),
+        'market_modifier': costs.get('market_modifier'),
+    }
+
+
+class MetricSeries:
+    """The per-day series of one company, cached in memory once read."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._columns = None
+
+    def exists(self):
+        return os.path.exists(self._path('day'))
+
+    def columns(self):
+        if self._columns is None:
+            self._columns = {}
+            for name in COLUMNS:
+                values = array('d')
+                path = self._path(name)
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        values.frombytes(f.read())
+                    if sys.byteorder != 'little':
+                        values.byteswap()
+                self._columns[name] = values
+            # Yarıda kalmış bir ekleme: en kısa kolona göre hizala
+            length = min(len(v) for v in self._columns.values())
+            for values in self._columns.values():
+                del values[length:]
+        return self._columns
+
+    def __len__(self):
+        return len(self.columns()['day'])
+
+    def append(self, rows):
+        """Append rows (dicts by column name; missing values become NaN)."""
+        if not rows:
+            return
+        columns = self.columns()
+        os.makedirs(self.directory, exist_ok=True)
+        for name in COLUMNS:
+            chunk = array('d', (_number(row.get(name)) for row in rows))
+            columns[name].extend(chunk)
+            if sys.byteorder != 'little':
+                chunk.byteswap()
+            with open(self._path(name), 'ab') as f:
+                f.write(chunk.tobytes())
+
+    def reset(self, rows=()):
+        """Drop the series and start it again with `rows`."""
+        for name in COLUMNS:
+            path = self._path(name)
+            if os.path.exists(path):
+                os.remove(path)
+        self._columns = {name: array('d') for name in COLUMNS}
+        os.makedirs(self.directory, exist_ok=True)
+        for name in COLUMNS:
+            open(self._path(name), 'wb').close()
+        self.append(list(rows))
+
+    def overlay(self, ops):
+        """Read-only copy with pending ('append' | 'reset', rows) ops applied
+        in memory; nothing is written."""
+        view = MetricSeries(self.directory)
+        view._columns = {name: array('d', values) for name, values in self.columns().items()}
+        for kind, rows in ops:
+            if kind == 'reset':
+                for values in view._columns.values():
+                    del values[:]
+            for name in COLUMNS:
+                view._columns[name].extend(_number(row.get(name)) for row in rows)
+        return view
+
+    def query(self, names=COLUMNS, from_day=None, to_day=None, buckets=None):
+        """Rows with from_day <= day <= to_day.
+
+        Without `buckets` (or when the range has no more rows than buckets)
+        the raw values are returned as {'day': [...], name: [...]}. Otherwise
+        the range is split into `buckets` equal row ranges and every column
+        becomes {'min': [...], 'max': [...], 'avg': [...]}, with 'day' the
+        first day of each bucket.
+        """
+        columns = self.columns()
+        days = columns['day']
+        start = 0 if from_day is None else bisect.bisect_left(days, from_day)
+        end = len(days) if to_day is None else bisect.bisect_right(days, to_day)
+        end = max(start, end)
+        count = end - start
+
+        if not buckets or count <= buckets:
+            result = {'day': [_value(v) for v in days[start:end]]}
+            for name in names:
+                result[name] = [_value(v) for v in columns[name][start:end]]
+            return {'rows': count, 'buckets': None, 'series': result}
+
+        bounds = [start + count * i // buckets for i in range(buckets + 1)]
+        result = {'day': [_value(days[lo]) for lo in bounds[:-1]]}
+        for name in names:
+            values = columns[name]
+            stats = {'min': [], 'max': [], 'avg': []}
+            for lo, hi in zip(bounds, bounds[1:]):
+                window = [v for v in values[lo:hi] if not math.isnan(v)]
+                stats['min'].append(min(window) if window else None)
+                stats['max'].append(max(window) if window else None)
+                stats['avg'].append(round(sum(window) / len(window), 4) if window else None)
+            result[name] = stats
+        return {'rows': count, 'buckets': buckets, 'series': result}
+
+    def growth_rate(self, name='cash', window=7):
+        """Average daily growth of a column over the last `window` days.
+
+        Uses a least-squares fit of log(value) against day, so one noisy day
+        does not dominate; returns the rate as a fraction per day, or None
+        with fewer than two positive values in the window.
+        """
+        columns = self.columns()
+        days = columns['day']
+        if not days:
+            return None
+        start = bisect.bisect_left(days, days[-1] - window + 1)
+        points = [(d, math.log(v)) for d, v in zip(days[start:], columns[name][start:])
+                  if not math.isnan(v) and v > 0]
+        if len(points) < 2:
+            return None
+        mean_x = sum(p[0] for p in points) / len(points)
+        mean_y = sum(p[1] for p in points) / len(points)
+        var_x = sum((p[0] - mean_x) ** 2 for p in points)
+        if not var_x:
+            return None
+        slope = sum((p[0] - mean_x) * (p[1] - mean_y) for p in points) / var_x
+        return math.exp(slope) - 1
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + SUFFIX)
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return math.nan
+
+
+def _value(v):
+    if math.isnan(v):
+        return None
+    return int(v) if v.is_integer() else v
@@ -0,0 +1,282 @@
+"""
+Planner Service
+Bounded beam search over one day's action sequences.
+
+A plan is an ordered list of actions (tasks, department upgrades, hires)
+followed by a day end. Because task rolls are random, a partial plan holds a
+distribution of outcomes: each chance task (research breakthrough, network
+client) splits every outcome into a hit and a miss branch with the engine's
+own probabilities, and outcomes that land on the same state key are merged.
+Plans are ranked by the expected value after the day end of
+
+    company valuation + PLANNER_XP_VALUE * xp + PLANNER_REPUTATION_VALUE * reputation
+
+The rules are the engine's: every transition runs engine_service on a small
+copy of the state with an rng that forces the branch outcome. Transitions and
+day ends are memoized on the state key, so sub-plans reached in a different
+order are not recomputed. The search stops at PLANNER_TIME_BUDGET_MS and
+returns the best plans found so far.
+"""
+import copy
+import time
+
+from . import engine_service as engine
+from .engine_service import GameRuleError
+from .history_service import empty_aggregates as empty_history_aggregates
+from .employee_service import Roster, rebuild_aggregates
+from .simulation_service import company_valuation
+from ..config import (PLANNER_BEAM_WIDTH, PLANNER_MAX_ACTIONS, PLANNER_TIME_BUDGET_MS,
+                      PLANNER_XP_VALUE, PLANNER_REPUTATION_VALUE)
+
+# Bir plandaki en fazla sonuç dalı; aşılırsa en olası dallar tutulur
+MAX_OUTCOMES = 16
+
+ACTIONS = ([('task', t) for t in engine.TASK_TYPES] +
+           [('upgrade', d) for d in engine.DEPARTMENTS] +
+           [('hire', t) for t in engine.EMPLOYEE_TYPES])
+
+
+class _ForcedRng:
+    """rng stand-in that makes every roll hit or miss and uses mean values."""
+
+    def __init__(self, hit):
+        self.hit = hit
+        self.bits = 0
+
+    def random(self):
+        return 0.0 if self.hit else 1.0 - 1e-12
+
+    def randint(self, a, b):
+        return (a + b) // 2
+
+    def choice(self, seq):
+        return seq[0]
+
+    def sample(self, seq, k):
+        return list(seq[:k])
+
+    def getrandbits(self, n):
+        # Planlanan işe alımlar için benzersiz (ama deterministik) id
+        self.bits += 1
+        return self.bits
+
+
+class Planner:
+    """One search; holds the memo tables for the duration of a request."""
+
+    def __init__(self, state, beam_width=PLANNER_BEAM_WIDTH, max_actions=PLANNER_MAX_ACTIONS,
+                 time_budget_ms=PLANNER_TIME_BUDGET_MS):
+        self.root = _planning_state(state)
+        self.beam_width = beam_width
+        self.max_actions = max_actions
+        self.deadline = time.perf_counter() + time_budget_ms / 1000
+        self.transitions = {}
+        self.day_ends = {}
+        self.stats = {'expanded': 0, 'transitions': 0, 'memo_hits': 0}
+        self.truncated = False
+        # İşe alımlar aynı rng'yi paylaşır ki planlanan çalışanların id'leri çakışmasın
+        self.hire_rng = _ForcedRng(False)
+
+    def search(self, top=3):
+        root = [(1.0, _state_key(self.root), self.root)]
+        finished = {}
+        beam = [((), root)]
+        for _ in range(self.max_actions + 1):
+            candidates = {}
+            for actions, outcomes in beam:
+                signature = _signature(outcomes)
+                if signature not in finished:
+                    finished[signature] = self._score(actions, outcomes)
+                if len(actions) == self.max_actions:
+                    continue
+                for action in ACTIONS:
+                    if time.perf_counter() > self.deadline:
+                        self.truncated = True
+                        break
+                    child = self._apply(outcomes, action)
+                    if child is None:
+                        continue
+                    self.stats['expanded'] += 1
+                    child_signature = _signature(child)
+                    if child_signature in candidates or child_signature in finished:
+                        continue
+                    candidates[child_signature] = (actions + (action,), child,
+                                                   self._expected_value(child))
+                if self.truncated:
+                    break
+            if self.truncated or not candidates:
+                break
+            ranked = sorted(candidates.values(), key=lambda c: c[2], reverse=True)
+            beam = [(actions, outcomes) for actions, outcomes, _ in ranked[:self.beam_width]]
+
+        plans = sorted(finished.values(), key=lambda p: p['score'], reverse=True)
+        return plans[:top]
+
+    def _apply(self, outcomes, action):
+        """Apply `action` to every outcome; None if it is invalid in any of them."""
+        merged = {}
+        for prob, key, state in outcomes:
+            branches = self._transition(key, state, action)
+            if branches is None:
+                return None
+            for branch_prob, next_key, next_state in branches:
+                if next_key in merged:
+                    merged[next_key][0] += prob * branch_prob
+                else:
+                    merged[next_key] = [prob * branch_prob, next_state]
+        result = [(p, k, s) for k, (p, s) in merged.items()]
+        if len(result) > MAX_OUTCOMES:
+            result.sort(key=lambda o: o[0], reverse=True)
+            result = result[:MAX_OUTCOMES]
+            total = sum(o[0] for o in result)
+            result = [(p / total, k, s) for p, k, s in result]
+        return result
+
+    def _transition(self, key, state, action):
+        memo_key = (key, action)
+        if memo_key in self.transitions:
+            self.stats['memo_hits'] += 1
+            return self.transitions[memo_key]
+        self.stats['transitions'] += 1
+
+        kind, arg = action
+        branches = []
+        try:
+            if kind == 'task':
+                chance = engine.task_chance(state, arg)
+                for hit, prob in ((True, chance), (False, 1 - chance)):
+                    if prob <= 0:
+                        continue
+                    child = _clone(state)
+                    engine.step_task(child, arg, _ForcedRng(hit))
+                    branches.append((prob, _state_key(child), child))
+            elif kind == 'upgrade':
+                child = _clone(state, staff=True)
+                engine.upgrade(child, arg)
+                branches.append((1.0, _state_key(child), child))
+            elif kind == 'hire':
+                child = _clone(state, staff=True)
+                engine.hire(child, arg, self.hire_rng)
+                branches.append((1.0, _state_key(child), child))
+        except GameRuleError:
+            branches = None
+
+        self.transitions[memo_key] = branches
+        return branches
+
+    def _day_end(self, key, state):
+        if key in self.day_ends:
+            self.stats['memo_hits'] += 1
+            return self.day_ends[key]
+
+        # Gün sonu nakitten yalnızca doğrusal etkilenir (nakit eksiye düşmedikçe):
+        # aynı durumun farklı nakitli hali için sonuç kaydırılarak kullanılır
+        rest = key[1:]
+        reference = self.day_ends.get(rest)
+        if reference is not None:
+            shift = state['cash'] - reference['start_cash']
+            if reference['cash'] >= 0 and reference['cash'] + shift >= 0:
+                self.stats['memo_hits'] += 1
+                result = dict(reference, start_cash=state['cash'])
+                for field in ('cash', 'valuation', 'value'):
+                    result[field] = reference[field] + shift
+                self.day_ends[key] = result
+                return result
+
+        child = _clone(state)
+        engine.end_day(child, now='plan')
+        result = {
+            'start_cash': state['cash'],
+            'cash': child['cash'],
+            'xp': child['xp'],
+            'reputation': child['reputation'],
+            'level': child['level'],
+            'valuation': company_valuation(child),
+        }
+        result['value'] = (result['valuation'] + PLANNER_XP_VALUE * result['xp'] +
+                           PLANNER_REPUTATION_VALUE * result['reputation'])
+        self.day_ends[key] = result
+        self.day_ends.setdefault(rest, result)
+        return result
+
+    def _expected_value(self, outcomes):
+        return sum(prob * self._day_end(key, state)['value'] for prob, key, state in outcomes)
+
+    def _score(self, actions, outcomes):
+        expected = {'cash': 0.0, 'xp': 0.0, 'reputation': 0.0, 'valuation': 0.0}
+        value = 0.0
+        for prob, key, state in outcomes:
+            result = self._day_end(key, state)
+            value += prob * result['value']
+            for field in expected:
+                expected[field] += prob * result[field]
+        return {
+            'actions': [{'type': kind, 'target': arg} for kind, arg in actions],
+            'score': round(value, 2),
+            'expected': {field: round(v, 2) for field, v in expected.items()},
+            'outcomes': len(outcomes),
+        }
+
+
+def suggest(state, top=3, **options):
+    """Return the top plans for the rest of the current day."""
+    started = time.perf_counter()
+    planner = Planner(state, **options)
+    plans = planner.search(top=top)
+    return {
+        'plans': plans,
+        'truncated': planner.truncated,
+        'stats': planner.stats,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _planning_state(state):
+    """Small copy of the state with only what the rules read."""
+    planning = {key: value for key, value in state.items()
+                if key not in ('taskHistory', 'dayHistory', 'historyAggregates',
+                               'achievements', 'employees', 'aggregates')}
+    planning['departments'] = dict(state.get('departments', {}))
+    planning['employees'] = Roster.from_records(state.get('employees', [])).copy()
+    if 'aggregates' in state:
+        planning['aggregates'] = copy.deepcopy(state['aggregates'])
+    else:
+        rebuild_aggregates(planning)
+    planning['taskHistory'] = []
+    planning['dayHistory'] = []
+    planning['historyAggregates'] = empty_history_aggregates()
+    return planning
+
+
+def _clone(state, staff=False):
+    """Copy for one transition; roster/aggregates only when `staff` may change them."""
+    child = dict(state)
+    child['departments'] = dict(state['departments'])
+    if staff:
+        child['employees'] = state['employees'].copy()
+        child['aggregates'] = _copy_aggregates(state['aggregates'])
+    # Geçmiş planlamada okunmaz: liste her kopyada boş başlar, özetler paylaşılır
+    child['taskHistory'] = []
+    child['dayHistory'] = []
+    return child
+
+
+def _copy_aggregates(aggregates):
+    # Özetler en fazla iki seviye iç içe dict (skillCounts, efficiencyGroups)
+    return {key: {k: dict(v) if isinstance(v, dict) else v for k, v in value.items()}
+            if isinstance(value, dict) else value
+            for key, value in aggregates.items()}
+
+
+def _state_key(state):
+    """Hashable key of everything that affects later transitions and the day end."""
+    aggregates = state['aggregates']
+    return (round(state['cash'], 4), state['xp'], state['level'], state['energy'],
+            state['maxEnergy'], round(state['research'], 4), state['reputation'],
+            tuple(sorted(state['departments'].items())),
+            aggregates['employeeCount'], aggregates['salaryTotal'],
+            round(aggregates['efficiencyTotal'], 4))
+
+
+def _signature(outcomes):
+    return frozenset((key, round(prob, 9)) for prob, key, _ in outcomes)
@@ -0,0 +1,275 @@
+"""
+Replay Service
+Opt-in request recording and deterministic replay.
+
+While recording, every request gets its own seeded RNG (request_rng()) that
+the game rules use instead of the global `random` module, and each /api/
+request is appended to an NDJSON file together with that seed:
+
+    {"type": "snapshot", "company": "default", "version": 41, "state": {...}}
+    {"type": "request", "seq": 1, "company": "default", "method": "POST",
+     "path": "/api/task", "endpoint": "POST /api/task", "query": "",
+     "headers": {}, "body": {"task_type": "work"}, "seed": 8123...,
+     "status": 200, "ms": 3.1, "version": 42, "saved": true}
+    {"type": "final", "company": "default", "version": 57, "digest": "..."}
+
+A snapshot of a company's state is written before its first recorded request,
+a final digest of every recorded company at shutdown. replay() restores the
+snapshots on fresh storage, sends the requests through the Flask test client
+with the recorded seeds and compares statuses, state versions and the final
+digests.
+
+Requests are written in completion order, which under concurrent traffic is
+not the order their saves were applied. A request that saved records the
+version its own save produced ("saved": true), and replay() sends each
+company's requests sorted by that version. Requests that did not save are
+placed after the version they observed when they completed; their responses
+(a 304, a rule error) are only reproduced faithfully if no save raced them,
+so replays are exact for serialized traffic and save-exact otherwise.
+"""
+import os
+import re
+import json
+import time
+import random
+import atexit
+import hashlib
+import tempfile
+import threading
+import contextvars
+from collections import defaultdict
+
+from . import state_service
+
+# Kayıtta saklanan (ve tekrar oynatmada gönderilen) istek başlıkları
+RECORDED_HEADERS = ('If-Match', 'If-None-Match')
+
+_ETAG_VERSION_RE = re.compile(r'v(\d+)')
+
+# İstek bazında tohumlanmış RNG; kayıt/tekrar dışında global random kullanılır
+_request_rng = contextvars.ContextVar('request_rng', default=None)
+
+
+def request_rng():
+    """RNG of the current request: seeded while recording or replaying."""
+    rng = _request_rng.get()
+    return rng if rng is not None else random
+
+def seed_request(seed):
+    """Use a random.Random(seed) for the current request; returns a token."""
+    return _request_rng.set(random.Random(seed))
+
+def reset_request_rng(token):
+    _request_rng.reset(token)
+
+def new_seed():
+    return random.getrandbits(63)
+
+
+def state_digest(state):
+    """Hash of a state without the fields that differ between runs.
+
+    The version counter and achievement unlock timestamps are wall-clock or
+    storage dependent, everything else must match after a replay.
+    """
+    normalized = {key: value for key, value in state.items() if key != 'version'}
+    achievements = normalized.get('achievements')
+    if isinstance(achievements, dict):
+        normalized['achievements'] = dict(achievements,
+                                          unlocked=sorted(achievements.get('unlocked') or {}))
+    data = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    data = re.sub(r'"unlocked_at":"[^"]*"', '"unlocked_at":""', data)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class RequestRecorder:
+    """Appends recorded requests of one app to an NDJSON file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.seq = 0
+        self._companies = set()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        atexit.register(self.close)
+
+    def snapshot(self, company_id):
+        """Write the current company's state before its first recorded request."""
+        with self._lock:
+            if company_id in self._companies or self._file is None:
+                return
+            self._companies.add(company_id)
+            self._write({'type': 'snapshot', 'company': company_id,
+                         'version': state_service.get_state_version(),
+                         'state': state_service.load_state()})
+
+    def record(self, record):
+        with self._lock:
+            if self._file is None:
+                return
+            self.seq += 1
+            self._write(dict({'type': 'request', 'seq': self.seq}, **record))
+
+    def close(self):
+        """Write the final digest of every recorded company and close the file."""
+        with self._lock:
+            if self._file is None:
+                return
+            for company_id in sorted(self._companies):
+                with state_service.company_scope(company_id):
+                    self._write({'type': 'final', 'company': company_id,
+                                 'version': state_service.get_state_version(),
+                                 'digest': state_digest(state_service.load_state())})
+            self._file.close()
+            self._file = None
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+
+
+def read_recording(path):
+    """Read the records of a recording; a torn last line is ignored."""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+    return records
+
+
+def replay(path, data_dir=None, verify=True):
+    """Replay a recording against a fresh app and report latencies.
+
+    Returns {'requests', 'elapsed', 'requests_per_second', 'endpoints',
+    'status_mismatches', 'version_mismatches', 'companies', 'ok'}; endpoint
+    latencies are in milliseconds.
+    """
+    from .. import create_app
+
+    records = _save_order(read_recording(path))
+    state_service.use_data_dir(data_dir or tempfile.mkdtemp(prefix='tasktycoon-replay-'))
+    app = create_app(record=False)
+    app.config['REPLAY'] = True
+    client = app.test_client()
+
+    offsets = {}
+    latencies = defaultdict(list)
+    status_mismatches = []
+    version_mismatches = []
+    companies = {}
+    requests = 0
+    started = time.perf_counter()
+
+    for record in records:
+        kind = record.get('type')
+        company_id = record.get('company')
+        if kind == 'snapshot':
+            state = {k: v for k, v in record['state'].items() if k != 'version'}
+            with state_service.company_scope(company_id):
+                state_service.save_state(state, event='replay_snapshot')
+                offsets[company_id] = state_service.get_state_version() - record['version']
+        elif kind == 'request':
+            offset = offsets.get(company_id, 0)
+            headers = {name: _shift_versions(value, offset)
+                       for name, value in (record.get('headers') or {}).items()}
+            headers['X-Company-Id'] = company_id
+            if record.get('seed') is not None:
+                headers['X-Replay-Seed'] = str(record['seed'])
+            query = _shift_since(record.get('query') or '', offset)
+            options = {'method': record['method'], 'query_string': query, 'headers': headers}
+            if record.get('body') is not None:
+                options['json'] = record['body']
+
+            request_started = time.perf_counter()
+            response = client.open(record['path'], **options)
+            elapsed_ms = (time.perf_counter() - request_started) * 1000
+            response.close()
+            requests += 1
+            latencies[record.get('endpoint') or f"{record['method']} {record['path']}"].append(elapsed_ms)
+
+            if response.status_code != record.get('status'):
+                status_mismatches.append({'seq': record.get('seq'), 'endpoint': record.get('endpoint'),
+                                          'recorded': record.get('status'),
+                                          'replayed': response.status_code})
+            if verify and record.get('version') is not None:
+                with state_service.company_scope(company_id):
+                    version = state_service.get_state_version() - offset
+                if version != record['version']:
+                    version_mismatches.append({'seq': record.get('seq'),
+                                               'endpoint': record.get('endpoint'),
+                                               'recorded': record['version'],
+                                               'replayed': version})
+        elif kind == 'final' and verify:
+            with state_service.company_scope(company_id):
+                digest = state_digest(state_service.load_state())
+            companies[company_id] = 'match' if digest == record['digest'] else 'mismatch'
+
+    elapsed = time.perf_counter() - started
+    state_service.flush_state()
+
+    endpoints = {}
+    for endpoint, values in sorted(latencies.items()):
+        values.sort()
+        endpoints[endpoint] = {
+            'count': len(values),
+            'p50': round(_percentile(values, 50), 3),
+            'p90': round(_percentile(values, 90), 3),
+            'p99': round(_percentile(values, 99), 3),
+            'max': round(values[-1], 3),
+        }
+    return {
+        'requests': requests,
+        'elapsed': elapsed,
+        'requests_per_second': requests / elapsed if elapsed else 0.0,
+        'endpoints': endpoints,
+        'status_mismatches': status_mismatches,
+        'version_mismatches': version_mismatches,
+        'companies': companies,
+        'ok': not status_mismatches and not version_mismatches
+              and all(result == 'match' for result in companies.values()),
+    }
+
+
+def _save_order(records):
+    """Put each company's requests in the order their saves were applied.
+
+    The request slots of a company are refilled sorted by (version, saving
+    requests first, seq); snapshots and finals stay where they are. Older
+    recordings without the "saved" flag keep their file order.
+    """
+    slots = defaultdict(list)
+    for i, record in enumerate(records):
+        if record.get('type') == 'request':
+            slots[record.get('company')].append(i)
+    ordered = list(records)
+    for positions in slots.values():
+        requests = [records[i] for i in positions]
+        if not all('saved' in r and r.get('version') is not None for r in requests):
+            continue
+        requests.sort(key=lambda r: (r['version'], not r['saved'], r.get('seq', 0)))
+        for i, record in zip(positions, requests):
+            ordered[i] = record
+    return ordered
+
+def _percentile(values, p):
+    """Nearest-rank percentile of sorted values."""
+    index = max(0, min(len(values) - 1, -(-len(values) * p // 100) - 1))
+    return values[int(index)]
+
+def _shift_versions(value, offset):
+    # ETag'lerdeki (If-Match/If-None-Match) versiyonlar tekrar oynatmadaki karşılıklarına çevrilir
+    if not offset:
+        return value
+    return _ETAG_VERSION_RE.sub(lambda m: f'v{int(m.group(1)) + offset}', value)
+
+def _shift_since(query, offset):
+    if not offset or 'since=' not in query:
+        return query
+    return re.sub(r'(^|&)since=(\d+)', lambda m: f'{m.group(1)}since={int(m.group(2)) + offset}', query)
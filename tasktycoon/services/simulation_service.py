@@ -0,0 +1,169 @@
+"""
+Simulation Service
+Plays full games with scripted policies on the headless engine.
+
+A policy is a function `play_day(state, rng)` that performs the actions of
+one day through engine_service and returns how many actions it took; the
+simulator then ends the day and repeats until the game is over or the day
+budget is used up. Used by `python -m tasktycoon simulate` to evaluate
+balance changes over thousands of games.
+"""
+import random
+import time
+
+from . import engine_service as engine
+from .economic_service import EconomicSystem
+from .engine_service import GameRuleError
+
+# Politikaların elde tutmaya çalıştığı nakit tamponu (gün sonu maliyetleri için)
+CASH_RESERVE = 500
+
+
+def _work_until_tired(state, rng, task_types=('work',)):
+    """Run tasks in rotation until the next one cannot be paid for."""
+    steps = 0
+    while True:
+        task_type = task_types[steps % len(task_types)]
+        try:
+            engine.step_task(state, task_type, rng)
+        except GameRuleError:
+            return steps
+        steps += 1
+
+
+def policy_grind(state, rng):
+    """Only 'work' tasks, never invests."""
+    return _work_until_tired(state, rng)
+
+
+def policy_balanced(state, rng):
+    """Rotate work/research/network, never invests."""
+    return _work_until_tired(state, rng, engine.TASK_TYPES)
+
+
+def policy_growth(state, rng):
+    """Invest spare cash in departments and staff, then work."""
+    steps = 0
+    for dept_type in ('engLevel', 'hrLevel', 'salesLevel', 'rndLevel'):
+        if state['cash'] - engine.department_cost(state, dept_type) >= CASH_RESERVE:
+            try:
+                engine.upgrade(state, dept_type)
+                steps += 1
+            except GameRuleError:
+                pass
+
+    while len(state['employees']) < engine.hiring_limit(state) and state['cash'] > CASH_RESERVE * 4:
+        try:
+            engine.hire(state, rng.choice(engine.EMPLOYEE_TYPES), rng)
+            steps += 1
+        except GameRuleError:
+            break
+
+    return steps + _work_until_tired(state, rng, ('work', 'work', 'network'))
+
+
+def policy_random(state, rng):
+    """Random tasks, occasional random upgrades and hires."""
+    steps = 0
+    if rng.random() < 0.3:
+        try:
+            engine.upgrade(state, rng.choice(engine.DEPARTMENTS))
+            steps += 1
+        except GameRuleError:
+            pass
+    if rng.random() < 0.2:
+        try:
+            engine.hire(state, rng.choice(engine.EMPLOYEE_TYPES), rng)
+            steps += 1
+        except GameRuleError:
+            pass
+    while True:
+        try:
+            engine.step_task(state, rng.choice(engine.TASK_TYPES), rng)
+        except GameRuleError:
+            return steps
+        steps += 1
+
+
+POLICIES = {
+    'grind': policy_grind,
+    'balanced': policy_balanced,
+    'growth': policy_growth,
+    'random': policy_random,
+}
+
+
+def run_game(policy, days=engine.MAX_DAYS, seed=None, state=None):
+    """Play one game and return its outcome.
+
+    `policy` is a name from POLICIES or a play_day function.
+    """
+    play_day = POLICIES[policy] if isinstance(policy, str) else policy
+    rng = random.Random(seed)
+    state = state if state is not None else engine.new_game()
+
+    steps = 0
+    game_over = None
+    for _ in range(days):
+        steps += play_day(state, rng)
+        summary = engine.end_day(state, now='simulation')
+        steps += 1
+        game_over = summary.get('game_over')
+        if game_over:
+            break
+
+    return {
+        'days': state['day'],
+        'steps': steps,
+        'cash': state['cash'],
+        'valuation': company_valuation(state),
+        'level': state['level'],
+        'reputation': state['reputation'],
+        'employees': len(state['employees']),
+        'completedTasks': state['completedTasks'],
+        'outcome': game_over['reason'] if game_over else None,
+        # Oyun sonu, o günün gün sonu başında tespit edilir
+        'outcome_day': state['day'] - 1 if game_over else None,
+        'state': state,
+    }
+
+
+def company_valuation(state):
+    """Cash plus the book value of opened departments (setup + upgrades paid)."""
+    value = state.get('cash', 0)
+    for dept_type, level in state.get('departments', {}).items():
+        if level > 0 and dept_type in EconomicSystem.DEPARTMENT_COSTS:
+            value += EconomicSystem.department_value(dept_type, level)
+    return round(value, 2)
+
+
+def run_games(policy, games, days=engine.MAX_DAYS, seed=None):
+    """Play `games` games and summarize them, including throughput."""
+    base_seed = seed if seed is not None else random.randrange(2 ** 32)
+    started = time.perf_counter()
+
+    steps = 0
+    cash = []
+    outcomes = {}
+    for i in range(games):
+        result = run_game(policy, days, seed=base_seed + i)
+        steps += result['steps']
+        cash.append(result['cash'])
+        outcome = result['outcome'] or 'Süre doldu'
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    elapsed = time.perf_counter() - started
+    cash.sort()
+    return {
+        'policy': policy if isinstance(policy, str) else policy.__name__,
+        'games': games,
+        'days': days,
+        'seed': base_seed,
+        'steps': steps,
+        'elapsed': elapsed,
+        'steps_per_second': steps / elapsed if elapsed else float('inf'),
+        'games_per_second': games / elapsed if elapsed else float('inf'),
+        'mean_cash': sum(cash) / games if games else 0,
+        'median_cash': cash[games // 2] if games else 0,
+        'outcomes': outcomes,
+    }
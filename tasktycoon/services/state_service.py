@@ -34,8 +34,8 @@ MINI_EVENTS = [
     },
 ]
 
-def apply_random_event(state):
-    event = random.choice(MINI_EVENTS)
+def apply_random_event(state, rng=None):
+    event = (rng or random).choice(MINI_EVENTS)
     # Etkiyi uygula
     effect = event.get("effect", {})
     for k, v in effect.items():
@@ -48,8 +48,22 @@ def apply_random_event(state):
     # Olayı döndür
     return {"id": event["id"], "name": event["name"], "desc": event["desc"], "effect": effect}
 import os
+import re
+import copy
 import json
-from ..config import STATE_PATH
+import atexit
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from ..config import (STATE_PATH, STATE_CACHE_ENABLED,
+                      STATE_WRITE_MODE, STATE_FLUSH_INTERVAL,
+                      STATE_JOURNAL_ENABLED, JOURNAL_DIR, JOURNAL_COMPACT_EVERY,
+                      STATE_BACKEND, SQLITE_PATH, COMPANIES_DIR,
+                      STATE_CACHE_MAX_COMPANIES, STATE_CACHE_MAX_BYTES,
+                      STATE_DELTA_HISTORY, HISTORY_DIR, METRICS_DIR)
+from . import (journal_service, storage_service, history_service, employee_service,
+               event_service, archive_service, metrics_service, timing_service)
 
 def get_default_state():
     return {
@@ -74,6 +88,8 @@ def get_default_state():
         "breakthroughs": 0,
         "taskHistory": [],
         "dayHistory": [],
+        "historyAggregates": history_service.empty_aggregates(),
+        "aggregates": employee_service.empty_aggregates(),
         "achievements": {
             "unlocked": {},  # {"ach_id": "2025-09-01T12:34:56"}
             "all": [
@@ -90,23 +106,713 @@ def get_default_state():
         }
     }
 
-def load_state():
-    if not os.path.exists(STATE_PATH):
-        save_state(get_default_state())
-    with open(STATE_PATH, 'r') as f:
-        state = json.load(f)
-        # Geriye dönük uyumluluk için dayHistory yoksa ekle
-        if 'dayHistory' not in state:
-            state['dayHistory'] = []
-        # Geriye dönük uyumluluk için achievements yoksa ekle
-        if 'achievements' not in state:
-            state['achievements'] = get_default_state()['achievements']
-        # Geriye dönük uyumluluk: unlocked eski tipte ise dönüştür
-        if isinstance(state['achievements'].get('unlocked', None), list):
-            # Eski unlocked: ["id1", "id2"] -> {"id1": "", "id2": ""}
-            state['achievements']['unlocked'] = {k: "" for k in state['achievements']['unlocked']}
-        return state
-
-def save_state(state):
-    with open(STATE_PATH, 'w') as f:
-        json.dump(state, f, indent=2)
+DEFAULT_COMPANY = 'default'
+_COMPANY_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Sadece eklenen (kayıtları sonradan değişmeyen) listeler; for_update kopyasında
+# liste kopyalanır, elemanlar paylaşılır
+_APPEND_ONLY_KEYS = ('taskHistory', 'dayHistory')
+
+# Tam geçmişi diskte tutulan listeler -> archive_service akışı
+_ARCHIVED_KEYS = {'taskHistory': 'tasks', 'dayHistory': 'days'}
+
+
+class StateConflictError(Exception):
+    """Raised by save_state() when the state changed since it was loaded."""
+
+    def __init__(self, current_version, expected_version):
+        super().__init__(f'State version çakışması: beklenen {expected_version}, mevcut {current_version}')
+        self.current_version = current_version
+        self.expected_version = expected_version
+
+
+# İstek bazında aktif şirket; create_app() her istekte ayarlar
+_current_company = contextvars.ContextVar('current_company', default=DEFAULT_COMPANY)
+# track_saves() ile açılan kutu: bu bağlamda kaydedilen versiyonlar (kayıt/tekrar sırası)
+_saved_versions = contextvars.ContextVar('saved_versions', default=None)
+
+
+class _CompanyState:
+    """Cache entry for one company's state."""
+
+    def __init__(self, company_id, backend):
+        self.company_id = company_id
+        self.backend = backend
+        self.state = None
+        self.stamp = None     # backend damgası - dışarıdan değişirse yeniden yüklenir
+        self.version = 0      # her başarılı save_state() ile artar (optimistic concurrency)
+        self.dirty = False    # write_behind: diske yazılmamış değişiklik var mı
+        # Artımlı yazım: diske yazılmış son state'in kopyası ve journal sıra numarası
+        self.shadow = None
+        self.seq = 0
+        self.pending = []     # henüz backend'e yazılmamış journal satırları
+        self.size = 0         # LRU için bellekteki state'in yaklaşık serileştirilmiş boyutu
+        # Delta cevapları için önceki (versiyon, state) çiftleri; kaydedilmiş
+        # state'ler yerinde değiştirilmediği için referans tutmak yeterli
+        self.history = deque(maxlen=STATE_DELTA_HISTORY)
+        # Arşive henüz yazılmamış geçmiş op'ları (append/trim/set) ve arşivler
+        self.archive_ops = []
+        self.archives = {}
+        # Günlük metrik serisine yazılacak ('append'|'reset', satırlar)
+        self.metric_ops = []
+        self.metrics = None
+        self.lock = threading.Lock()        # state/dirty/pending
+        # Aynı anda tek backend yazımı; LRU'dan atılıp yeniden oluşturulan
+        # kayıtlar da aynı kilidi paylaşır
+        self.write_lock = _write_locks.setdefault(company_id, threading.Lock())
+
+
+# LRU: company_id -> _CompanyState, en son kullanılan sonda
+_entries = OrderedDict()
+_entries_lock = threading.RLock()
+_stats = {'hits': 0, 'misses': 0, 'flushes': 0, 'evictions': 0}
+_flush_timer_lock = threading.Lock()
+_flush_timer = None
+_backends = {}
+_write_locks = {}
+
+
+def validate_company_id(company_id):
+    """Return the company id or raise ValueError if it is not a safe name."""
+    if not company_id or not _COMPANY_ID_RE.match(company_id):
+        raise ValueError(f'Geçersiz şirket id: {company_id!r}')
+    return company_id
+
+def get_current_company():
+    return _current_company.get()
+
+def set_current_company(company_id):
+    """Scope following load_state/save_state calls to `company_id`.
+
+    Returns a token for reset_current_company().
+    """
+    return _current_company.set(validate_company_id(company_id or DEFAULT_COMPANY))
+
+def reset_current_company(token):
+    _current_company.reset(token)
+
+@contextmanager
+def company_scope(company_id):
+    token = set_current_company(company_id)
+    try:
+        yield
+    finally:
+        reset_current_company(token)
+
+def track_saves():
+    """Collect the versions produced by save_state() in this context.
+
+    Returns a token for reset_saved_versions(); see last_saved_version().
+    """
+    return _saved_versions.set([])
+
+def last_saved_version():
+    """Version of the last save made since track_saves(), or None."""
+    saved = _saved_versions.get()
+    return saved[-1] if saved else None
+
+def reset_saved_versions(token):
+    _saved_versions.reset(token)
+
+def get_backend(company_id=None):
+    """Return the storage backend (selected by STATE_BACKEND) of a company.
+
+    The default company keeps the original paths; others live under
+    COMPANIES_DIR/<id>/.
+    """
+    company_id = company_id or get_current_company()
+    backend = _backends.get(company_id)
+    if backend is None:
+        if company_id == DEFAULT_COMPANY:
+            state_path, journal_dir, sqlite_path = STATE_PATH, JOURNAL_DIR, SQLITE_PATH
+        else:
+            base = os.path.join(COMPANIES_DIR, company_id)
+            state_path = os.path.join(base, 'state.json')
+            journal_dir = os.path.join(base, 'journal')
+            sqlite_path = os.path.join(base, 'state.db')
+            os.makedirs(base, exist_ok=True)
+        if STATE_BACKEND == 'sqlite':
+            backend = storage_service.SqliteStateBackend(sqlite_path)
+        else:
+            backend = storage_service.JsonStateBackend(
+                state_path, journal_dir,
+                journal_enabled=STATE_JOURNAL_ENABLED,
+                compact_every=JOURNAL_COMPACT_EVERY)
+        backend = _backends.setdefault(company_id, backend)
+    return backend
+
+def _entry(company_id=None):
+    """Return the LRU entry of a company, creating it if needed."""
+    company_id = company_id or get_current_company()
+    with _entries_lock:
+        entry = _entries.get(company_id)
+        if entry is None:
+            entry = _entries[company_id] = _CompanyState(company_id, get_backend(company_id))
+        else:
+            _entries.move_to_end(company_id)
+    return entry
+
+def _evict_if_needed():
+    """Drop least recently used companies beyond the configured limits.
+
+    Dirty entries are flushed before they leave memory.
+    """
+    while True:
+        with _entries_lock:
+            total = sum(e.size for e in _entries.values())
+            if len(_entries) <= 1 or (len(_entries) <= STATE_CACHE_MAX_COMPANIES
+                                      and total <= STATE_CACHE_MAX_BYTES):
+                return
+            company_id, entry = next(iter(_entries.items()))
+            del _entries[company_id]
+            # Yazım bitene kadar aynı şirket için yeni kayıt backend'i okumasın
+            entry.write_lock.acquire()
+        try:
+            _flush_entry_locked(entry)
+        finally:
+            entry.write_lock.release()
+        _release_company(company_id)
+        _stats['evictions'] += 1
+
+def _release_company(company_id):
+    # Atılan şirket bu arada yeniden yüklenmediyse backend'i (SQLite bağlantısı)
+    # kapat, backend ve yazım kilidi sözlükleri şirket sayısıyla büyümesin
+    with _entries_lock:
+        if company_id in _entries:
+            return
+        backend = _backends.pop(company_id, None)
+        _write_locks.pop(company_id, None)
+    if backend is not None:
+        backend.close()
+
+def _migrate_state(state):
+    """Apply backward-compat migrations in place; returns True if any ran."""
+    changed = False
+    # Geriye dönük uyumluluk için dayHistory yoksa ekle
+    if 'dayHistory' not in state:
+        state['dayHistory'] = []
+        changed = True
+    # Geriye dönük uyumluluk için achievements yoksa ekle
+    if 'achievements' not in state:
+        state['achievements'] = get_default_state()['achievements']
+        changed = True
+    # Geriye dönük uyumluluk: unlocked eski tipte ise dönüştür
+    if isinstance(state['achievements'].get('unlocked', None), list):
+        # Eski unlocked: ["id1", "id2"] -> {"id1": "", "id2": ""}
+        state['achievements']['unlocked'] = {k: "" for k in state['achievements']['unlocked']}
+        changed = True
+    # Sınırsız büyümüş geçmişleri sınırla, eskileri özet istatistiklere devret
+    if history_service.ensure_history_aggregates(state):
+        changed = True
+    # Çalışan özetleri yoksa baştan hesapla
+    if 'aggregates' not in state:
+        employee_service.rebuild_aggregates(state)
+        changed = True
+    # Bellekte çalışanlar id index'li Roster olarak tutulur (JSON düzeni aynı)
+    employee_service.get_roster(state)
+    return changed
+
+def ensure_state():
+    """Create the default state if the backend has none yet."""
+    if not get_backend().exists():
+        save_state(get_default_state(), event='state_created')
+
+def load_state(for_update=False):
+    """Return the migrated game state of the current company.
+
+    By default the cached live state is returned and must be treated as
+    read-only. Callers that modify the state pass for_update=True to get a
+    private copy and persist it with save_state(), which rejects the write
+    with StateConflictError if another request saved in between.
+    """
+    with timing_service.span('state_load'):
+        state = _load_cached()
+        return _clone_for_update(state) if for_update else state
+
+def get_state_version():
+    """Return the current company's state version without copying the state."""
+    entry = _entry()
+    if entry.state is None:
+        _load_cached()
+    return entry.version
+
+def state_delta(state, since):
+    """Return the journal ops that turn version `since` into `state`.
+
+    Returns None if that version is no longer kept in memory (see
+    STATE_DELTA_HISTORY); the caller then sends the full state.
+    """
+    if since == state.get('version'):
+        return []
+    entry = _entry()
+    with entry.lock:
+        base = next((old for version, old in entry.history if version == since), None)
+    if base is None:
+        return None
+    return journal_service.diff_state(base, state)
+
+def update_state(mutate, event=None, retries=3, expected_version=None):
+    """Load, mutate and save with automatic retry on version conflicts.
+
+    `mutate(state)` must be safe to re-run on a fresh copy; returns the
+    saved state and mutate's return value. An exception raised by `mutate`
+    (e.g. a GameRuleError) aborts without saving. Raises StateConflictError
+    after `retries` attempts.
+
+    With `expected_version` (a client's If-Match) there is a single attempt:
+    it must be the loaded version and the compare-and-swap in save_state()
+    fails if another save lands before this one.
+    """
+    if expected_version is not None:
+        retries = 1
+    for attempt in range(retries):
+        state = load_state(for_update=True)
+        if expected_version is not None and state.get('version', 0) != expected_version:
+            raise StateConflictError(state.get('version', 0), expected_version)
+        result = mutate(state)
+        try:
+            save_state(state, event=event)
+            return state, result
+        except StateConflictError:
+            if attempt == retries - 1:
+                raise
+
+def _load_cached():
+    entry = _entry()
+    # Diske yazılmamış değişiklik varsa bellekteki state en güncel olandır
+    if entry.dirty:
+        _stats['hits'] += 1
+        return entry.state
+
+    stamp = entry.backend.stamp()
+    if stamp is None:
+        save_state(get_default_state(), event='state_created')
+        _stats['misses'] += 1
+        return entry.state
+    if STATE_CACHE_ENABLED and entry.state is not None and entry.stamp == stamp:
+        _stats['hits'] += 1
+        return entry.state
+
+    _stats['misses'] += 1
+    state, seq = entry.backend.read()
+    migrated = _migrate_state(state)
+    data = _serialize(state)
+
+    with entry.lock:
+        entry.state = state
+        entry.stamp = stamp
+        entry.version = state.get('version', 0)
+        entry.history.clear()
+        entry.seq = seq
+        # Migration yapısal değişiklik yaptıysa journal'ın yeni kayıtları eski
+        # snapshot'a uygulanamaz; shadow'suz kalan kayıt ilk flush'ta tam yazılır
+        if entry.backend.incremental and not migrated:
+            entry.shadow = json.loads(data)
+        else:
+            entry.shadow = None
+        entry.size = len(data)
+    _evict_if_needed()
+    return state
+
+def save_state(state, event=None, expected_version=None):
+    """Persist the current company's state according to STATE_WRITE_MODE.
+
+    If `state` carries a 'version' (or `expected_version` is given) it must
+    still be the current version (compare-and-swap), otherwise
+    StateConflictError is raised; states without a version (resets)
+    overwrite unconditionally. The saved state gets the next version.
+
+    'sync' writes before returning; 'write_behind' only marks the state dirty
+    and merges bursts of saves into one flush after STATE_FLUSH_INTERVAL
+    seconds (and at interpreter shutdown or LRU eviction). Incremental
+    backends receive each save as a small journal record named after `event`.
+    States from outside (client saves, resets, snapshots) get the same
+    migrations as loaded ones before they enter the cache.
+
+    The saved object becomes the cached state and is serialized by the
+    flusher without further locking: it must not be modified afterwards.
+    """
+    with timing_service.span('state_save'):
+        _migrate_state(state)
+        entry = _entry()
+        if entry.state is None:
+            _prime_entry(entry)
+        if STATE_WRITE_MODE == 'write_behind':
+            with entry.lock:
+                _swap_state(entry, state, event, expected_version)
+                entry.dirty = True
+            _schedule_flush()
+        else:
+            with entry.write_lock:
+                with entry.lock:
+                    _swap_state(entry, state, event, expected_version)
+                    entry.dirty = True
+                _flush_entry_locked(entry)
+        saved = _saved_versions.get()
+        if saved is not None:
+            saved.append(state['version'])
+        _evict_if_needed()
+
+def _swap_state(entry, state, event, expected_version=None):
+    # entry.lock tutulurken çağrılır
+    expected = expected_version if expected_version is not None else state.get('version')
+    if expected is not None and expected != entry.version:
+        raise StateConflictError(entry.version, expected)
+    previous = entry.state
+    if previous is not None:
+        entry.history.append((entry.version, previous))
+    state['version'] = entry.version + 1
+    entry.version = state['version']
+    entry.state = state
+    _record_change(entry, state, event)
+    _record_history(entry, previous, state)
+    event_service.publish_state_change(entry.company_id, previous, state, event)
+
+def flush_state():
+    """Write pending write-behind changes of every loaded company.
+
+    Returns True if anything was written.
+    """
+    global _flush_timer
+    with _flush_timer_lock:
+        _flush_timer = None
+    with _entries_lock:
+        entries = [e for e in _entries.values() if e.dirty]
+    wrote = False
+    for entry in entries:
+        wrote = _flush_entry(entry) or wrote
+    return wrote
+
+def compact_journal():
+    """Fold the current company's journal into a fresh snapshot."""
+    entry = _entry()
+    with entry.write_lock:
+        _flush_entry_locked(entry)
+        if entry.shadow is not None:
+            entry.backend.compact(entry.shadow, entry.seq)
+            entry.stamp = entry.backend.stamp()
+
+def read_journal(day=None, event=None):
+    """Return journal records, e.g. to audit what happened on one day."""
+    _flush_entry(_entry())
+    return get_backend().read_journal(day=day, event=event)
+
+def load_day_history(n):
+    """Return the last n day summaries without loading the whole state when
+    the backend can query them directly."""
+    if n > 0 and _entry().state is None:
+        rows = get_backend().day_history(n)
+        if rows is not None:
+            return rows
+    history = load_state().get('dayHistory', []) or []
+    return history[-n:]
+
+def load_employees():
+    """Return the employee list, read row-wise when the backend supports it."""
+    if _entry().state is None:
+        rows = get_backend().employees()
+        if rows is not None:
+            return rows
+    return load_state().get('employees', [])
+
+def _prime_entry(entry):
+    """Read the persisted state of a company that is saved without having
+    been loaded, so its version and journal sequence continue correctly."""
+    with entry.write_lock:
+        if entry.state is not None or entry.stamp is not None:
+            return
+        stamp = entry.backend.stamp()
+        if stamp is None:
+            return
+        persisted, seq = entry.backend.read()
+        migrated = _migrate_state(persisted)
+        with entry.lock:
+            entry.version = persisted.get('version', 0)
+            if entry.backend.incremental and not migrated:
+                entry.shadow = persisted
+            entry.seq = seq
+            entry.stamp = stamp
+
+def _record_change(entry, state, event):
+    # entry.lock tutulurken çağrılır
+    if entry.shadow is None or not entry.backend.incremental:
+        # Hiç yüklenmemiş bir state kaydediliyor: ilk flush snapshot yazar
+        return
+    ops = journal_service.diff_state(entry.shadow, state)
+    if not ops:
+        return
+    entry.seq += 1
+    line = journal_service.make_record(entry.seq, event, state, ops)
+    entry.pending.append(line)
+    # Boyut journal satırına göre değil, state'e etkisine göre güncellenir
+    entry.size = max(0, entry.size + journal_service.size_delta(entry.shadow, ops))
+    # Shadow'u kaydın kendisinden güncelle: replay ile birebir aynı sonuç
+    journal_service.apply_ops(entry.shadow, json.loads(line)['ops'])
+
+def _record_history(entry, previous, state):
+    # entry.lock tutulurken çağrılır
+    if previous is None:
+        return
+    for key, stream in _ARCHIVED_KEYS.items():
+        old, new = previous.get(key) or [], state.get(key) or []
+        if old is not new and old != new:
+            pending = any(op[1][0] == key for op in entry.archive_ops)
+            if not pending and not _archive(entry, stream).exists():
+                # Bu akışın arşivi ilk kez oluşuyor: değişiklikten önceki geçmişle başlat
+                entry.archive_ops.append(['set', [key], old])
+            ops = journal_service.diff_list(key, old, new)
+            entry.archive_ops.extend(ops)
+            if key == 'dayHistory':
+                _record_metrics(entry, old, state, ops)
+
+def _record_metrics(entry, old_days, state, ops):
+    # entry.lock tutulurken çağrılır; gün sonu satırları o anki state'ten alınır
+    if not entry.metric_ops and not _metrics(entry).exists():
+        entry.metric_ops.append(('reset', [metrics_service.row_from_summary(s) for s in old_days]))
+    for op in ops:
+        if op[0] == 'append':
+            entry.metric_ops.append(('append', [metrics_service.row_from_state(state, s) for s in op[2]]))
+        elif op[0] == 'set':
+            entry.metric_ops.append(('reset', [metrics_service.row_from_summary(s) for s in op[2]]))
+
+def _flush_archive(entry, state, ops):
+    # entry.write_lock tutulurken çağrılır
+    for key, stream in _ARCHIVED_KEYS.items():
+        archive = _archive(entry, stream)
+        for op in ops:
+            if op[1][0] != key:
+                continue
+            if op[0] == 'append':
+                archive.append(op[2])
+            elif op[0] == 'set':
+                archive.reset(op[2])
+            # 'trim': state'ten düşen kayıtlar arşivde kalır
+        if not archive.exists():
+            # Arşivden önce başlamış oyun: state'teki (sınırlı) geçmişle başla
+            archive.reset(state.get(key) or [])
+
+def _flush_metrics(entry, state, ops):
+    # entry.write_lock tutulurken çağrılır
+    series = _metrics(entry)
+    for kind, rows in ops:
+        if kind == 'reset':
+            series.reset(rows)
+        else:
+            series.append(rows)
+    if not series.exists():
+        series.reset(metrics_service.row_from_summary(s) for s in state.get('dayHistory') or [])
+
+def _company_dir(entry, default_dir, name):
+    # Varsayılan şirket config'deki yolu, diğerleri COMPANIES_DIR/<id>/<name> kullanır
+    if entry.company_id == DEFAULT_COMPANY:
+        return default_dir
+    return os.path.join(COMPANIES_DIR, entry.company_id, name)
+
+def _metrics(entry):
+    if entry.metrics is None:
+        entry.metrics = metrics_service.MetricSeries(_company_dir(entry, METRICS_DIR, 'metrics'))
+    return entry.metrics
+
+def _archive(entry, stream):
+    archive = entry.archives.get(stream)
+    if archive is None:
+        directory = _company_dir(entry, HISTORY_DIR, 'history')
+        archive = entry.archives[stream] = archive_service.HistoryArchive(directory, stream)
+    return archive
+
+def history_page(stream, **query):
+    """Return a cursor page of the current company's full 'tasks' or 'days'
+    history (see archive_service.HistoryArchive.page).
+
+    Pending history changes are served from memory on top of the archive;
+    only the flush writes them, after the state, so the archive on disk is
+    never ahead of the saved state.
+    """
+    key = next(k for k, s in _ARCHIVED_KEYS.items() if s == stream)
+    entry = _entry()
+    if entry.state is None:
+        _load_cached()
+    archive = _archive(entry, stream)
+    with entry.write_lock:
+        # write_lock: arşive yazan bir flush yarıda değil, bekleyen op'lar tam
+        with entry.lock:
+            replace, records = _pending_history(entry, key, archive)
+        return archive.page(pending=records, replace=replace, **query)
+
+def _pending_history(entry, key, archive):
+    # entry.lock tutulurken çağrılır; _flush_archive'ın yazacağını bellekte
+    # hesaplar: (arşivdekilerin yerine mi, arkasına eklenecek kayıtlar)
+    replace, records = False, []
+    for op in entry.archive_ops:
+        if op[1][0] != key:
+            continue
+        if op[0] == 'append':
+            records.extend(op[2])
+        elif op[0] == 'set':
+            replace, records = True, list(op[2])
+    if not replace and not records and not archive.exists():
+        replace, records = True, list(entry.state.get(key) or [])
+    return replace, records
+
+def read_metrics(read):
+    """Run `read(series)` on the current company's per-day MetricSeries.
+
+    Pending day-end rows are applied to an in-memory copy of the series, so
+    it is current without writing; the flush writes them after the state.
+    """
+    entry = _entry()
+    if entry.state is None:
+        _load_cached()
+    series = _metrics(entry)
+    with entry.write_lock:
+        with entry.lock:
+            ops = list(entry.metric_ops)
+            if not ops and not series.exists():
+                ops = [('reset', [metrics_service.row_from_summary(s)
+                                  for s in entry.state.get('dayHistory') or []])]
+        return read(series.overlay(ops) if ops else series)
+
+def _flush_entry(entry):
+    with entry.write_lock:
+        return _flush_entry_locked(entry)
+
+def _flush_entry_locked(entry):
+    # entry.write_lock tutulurken çağrılır
+    backend = entry.backend
+    with entry.lock:
+        if not entry.dirty:
+            return False
+        entry.dirty = False
+        state = entry.state
+        lines, entry.pending = entry.pending, []
+        archive_ops, entry.archive_ops = entry.archive_ops, []
+        metric_ops, entry.metric_ops = entry.metric_ops, []
+        full_write = not backend.incremental or entry.shadow is None
+        if full_write:
+            data = _serialize(state)
+            entry.size = len(data)
+            snapshot = json.loads(data)
+            if backend.incremental:
+                entry.shadow = snapshot
+        seq = entry.seq
+    try:
+        if full_write:
+            backend.write_snapshot(snapshot, seq)
+        else:
+            backend.write_records(lines, entry.shadow, seq)
+    except Exception:
+        with entry.lock:
+            entry.pending = lines + entry.pending
+            entry.archive_ops = archive_ops + entry.archive_ops
+            entry.metric_ops = metric_ops + entry.metric_ops
+            entry.dirty = True
+        raise
+    _flush_archive(entry, state, archive_ops)
+    _flush_metrics(entry, state, metric_ops)
+    _stats['flushes'] += 1
+    # Yazdığımız içerik artık güncel state, bir sonraki load yeniden okumaz
+    entry.stamp = backend.stamp()
+    return True
+
+def _schedule_flush():
+    global _flush_timer
+    with _flush_timer_lock:
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(STATE_FLUSH_INTERVAL, flush_state)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+def _clone_for_update(state):
+    clone = {}
+    for key, value in state.items():
+        if key in _APPEND_ONLY_KEYS and isinstance(value, list):
+            clone[key] = list(value)
+        elif key == 'achievements' and isinstance(value, dict):
+            # Katalog ('all') hiç değişmez, paylaşılır; derlenmiş indeksi de böylece korunur
+            clone[key] = {k: dict(v) if isinstance(v, dict) else v for k, v in value.items()}
+        elif isinstance(value, employee_service.Roster):
+            # Satırlar yerinde değiştirilmez; index/kolonlar ile sığ kopya yeterli
+            clone[key] = value.copy()
+        elif isinstance(value, (dict, list)):
+            clone[key] = copy.deepcopy(value)
+        else:
+            clone[key] = value
+    return clone
+
+def _serialize(state):
+    # Kaydedilmiş state yerinde değiştirilmez (istekler load_state(for_update=True)
+    # kopyasını değiştirir), flusher'ın gördüğü nesne bu yüzden sabittir
+    return json.dumps(state)
+
+def invalidate_state_cache(company_id=None):
+    """Drop cached state (one company, or all) so the next load re-reads it."""
+    flush_state()
+    with _entries_lock:
+        if company_id is None:
+            _entries.clear()
+        else:
+            _entries.pop(company_id, None)
+
+def use_data_dir(data_dir):
+    """Point every storage path at `data_dir` and forget loaded companies.
+
+    Used by the replay tool to drive an app on fresh storage.
+    """
+    global STATE_PATH, JOURNAL_DIR, SQLITE_PATH, COMPANIES_DIR, HISTORY_DIR, METRICS_DIR
+    flush_state()
+    with _entries_lock:
+        _entries.clear()
+        backends = list(_backends.values())
+        _backends.clear()
+        _write_locks.clear()
+    for backend in backends:
+        backend.close()
+    os.makedirs(data_dir, exist_ok=True)
+    STATE_PATH = os.path.join(data_dir, 'state.json')
+    JOURNAL_DIR = os.path.join(data_dir, 'journal')
+    SQLITE_PATH = os.path.join(data_dir, 'state.db')
+    COMPANIES_DIR = os.path.join(data_dir, 'companies')
+    HISTORY_DIR = os.path.join(data_dir, 'history')
+    METRICS_DIR = os.path.join(data_dir, 'metrics')
+
+def get_cache_stats():
+    """Return hit/miss counters and LRU usage of the state cache."""
+    lookups = _stats['hits'] + _stats['misses']
+    with _entries_lock:
+        entries = list(_entries.values())
+    current = _entries.get(get_current_company())
+    return {
+        'enabled': STATE_CACHE_ENABLED,
+        'hits': _stats['hits'],
+        'misses': _stats['misses'],
+        'hit_rate': round(_stats['hits'] / lookups, 3) if lookups else 0.0,
+        'backend': get_backend().name,
+        'write_mode': STATE_WRITE_MODE,
+        'flushes': _stats['flushes'],
+        'evictions': _stats['evictions'],
+        'companies_loaded': len(entries),
+        'companies_dirty': sum(1 for e in entries if e.dirty),
+        'bytes': sum(e.size for e in entries),
+        'max_companies': STATE_CACHE_MAX_COMPANIES,
+        'max_bytes': STATE_CACHE_MAX_BYTES,
+        'company': get_current_company(),
+        'version': current.version if current else 0,
+        'cached': current is not None and current.state is not None,
+        'journal': {
+            'enabled': get_backend().incremental,
+            'seq': current.seq if current else 0,
+        },
+    }
+
+def get_state_sizes():
+    """Return [(company, memory_bytes, file_bytes), ...] of the loaded companies.
+
+    memory_bytes is the serialized size of the cached state, file_bytes what
+    its backend currently occupies on disk.
+    """
+    with _entries_lock:
+        entries = list(_entries.values())
+    return [(entry.company_id, entry.size, entry.backend.size()) for entry in entries]
+
+# Kapanışta bekleyen değişiklikleri diske yaz
+atexit.register(flush_state)
@@ -0,0 +1,362 @@
+"""
+Storage Service
+Pluggable persistence backends behind state_service.load_state/save_state.
+
+- JsonStateBackend:   state.json snapshot + append-only journal (default)
+- SqliteStateBackend: normalized tables (company scalars, departments,
+                      employees, taskHistory, dayHistory) updated
+                      incrementally from the same journal ops
+
+Backends deal with raw (unmigrated) state dicts; caching, write-behind and
+diffing stay in state_service.
+"""
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+from . import journal_service
+
+# SQLite'da ayrı tablolarda tutulan state alanları
+NORMALIZED_KEYS = ('departments', 'employees', 'taskHistory', 'dayHistory')
+
+
+class JsonStateBackend:
+    """state.json snapshot plus the journal in journal_dir."""
+
+    name = 'json'
+
+    def __init__(self, state_path, journal_dir, journal_enabled=True, compact_every=500):
+        self.state_path = state_path
+        self.journal_dir = journal_dir
+        self.journal_enabled = journal_enabled
+        self.compact_every = compact_every
+        self.snapshot_seq = 0
+
+    @property
+    def incremental(self):
+        return self.journal_enabled
+
+    def stamp(self):
+        try:
+            st = os.stat(self.state_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def exists(self):
+        return os.path.exists(self.state_path)
+
+    def close(self):
+        pass
+
+    def size(self):
+        """On-disk bytes of the snapshot and the active journal segment."""
+        return sum(_file_size(path) for path in (
+            self.state_path, os.path.join(self.journal_dir, journal_service.ACTIVE_SEGMENT)))
+
+    def read(self):
+        """Return (state, seq): the snapshot with the journal tail replayed."""
+        with open(self.state_path, 'r') as f:
+            state = json.load(f)
+        self.snapshot_seq = seq = state.pop('journalSeq', 0)
+        if self.journal_enabled:
+            for record in journal_service.read_active(self.journal_dir, after_seq=seq):
+                journal_service.apply_ops(state, record['ops'])
+                seq = record['seq']
+        return state, seq
+
+    def write_snapshot(self, state, seq):
+        # Snapshot hangi journal kaydına kadar olanı içerdiğini saklar; yarıda
+        # kalan bir sıkıştırmada aynı kayıtlar iki kez uygulanmaz
+        payload = dict(state, journalSeq=seq) if self.journal_enabled else state
+        _atomic_write(self.state_path, json.dumps(payload, separators=(',', ':')))
+        self.snapshot_seq = seq
+        if self.journal_enabled:
+            journal_service.archive_active(self.journal_dir, seq)
+
+    def write_records(self, lines, shadow, seq):
+        journal_service.append_lines(self.journal_dir, lines)
+        if seq - self.snapshot_seq >= self.compact_every:
+            self.write_snapshot(shadow, seq)
+
+    def compact(self, shadow, seq):
+        if self.journal_enabled and seq > self.snapshot_seq:
+            self.write_snapshot(shadow, seq)
+
+    def read_journal(self, day=None, event=None):
+        return journal_service.read_journal(self.journal_dir, day=day, event=event)
+
+    # JSON dosyası satır bazlı okunamaz; None -> çağıran tam state'i kullanır
+    def day_history(self, n):
+        return None
+
+    def employees(self):
+        return None
+
+
+class SqliteStateBackend:
+    """Normalized SQLite storage, updated in place from journal ops."""
+
+    name = 'sqlite'
+    incremental = True
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS company (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS departments (key TEXT PRIMARY KEY, level INTEGER);
+        CREATE TABLE IF NOT EXISTS employees (
+            id TEXT PRIMARY KEY, pos INTEGER, name TEXT, salary REAL,
+            efficiency REAL, data TEXT);
+        CREATE INDEX IF NOT EXISTS idx_employees_pos ON employees (pos);
+        CREATE TABLE IF NOT EXISTS task_history (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, day INTEGER, type TEXT,
+            reward REAL, data TEXT);
+        CREATE INDEX IF NOT EXISTS idx_task_history_day ON task_history (day);
+        CREATE INDEX IF NOT EXISTS idx_task_history_type ON task_history (type, day);
+        CREATE TABLE IF NOT EXISTS day_history (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT, day INTEGER, data TEXT);
+        CREATE INDEX IF NOT EXISTS idx_day_history_day ON day_history (day);
+        CREATE TABLE IF NOT EXISTS journal (
+            seq INTEGER PRIMARY KEY, event TEXT, day INTEGER, ts TEXT, ops TEXT);
+        CREATE INDEX IF NOT EXISTS idx_journal_day ON journal (day);
+    '''
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(self.SCHEMA)
+        return self._conn
+
+    def stamp(self):
+        # data_version başka bağlantılar commit ettiğinde değişir
+        with self._lock:
+            conn = self._connect()
+            if not self.exists():
+                return None
+            return (conn.execute('PRAGMA data_version').fetchone()[0],
+                    self._meta(conn, 'revision', 0))
+
+    def exists(self):
+        conn = self._connect()
+        return conn.execute("SELECT 1 FROM meta WHERE key = 'revision'").fetchone() is not None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def size(self):
+        """On-disk bytes of the database including its WAL file."""
+        return _file_size(self.db_path) + _file_size(self.db_path + '-wal')
+
+    def read(self):
+        with self._lock:
+            conn = self._connect()
+            state = {}
+            for key, value in conn.execute('SELECT key, value FROM company'):
+                state[key] = json.loads(value)
+            state['departments'] = {k: lvl for k, lvl in conn.execute(
+                'SELECT key, level FROM departments ORDER BY rowid')}
+            state['employees'] = [json.loads(d) for (d,) in conn.execute(
+                'SELECT data FROM employees ORDER BY pos')]
+            state['taskHistory'] = [json.loads(d) for (d,) in conn.execute(
+                'SELECT data FROM task_history ORDER BY seq')]
+            state['dayHistory'] = [json.loads(d) for (d,) in conn.execute(
+                'SELECT data FROM day_history ORDER BY seq')]
+            return state, self._meta(conn, 'journalSeq', 0)
+
+    def write_snapshot(self, state, seq):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for table in ('company', 'departments', 'employees',
+                              'task_history', 'day_history'):
+                    conn.execute(f'DELETE FROM {table}')
+                for key, value in state.items():
+                    self._set_key(conn, key, value)
+                self._bump(conn, seq)
+
+    def write_records(self, lines, shadow, seq):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for line in lines:
+                    record = json.loads(line)
+                    for op in record['ops']:
+                        self._apply_op(conn, op)
+                    conn.execute(
+                        'INSERT OR REPLACE INTO journal (seq, event, day, ts, ops) VALUES (?, ?, ?, ?, ?)',
+                        (record['seq'], record['event'], record['day'], record['ts'],
+                         json.dumps(record['ops'], separators=(',', ':'))))
+                self._bump(conn, seq)
+
+    def compact(self, shadow, seq):
+        # Tablolar zaten güncel; ayrı bir snapshot gerekmez
+        pass
+
+    def read_journal(self, day=None, event=None):
+        sql = 'SELECT seq, event, day, ts, ops FROM journal'
+        clauses, params = [], []
+        if day is not None:
+            clauses.append('day = ?')
+            params.append(day)
+        if event is not None:
+            clauses.append('event = ?')
+            params.append(event)
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        with self._lock:
+            rows = self._connect().execute(sql + ' ORDER BY seq', params).fetchall()
+        return [{'seq': s, 'event': e, 'day': d, 'ts': ts, 'ops': json.loads(ops)}
+                for s, e, d, ts, ops in rows]
+
+    def day_history(self, n):
+        """Last n day summaries, most recent last."""
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT data FROM day_history ORDER BY seq DESC LIMIT ?', (n,)).fetchall()
+        return [json.loads(d) for (d,) in reversed(rows)]
+
+    def employees(self):
+        with self._lock:
+            rows = self._connect().execute('SELECT data FROM employees ORDER BY pos').fetchall()
+        return [json.loads(d) for (d,) in rows]
+
+    # --- yardımcılar ---
+
+    def _meta(self, conn, key, default):
+        row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _bump(self, conn, seq):
+        revision = self._meta(conn, 'revision', 0) + 1
+        conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                         [('revision', json.dumps(revision)), ('journalSeq', json.dumps(seq))])
+
+    def _set_key(self, conn, key, value):
+        if key == 'departments':
+            conn.execute('DELETE FROM departments')
+            conn.executemany('INSERT INTO departments (key, level) VALUES (?, ?)',
+                             list(value.items()))
+        elif key == 'employees':
+            conn.execute('DELETE FROM employees')
+            self._insert_employees(conn, value, 0)
+        elif key == 'taskHistory':
+            conn.execute('DELETE FROM task_history')
+            self._insert_tasks(conn, value)
+        elif key == 'dayHistory':
+            conn.execute('DELETE FROM day_history')
+            self._insert_days(conn, value)
+        else:
+            conn.execute('INSERT OR REPLACE INTO company (key, value) VALUES (?, ?)',
+                         (key, json.dumps(value)))
+
+    def _apply_op(self, conn, op):
+        kind, path = op[0], op[1]
+        key = path[0]
+        if kind == 'trim' and key in NORMALIZED_KEYS:
+            table, order = {'employees': ('employees', 'pos'),
+                            'taskHistory': ('task_history', 'seq'),
+                            'dayHistory': ('day_history', 'seq')}[key]
+            conn.execute(f'DELETE FROM {table} WHERE rowid IN '
+                         f'(SELECT rowid FROM {table} ORDER BY {order} LIMIT ?)', (op[2],))
+            return
+        if kind == 'append' and key in NORMALIZED_KEYS:
+            if key == 'employees':
+                start = conn.execute('SELECT COALESCE(MAX(pos) + 1, 0) FROM employees').fetchone()[0]
+                self._insert_employees(conn, op[2], start)
+            elif key == 'taskHistory':
+                self._insert_tasks(conn, op[2])
+            elif key == 'dayHistory':
+                self._insert_days(conn, op[2])
+            return
+        if len(path) == 1:
+            if kind == 'del':
+                if key in NORMALIZED_KEYS:
+                    self._set_key(conn, key, {} if key == 'departments' else [])
+                else:
+                    conn.execute('DELETE FROM company WHERE key = ?', (key,))
+            elif kind == 'set':
+                self._set_key(conn, key, op[2])
+            else:
+                row = conn.execute('SELECT value FROM company WHERE key = ?', (key,)).fetchone()
+                value = {key: json.loads(row[0]) if row else []}
+                journal_service.apply_ops(value, [op])
+                self._set_key(conn, key, value[key])
+            return
+        if key == 'departments':
+            if kind == 'del':
+                conn.execute('DELETE FROM departments WHERE key = ?', (path[1],))
+            else:
+                conn.execute('INSERT OR REPLACE INTO departments (key, level) VALUES (?, ?)',
+                             (path[1], op[2]))
+            return
+        # company tablosundaki JSON değerinin içindeki bir alan (ör. achievements.unlocked)
+        row = conn.execute('SELECT value FROM company WHERE key = ?', (key,)).fetchone()
+        value = {key: json.loads(row[0]) if row else {}}
+        journal_service.apply_ops(value, [op])
+        self._set_key(conn, key, value[key])
+
+    def _insert_employees(self, conn, employees, start):
+        conn.executemany(
+            'INSERT OR REPLACE INTO employees (id, pos, name, salary, efficiency, data) VALUES (?, ?, ?, ?, ?, ?)',
+            [(str(emp.get('id')), start + i, emp.get('name'), emp.get('salary'),
+              emp.get('efficiency'), json.dumps(emp)) for i, emp in enumerate(employees)])
+
+    def _insert_tasks(self, conn, tasks):
+        conn.executemany(
+            'INSERT INTO task_history (day, type, reward, data) VALUES (?, ?, ?, ?)',
+            [(t.get('day'), t.get('type'), t.get('reward'), json.dumps(t)) for t in tasks])
+
+    def _insert_days(self, conn, days):
+        conn.executemany(
+            'INSERT INTO day_history (day, data) VALUES (?, ?)',
+            [(d.get('previous_day'), json.dumps(d)) for d in days])
+
+
+def migrate_json_to_sqlite(state_path, journal_dir, db_path):
+    """Import an existing state.json (+ journal tail) into a SQLite database.
+
+    Returns the number of employees, tasks and days imported.
+    """
+    state, seq = JsonStateBackend(state_path, journal_dir).read()
+    target = SqliteStateBackend(db_path)
+    target.write_snapshot(state, seq)
+    return {
+        'employees': len(state.get('employees', [])),
+        'taskHistory': len(state.get('taskHistory', [])),
+        'dayHistory': len(state.get('dayHistory', [])),
+        'journalSeq': seq,
+    }
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _atomic_write(path, data):
+    """Crash-safe write: temp file + fsync + atomic rename."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.state-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
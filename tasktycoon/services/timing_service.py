@@ -0,0 +1,179 @@
+"""
+Timing Service
+Per-request latency breakdown, Prometheus metrics and slow-request log.
+
+create_app() starts a timer for every request; state_service and the JSON
+provider add the time they spend to the current request's spans:
+
+    state_load  load_state() (cache lookup, disk read, migration, clone)
+    state_save  save_state() (incl. the write itself in 'sync' mode)
+    serialize   building JSON responses
+    compute     the rest of the request
+
+Finished requests feed per-endpoint histograms (one series per phase),
+request/response byte counters and a ring buffer of recent requests from
+which /api/debug/slow picks the slowest. render_prometheus() produces the
+text exposition format for /metrics.
+"""
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+from ..config import TIMING_BUCKETS, SLOW_REQUEST_BUFFER
+
+PHASES = ('total', 'state_load', 'compute', 'state_save', 'serialize')
+SPANS = ('state_load', 'state_save', 'serialize')
+
+# Aktif isteğin span süreleri; istek dışında (simülasyon, CLI) None
+_current = contextvars.ContextVar('request_timing', default=None)
+
+_lock = threading.Lock()
+_histograms = {}      # (method, endpoint, phase) -> [bucket sayıları..., toplam, adet]
+_requests = {}        # (method, endpoint, status) -> adet
+_bytes = {}           # (method, endpoint, 'request'|'response') -> byte
+_recent = deque(maxlen=SLOW_REQUEST_BUFFER)
+
+
+class RequestTiming:
+    """Span durations of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = dict.fromkeys(SPANS, 0.0)
+        self._active = set()
+
+
+def start_request():
+    """Start timing the current request; returns a token for finish_request()."""
+    return _current.set(RequestTiming())
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to the current request's `name` span.
+
+    Nested spans of the same name (e.g. load_state inside update_state) are
+    only counted once.
+    """
+    timing = _current.get()
+    if timing is None or name in timing._active:
+        yield
+        return
+    timing._active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.spans[name] += time.perf_counter() - started
+        timing._active.discard(name)
+
+def discard_request(token):
+    """Stop timing a request that ended without a response (unhandled error)."""
+    _current.reset(token)
+
+def finish_request(token, method, endpoint, path, status, request_bytes, response_bytes):
+    """Record the finished request and stop timing it."""
+    timing = _current.get()
+    _current.reset(token)
+    if timing is None:
+        return
+    total = time.perf_counter() - timing.started
+    phases = dict(timing.spans, total=total,
+                  compute=max(0.0, total - sum(timing.spans.values())))
+    with _lock:
+        for phase in PHASES:
+            _observe((method, endpoint, phase), phases[phase])
+        key = (method, endpoint, status)
+        _requests[key] = _requests.get(key, 0) + 1
+        for kind, size in (('request', request_bytes), ('response', response_bytes)):
+            if size:
+                key = (method, endpoint, kind)
+                _bytes[key] = _bytes.get(key, 0) + size
+        _recent.append({
+            'method': method,
+            'endpoint': endpoint,
+            'path': path,
+            'status': status,
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'ms': {phase: round(phases[phase] * 1000, 3) for phase in PHASES},
+            'request_bytes': request_bytes or 0,
+            'response_bytes': response_bytes or 0,
+        })
+
+def _observe(key, value):
+    # _lock tutulurken çağrılır
+    series = _histograms.get(key)
+    if series is None:
+        series = _histograms[key] = [0] * len(TIMING_BUCKETS) + [0.0, 0]
+    for i, bound in enumerate(TIMING_BUCKETS):
+        if value <= bound:
+            series[i] += 1
+    series[-2] += value
+    series[-1] += 1
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that adds jsonify() time to the 'serialize' span."""
+
+    def response(self, *args, **kwargs):
+        with span('serialize'):
+            return super().response(*args, **kwargs)
+
+
+def slowest(n):
+    """The n slowest of the recent requests, slowest first."""
+    with _lock:
+        recent = list(_recent)
+    return sorted(recent, key=lambda r: r['ms']['total'], reverse=True)[:n], len(recent)
+
+
+def render_prometheus(state_sizes=()):
+    """Prometheus text exposition of the collected metrics.
+
+    `state_sizes` is [(company, memory_bytes, file_bytes), ...].
+    """
+    with _lock:
+        histograms = sorted(_histograms.items())
+        requests = sorted(_requests.items())
+        byte_counts = sorted(_bytes.items())
+
+    lines = ['# HELP tasktycoon_request_duration_seconds Request time per endpoint and phase.',
+             '# TYPE tasktycoon_request_duration_seconds histogram']
+    for (method, endpoint, phase), series in histograms:
+        labels = f'method="{method}",endpoint="{_escape(endpoint)}",phase="{phase}"'
+        for bound, count in zip(TIMING_BUCKETS, series):
+            lines.append(f'tasktycoon_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'tasktycoon_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series[-1]}')
+        lines.append(f'tasktycoon_request_duration_seconds_sum{{{labels}}} {series[-2]:.6f}')
+        lines.append(f'tasktycoon_request_duration_seconds_count{{{labels}}} {series[-1]}')
+
+    lines += ['# HELP tasktycoon_requests_total Finished requests per endpoint and status.',
+              '# TYPE tasktycoon_requests_total counter']
+    for (method, endpoint, status), count in requests:
+        lines.append(f'tasktycoon_requests_total{{method="{method}",endpoint="{_escape(endpoint)}",'
+                     f'status="{status}"}} {count}')
+
+    for kind in ('request', 'response'):
+        lines += [f'# HELP tasktycoon_{kind}_bytes_total {kind.capitalize()} body bytes per endpoint.',
+                  f'# TYPE tasktycoon_{kind}_bytes_total counter']
+        for (method, endpoint, key_kind), size in byte_counts:
+            if key_kind == kind:
+                lines.append(f'tasktycoon_{kind}_bytes_total{{method="{method}",'
+                             f'endpoint="{_escape(endpoint)}"}} {size}')
+
+    lines += ['# HELP tasktycoon_state_memory_bytes Serialized size of the cached state per company.',
+              '# TYPE tasktycoon_state_memory_bytes gauge']
+    lines += [f'tasktycoon_state_memory_bytes{{company="{_escape(company)}"}} {memory}'
+              for company, memory, _ in state_sizes]
+    lines += ['# HELP tasktycoon_state_file_bytes On-disk size of the state storage per company.',
+              '# TYPE tasktycoon_state_file_bytes gauge']
+    lines += [f'tasktycoon_state_file_bytes{{company="{_escape(company)}"}} {size}'
+              for company, _, size in state_sizes]
+    return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -1,8 +1,29 @@
+// GET cevaplarının son ETag'i ve gövdesi; sunucu 304 dönerse saklanan gövde kullanılır
+const conditionalCache = {};
+
+function fetchJsonConditional(url) {
+    const cached = conditionalCache[url];
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    return fetch(url, { headers })
+        .then(response => {
+            if (response.status === 304 && cached) {
+                return { data: cached.data, changed: false };
+            }
+            return response.json().then(data => {
+                const etag = response.headers.get('ETag');
+                if (etag) {
+                    conditionalCache[url] = { etag, data };
+                }
+                return { data, changed: true };
+            });
+        });
+}
+
 // İstatistikler panelini doldur
 function fetchAndRenderStats() {
-    fetch('/api/dashboard/stats')
-        .then(r => r.json())
-        .then(data => {
+    fetchJsonConditional('/api/dashboard/stats')
+        .then(({ data, changed }) => {
+            if (!changed) return;
             if (!data.success) {
                 document.getElementById('stats-container').innerHTML = '<small class="text-danger">İstatistikler yüklenemedi</small>';
                 return;
@@ -83,54 +104,12 @@ let lastCash = null;
 let lastResearch = null;
 
 function updateDashboard() {
-    fetch('/api/state')
-        .then(response => response.json())
-        .then(state => {
+    fetchJsonConditional('/api/state')
+        .then(({ data: state, changed }) => {
+            // Değişmeyen state için ekran ve paneller zaten günceldir
+            if (!changed && gameState && gameState.version === state.version) return;
             gameState = state;
-            // Animasyonlu para ve araştırma
-            const cashVal = typeof state.cash === 'number' ? state.cash : 0;
-            const researchVal = typeof state.research === 'number' ? state.research : 0;
-            if (lastCash !== null && lastCash !== cashVal) {
-                animateValue('cash', lastCash, cashVal, 700, v => new Intl.NumberFormat().format(v));
-            } else {
-                document.getElementById('cash').textContent = new Intl.NumberFormat().format(cashVal);
-            }
-            if (lastResearch !== null && lastResearch !== researchVal) {
-                animateValue('research', lastResearch, researchVal, 700);
-            } else {
-                document.getElementById('research').textContent = researchVal;
-            }
-            lastCash = cashVal;
-            lastResearch = researchVal;
-            document.getElementById('energy').textContent = state.energy;
-            document.getElementById('current-day').textContent = state.current_day || state.day;
-            // Update progress bars
-            const energyBar = document.getElementById('energy-bar');
-            if (energyBar) {
-                const energyPercent = (state.energy / 100) * 100;
-                energyBar.style.width = energyPercent + '%';
-                energyBar.setAttribute('aria-valuenow', state.energy);
-                energyBar.textContent = state.energy + '/100';
-            }
-            // Update departments
-            updateDepartmentsDisplay();
-            // Update employees
-            updateEmployeesDisplay();
-            // Tooltipleri yeniden başlat
-            if (window.bootstrap) {
-                setTimeout(() => {
-                    var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
-                    tooltipTriggerList.forEach(function (tooltipTriggerEl) {
-                        new bootstrap.Tooltip(tooltipTriggerEl);
-                    });
-                }, 200);
-            }
-            // Refresh history panel
-            fetchAndRenderHistory(7);
-            // Refresh achievements panel
-            fetchAndRenderAchievements();
-            // Refresh stats panel
-            fetchAndRenderStats();
+            renderState(state);
         })
         .catch(error => {
             console.error('Dashboard güncellenirken hata:', error);
@@ -138,11 +117,164 @@ function updateDashboard() {
         });
 }
 
+// Değiştiren isteklere eklenen sorgu: tam state yerine son bilinen versiyondan farkı iste
+function deltaQuery() {
+    return gameState && typeof gameState.version === 'number'
+        ? `?response=delta&since=${gameState.version}`
+        : '';
+}
+
+// Sunucunun gönderdiği journal op'larını (set/del/append/trim) state'e uygula
+function applyOps(state, ops) {
+    ops.forEach(op => {
+        const [kind, path] = op;
+        let target = state;
+        path.slice(0, -1).forEach(key => {
+            if (target[key] === undefined) target[key] = {};
+            target = target[key];
+        });
+        const last = path[path.length - 1];
+        if (kind === 'set') {
+            target[last] = op[2];
+        } else if (kind === 'del') {
+            delete target[last];
+        } else if (kind === 'append') {
+            target[last] = (target[last] || []).concat(op[2]);
+        } else if (kind === 'trim') {
+            target[last] = (target[last] || []).slice(op[2]);
+        }
+    });
+    return state;
+}
+
+// Değiştiren bir isteğin cevabındaki delta/state'i uygula; elimizdeki versiyona
+// uymuyorsa tam state'i yeniden çek
+function applyStateResponse(data) {
+    showNewAchievements(data.new_achievements);
+    if (data.delta && gameState && gameState.version === data.delta.since) {
+        applyOps(gameState, data.delta.ops);
+        gameState.version = data.delta.version;
+        renderState(gameState);
+    } else if (data.state) {
+        gameState = data.state;
+        renderState(gameState);
+    } else {
+        updateDashboard();
+    }
+}
+
+// Sunucudan gelen canlı olaylar (SSE); bağlantı kurulamazsa polling'e düşülür
+let pollTimer = null;
+const shownAchievements = new Set();
+
+function startPolling() {
+    if (!pollTimer) {
+        pollTimer = setInterval(updateDashboard, 30000);
+    }
+}
+
+function startStateStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    const source = new EventSource('/api/stream');
+    source.addEventListener('open', () => {
+        if (pollTimer) {
+            clearInterval(pollTimer);
+            pollTimer = null;
+        }
+    });
+    source.addEventListener('state', e => applyStreamEvent(JSON.parse(e.data)));
+    source.addEventListener('resync', () => updateDashboard());
+    source.addEventListener('achievement_unlocked', e => showNewAchievements([JSON.parse(e.data)]));
+    source.addEventListener('error', () => {
+        // EventSource kendisi yeniden bağlanır; tamamen kapandıysa polling'e geç
+        if (source.readyState === EventSource.CLOSED) {
+            startPolling();
+        }
+    });
+}
+
+// Sadece skaler alanlar değiştiyse state'i yerinde güncelle, yoksa yeniden çek
+// (kendi isteklerimizin olayları versiyondan tanınır ve atlanır)
+function applyStreamEvent(event) {
+    if (!gameState || event.version <= gameState.version) return;
+    if (event.version === gameState.version + 1 && event.changed.length === 0) {
+        for (const [key, change] of Object.entries(event.changes)) {
+            gameState[key] = change.to;
+        }
+        gameState.version = event.version;
+        renderState(gameState);
+    } else {
+        updateDashboard();
+    }
+}
+
+function renderState(state) {
+    // Animasyonlu para ve araştırma
+    const cashVal = typeof state.cash === 'number' ? state.cash : 0;
+    const researchVal = typeof state.research === 'number' ? state.research : 0;
+    if (lastCash !== null && lastCash !== cashVal) {
+        animateValue('cash', lastCash, cashVal, 700, v => new Intl.NumberFormat().format(v));
+    } else {
+        document.getElementById('cash').textContent = new Intl.NumberFormat().format(cashVal);
+    }
+    if (lastResearch !== null && lastResearch !== researchVal) {
+        animateValue('research', lastResearch, researchVal, 700);
+    } else {
+        document.getElementById('research').textContent = researchVal;
+    }
+    lastCash = cashVal;
+    lastResearch = researchVal;
+    document.getElementById('energy').textContent = state.energy;
+    document.getElementById('current-day').textContent = state.current_day || state.day;
+    // Update progress bars
+    const energyBar = document.getElementById('energy-bar');
+    if (energyBar) {
+        const energyPercent = (state.energy / 100) * 100;
+        energyBar.style.width = energyPercent + '%';
+        energyBar.setAttribute('aria-valuenow', state.energy);
+        energyBar.textContent = state.energy + '/100';
+    }
+    // Update departments
+    updateDepartmentsDisplay();
+    // Update employees
+    updateEmployeesDisplay();
+    // Tooltipleri yeniden başlat
+    if (window.bootstrap) {
+        setTimeout(() => {
+            var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
+            tooltipTriggerList.forEach(function (tooltipTriggerEl) {
+                new bootstrap.Tooltip(tooltipTriggerEl);
+            });
+        }, 200);
+    }
+    // Refresh history panel
+    fetchAndRenderHistory(7);
+    // Refresh achievements panel
+    fetchAndRenderAchievements();
+    // Refresh stats panel
+    fetchAndRenderStats();
+}
+
+// Aksiyon yanıtındaki (veya SSE ile gelmiş) yeni başarımları bir kez göster
+function showNewAchievements(achievements) {
+    if (!achievements || achievements.length === 0) return;
+    achievements.forEach(ach => {
+        if (shownAchievements.has(ach.id)) return;
+        shownAchievements.add(ach.id);
+        showAchievementToast(ach.name, ach.unlocked_at);
+    });
+    // Paneli güncelle
+    fetchAndRenderAchievements();
+}
+
 // Fetch achievements from backend and render into the achievements card
 function fetchAndRenderAchievements() {
-    fetch('/api/achievements')
-        .then(r => r.json())
-        .then(data => {
+    fetchJsonConditional('/api/achievements')
+        .then(({ data, changed }) => {
+            if (!changed) return;
             if (!data.success) {
                 document.getElementById('achievements-container').innerHTML = '<small class="text-danger">Başarımlar yüklenemedi</small>';
                 return;
@@ -177,9 +309,9 @@ function renderAchievements(achievements) {
 
 // Fetch history from backend and render into the history card
 function fetchAndRenderHistory(n = 7) {
-    fetch(`/api/history?n=${n}`)
-        .then(r => r.json())
-        .then(data => {
+    fetchJsonConditional(`/api/history?n=${n}`)
+        .then(({ data, changed }) => {
+            if (!changed) return;
             if (!data.success) {
                 document.getElementById('history-container').innerHTML = '<small class="text-danger">Rapor yüklenemedi</small>';
                 return;
@@ -310,7 +442,7 @@ function updateEmployeesDisplay() {
 
 // Task functions
 function executeTask(taskType) {
-    fetch('/api/task', {
+    fetch(`/api/task${deltaQuery()}`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -321,7 +453,7 @@ function executeTask(taskType) {
     .then(data => {
         if (data.success) {
             showAlert(data.message, 'success');
-            updateDashboard();
+            applyStateResponse(data);
         } else {
             showAlert(data.message, 'warning');
         }
@@ -339,7 +471,7 @@ function performTask(taskType) {
 
 // Department functions
 function upgradeDepartment(deptType) {
-    fetch(`/api/department/${deptType}/upgrade`, {
+    fetch(`/api/department/${deptType}/upgrade${deltaQuery()}`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -349,7 +481,7 @@ function upgradeDepartment(deptType) {
     .then(data => {
         if (data.success) {
             showAlert(data.message, 'success');
-            updateDashboard();
+            applyStateResponse(data);
         } else {
             showAlert(data.message, 'warning');
         }
@@ -388,7 +520,7 @@ function hireEmployee() {
         return;
     }
     
-    fetch('/api/employees/hire', {
+    fetch(`/api/employees/hire${deltaQuery()}`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -403,7 +535,7 @@ function hireEmployee() {
     .then(data => {
         if (data.success) {
             showAlert(data.message, 'success');
-            updateDashboard();
+            applyStateResponse(data);
             
             // Close modal and clear form
             const modal = bootstrap.Modal.getInstance(document.getElementById('hireEmployeeModal'));
@@ -422,7 +554,7 @@ function hireEmployee() {
 
 // Day management functions
 function restoreEnergy() {
-    fetch('/api/energy/restore', {
+    fetch(`/api/energy/restore${deltaQuery()}`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -432,7 +564,7 @@ function restoreEnergy() {
     .then(data => {
         if (data.success) {
             showAlert(data.message, 'success');
-            updateDashboard();
+            applyStateResponse(data);
         } else {
             showAlert(data.message, 'warning');
         }
@@ -447,7 +579,7 @@ function endDay() {
     if (!confirm('Günü bitirmek istediğinizden emin misiniz?')) {
         return;
     }
-    fetch('/api/day/end', {
+    fetch(`/api/day/end${deltaQuery()}`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -456,15 +588,9 @@ function endDay() {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            updateDashboard();
+            applyStateResponse(data);
             // Yeni başarımlar bildirimi
-            if (data.day_summary && data.day_summary.new_achievements && data.day_summary.new_achievements.length > 0) {
-                data.day_summary.new_achievements.forEach(ach => {
-                    showAchievementToast(ach.name, ach.unlocked_at);
-                });
-                // Paneli güncelle
-                fetchAndRenderAchievements();
-            }
+            showNewAchievements(data.day_summary && data.day_summary.new_achievements);
             // Gün sonu özet modalı göster
             showDaySummaryModal(data.day_summary || data.summary || data.message);
         } else {
@@ -608,7 +734,7 @@ function resetGame() {
     if (!confirm('Oyunu sıfırlamak istediğinizden emin misiniz? Tüm ilerleme kaybolacak!')) {
         return;
     }
-    fetch('/api/reset_all', {
+    fetch(`/api/reset_all${deltaQuery()}`, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -618,7 +744,7 @@ function resetGame() {
     .then(data => {
         if (data.success) {
             showAlert('Oyun sıfırlandı', 'info');
-            updateDashboard();
+            applyStateResponse(data);
         } else {
             showAlert('Oyun sıfırlanamadı', 'danger');
         }
@@ -656,8 +782,8 @@ document.addEventListener('DOMContentLoaded', function() {
     console.log('DOM loaded, initializing dashboard...');
     updateDashboard();
     
-    // Set up auto-refresh every 30 seconds
-    setInterval(updateDashboard, 30000);
+    // Değişiklikleri /api/stream'den dinle; desteklenmezse 30 sn'de bir yenile
+    startStateStream();
     
     // Hoş geldiniz mesajı
     setTimeout(() => {